@@ -7,15 +7,32 @@ from pyspark.sql.window import Window
 
 import json
 import sys
+import argparse
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def ngram_column(n):
+    """Bigramas (n=2) o trigramas (n=3) de cada página.
+
+    Los registros compactos del crawler solo traen word_list; en ese caso los
+    n-gramas se arman aquí con el mismo separador que generate_ngrams. Spark
+    solo los calcula en las consultas que los usan.
+    """
+    stored = "bigrams" if n == 2 else "trigrams"
+    derived = expr(
+        f"IF(size(word_list) >= {n}, "
+        f"transform(sequence(1, size(word_list) - {n - 1}), i -> array_join(slice(word_list, i, {n}), ' ')), "
+        f"array())"
+    )
+    return coalesce(col(stored), derived)
+
 class WikiDataAnalyzer:
-    def __init__(self):
+    def __init__(self, data_format="jsonl"):
         self.spark = None
+        self.data_format = data_format # jsonl, shards (salida --output shards del crawler) o parquet (--format parquet)
         self.mysql_config = { # Datos de conexión a MySQL
             'host': 'mysql',
             'port': 3306,
@@ -154,8 +171,8 @@ class WikiDataAnalyzer:
             logger.error(f"Error en limpieza de tablas: {e}")
             return False
     
-    def load_data_from_hdfs(self, hdfs_path="hdfs://namenode:9000/user/root/wiki_data/wiki_data.jsonl"):
-        """Cargar datos desde HDFS"""
+    def load_data_from_hdfs(self, hdfs_path="hdfs://namenode:9000/user/root/wiki_data/{wiki_data.jsonl,worker-*/wiki_data.jsonl}"):
+        """Cargar datos desde HDFS (con un crawl distribuido, los de cada worker-N)"""
         try:
             logger.info(f"Intentando cargar datos desde: {hdfs_path}")
             
@@ -194,6 +211,40 @@ class WikiDataAnalyzer:
             logger.error(f"Error cargando datos desde HDFS: {e}")
             return None
     
+    def load_shards_from_hdfs(self, hdfs_path="hdfs://namenode:9000/user/root/wiki_data/{part-*.jsonl*,worker-*/part-*.jsonl*}"):
+        """Cargar los shards JSONL del crawler (--output shards) desde HDFS"""
+        # Spark descomprime .gz solo; .zst necesita el codec ZStandard de Hadoop
+        return self.load_data_from_hdfs(hdfs_path)
+
+    def load_parquet_from_hdfs(self, hdfs_path="hdfs://namenode:9000/user/root/wiki_data/{part-*.parquet,worker-*/part-*.parquet}"):
+        """Cargar datos en Parquet desde HDFS (sin parsear JSON)"""
+        try:
+            logger.info(f"Intentando cargar Parquet desde: {hdfs_path}")
+
+            # El schema viene en los archivos; solo se fijan el orden y los tipos del JSONL
+            parsed_df = self.spark.read.parquet(hdfs_path).select(
+                col("url"),
+                col("title"),
+                col("word_list"),
+                col("bigrams"),
+                col("trigrams"),
+                col("edits_per_day").cast("double").alias("edits_per_day"),
+                col("links")
+            ).filter(col("title").isNotNull())
+
+            row_count = parsed_df.count()
+            logger.info(f"Datos Parquet cargados desde HDFS: {row_count} registros")
+
+            if row_count == 0:
+                logger.error("No se encontraron datos válidos")
+                return None
+
+            return parsed_df
+
+        except Exception as e:
+            logger.error(f"Error cargando Parquet desde HDFS: {e}")
+            return None
+    
     def save_to_mysql(self, df, table_name, mode="append"):
         """Guardar DataFrame en MySQL usando Spark JDBC"""
         try:
@@ -228,8 +279,8 @@ class WikiDataAnalyzer:
                 col("url"),
                 coalesce(col("edits_per_day"), lit(0.0)).cast("double").alias("edits_per_day"),
                 size(coalesce(col("links"), array())).alias("quant_diff_urls"),
-                size(coalesce(col("bigrams"), array())).alias("quant_set2"),
-                size(coalesce(col("trigrams"), array())).alias("quant_set3"),
+                size(ngram_column(2)).alias("quant_set2"),
+                size(ngram_column(3)).alias("quant_set3"),
                 lit(1).alias("total_repetitions")
             )
             
@@ -480,7 +531,7 @@ class WikiDataAnalyzer:
             bigram_page_df = df.select(
                 col("title").alias("page_title"),
                 col("url").alias("page_url"),
-                explode(coalesce(col("bigrams"), array())).alias("bigram")
+                explode(ngram_column(2)).alias("bigram")
             ).filter(col("bigram").isNotNull() & (col("bigram") != ""))
             
             if bigram_page_df.count() == 0:
@@ -565,7 +616,7 @@ class WikiDataAnalyzer:
             trigram_page_df = df.select(
                 col("title").alias("page_title"),
                 col("url").alias("page_url"),
-                explode(coalesce(col("trigrams"), array())).alias("trigram")
+                explode(ngram_column(3)).alias("trigram")
             ).filter(col("trigram").isNotNull() & (col("trigram") != ""))
             
             if trigram_page_df.count() == 0:
@@ -655,13 +706,13 @@ class WikiDataAnalyzer:
                 logger.warning("DataFrame vacío o nulo.")
                 return False
 
-            # Filtrar filas con bigrams y URL válidas
-            df_filtered = df.filter(col("url").isNotNull() & col("bigrams").isNotNull())
+            # Filtrar filas con URL válida
+            df_filtered = df.filter(col("url").isNotNull())
 
-            # Explota los bigramas
+            # Explota los bigramas (guardados o derivados de word_list)
             df_exploded = df_filtered.select(
                 col("url"),
-                explode(col("bigrams")).alias("bigram_str")
+                explode(ngram_column(2)).alias("bigram_str")
             ).filter(col("bigram_str").isNotNull() & (length(col("bigram_str")) > 0))
 
             if df_exploded.rdd.isEmpty():
@@ -712,8 +763,8 @@ class WikiDataAnalyzer:
         try:
             logger.info("Analizando páginas TOP10 por trigramas compartidos...")
 
-            # Explota los trigramas y los convierte a string
-            df_exploded = df.select("url", explode(col("trigrams")).alias("trigram_str"))
+            # Explota los trigramas (guardados o derivados de word_list)
+            df_exploded = df.select("url", explode(ngram_column(3)).alias("trigram_str"))
 
             # Relaciona páginas que comparten trigramas
             joined = df_exploded.alias("a").join(
@@ -1221,7 +1272,12 @@ class WikiDataAnalyzer:
             # Como tenemos claves foráneas, simplemente usamos DELETE en lugar de TRUNCATE/DROP
             
             # Cargar datos
-            df = self.load_data_from_hdfs()
+            if self.data_format == "parquet":
+                df = self.load_parquet_from_hdfs()
+            elif self.data_format == "shards":
+                df = self.load_shards_from_hdfs()
+            else:
+                df = self.load_data_from_hdfs()
             if df is None:
                 return False
             
@@ -1305,7 +1361,11 @@ class WikiDataAnalyzer:
 
 if __name__ == "__main__":
     logger.info("Iniciando WikiDataAnalyzer...")
-    analyzer = WikiDataAnalyzer()
+    parser = argparse.ArgumentParser(description="Análisis de los datos del crawler con Spark")
+    parser.add_argument("--format", choices=["jsonl", "shards", "parquet"], default="jsonl",
+                        help="Formato de la salida del crawler en HDFS")
+    args = parser.parse_args()
+    analyzer = WikiDataAnalyzer(data_format=args.format)
     success = analyzer.run_complete_analysis()
     
     if success:
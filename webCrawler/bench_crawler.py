@@ -0,0 +1,128 @@
+"""Benchmark de crawl_rest de punta a punta contra replay_server, sin Wikipedia.
+
+Levanta un ReplayServer sobre un replay_cache (ver replay_cache.py) y corre
+crawl_rest una vez por cada combinación de --threads y --rps. Cada corrida
+usa un proceso nuevo y un directorio temporal. Por defecto la concurrencia y
+el rate quedan fijos; con --adaptive los valores de --threads y --rps son
+techos del controlador AIMD (ver concurrency.py), y --max-rps hace que el
+servidor conteste 429 por encima de ese rate. Reporta pages/sec, latencia
+de fetch p50/p99 (hasta recibir los headers) y CPU por página (proceso del
+crawler más sus procesos de parseo; el servidor corre aparte).
+
+    python replay_cache.py import-html html_samples replay_cache   # o crawler.py --record-cache
+    python bench_crawler.py replay_cache --threads 10 50 --rps 100 200 --latency-ms 80 --jitter-ms 40
+    python bench_crawler.py replay_cache --threads 50 --rps 400 --max-rps 150 --adaptive
+"""
+import argparse
+import contextlib
+import itertools
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from replay_cache import ResponseCache, REST_HTML_PATH
+from replay_server import ReplayServer
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run_once(base_url, start_title, threads, rps, parse_workers, max_bytes, adaptive, workdir, results):
+    """Corre crawl_rest en este proceso (uno nuevo por corrida) y deja sus métricas en results"""
+    import crawler
+    from http_session import SessionPool
+    from rate_limiter import RateLimiter
+
+    latencies = []
+    crawler.REST_API_HTML = base_url + REST_HTML_PATH
+    crawler.API_URL = base_url + "/w/api.php"
+    crawler.MAX_THREADS = threads
+    crawler.REQUESTS_PER_SECOND = rps
+    crawler.MAX_DATA_SIZE = max_bytes
+    crawler.ADAPTIVE_CONCURRENCY = adaptive
+    crawler.rate_limiter = RateLimiter(rps)
+    crawler.http_pool = SessionPool(threads, crawler.HEADERS,
+                                    response_hook=lambda resp, *a, **k: latencies.append(resp.elapsed.total_seconds()))
+    os.chdir(workdir)
+    os.makedirs(crawler.LOCAL_FOLDER, exist_ok=True)
+
+    cpu_start = os.times()
+    wall_start = time.perf_counter()
+    with open(os.path.join(crawler.LOCAL_FOLDER, "wiki_data.jsonl"), "w", encoding="utf-8") as f, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        crawler.start_request_control(threads)
+        crawler.crawl_rest(start_title, f, parse_workers)
+    wall = time.perf_counter() - wall_start
+    cpu_end = os.times()
+    # Los procesos de parseo ya terminaron, así que su CPU aparece en children_*
+    cpu = sum(end - start for end, start in zip(cpu_end[:4], cpu_start[:4]))
+    crawler.http_pool.close()
+    results.update({
+        "pages": len(crawler.visited),
+        "wall": wall,
+        "cpu": cpu,
+        "requests": len(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "throttled": crawler.throttled_responses.value,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawl_rest benchmark against a replay cache")
+    parser.add_argument("cache", help="Replay cache folder")
+    parser.add_argument("--start", default="Inteligencia_artificial", help="Start title (must be in the cache)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[50], help="MAX_THREADS values to try")
+    parser.add_argument("--rps", type=float, nargs="+", default=[200], help="REQUESTS_PER_SECOND values to try")
+    parser.add_argument("--parse-workers", type=int, default=max((os.cpu_count() or 2) - 1, 1))
+    parser.add_argument("--max-mb", type=float, default=10, help="MAX_DATA_SIZE for each run")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=int, default=0, help="Server answers 429 above this rate (0 = off)")
+    parser.add_argument("--adaptive", action="store_true", help="Let the AIMD controller move concurrency and rate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache)
+    if not len(cache):
+        print(f"No responses in '{args.cache}'")
+        return
+    server = ReplayServer(cache, 0, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.seed,
+                          args.max_rps).start()
+    print(f"Replaying {len(cache)} responses on {server.base_url} "
+          f"(latency {args.latency_ms:.0f}+{args.jitter_ms:.0f} ms, {100 * args.error_rate:.1f}% errors)")
+    print(f"{'threads':>7} {'rps':>7} {'pages':>6} {'pages/sec':>10} {'p50 ms':>8} {'p99 ms':>8} {'CPU ms/page':>12} "
+          f"{'429/503':>8}")
+
+    # spawn: cada corrida importa crawler desde cero, sin el estado global de la anterior
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        for threads, rps in itertools.product(args.threads, args.rps):
+            results = manager.dict()
+            with tempfile.TemporaryDirectory() as workdir:
+                run = context.Process(target=run_once, args=(server.base_url, args.start, threads, rps,
+                                                             args.parse_workers, int(args.max_mb * 1024 * 1024),
+                                                             args.adaptive, workdir, results))
+                run.start()
+                run.join()
+            if run.exitcode != 0 or not results:
+                print(f"{threads:>7} {rps:>7.0f}  run failed (exit code {run.exitcode})")
+                continue
+            pages = max(results["pages"], 1)
+            print(f"{threads:>7} {rps:>7.0f} {results['pages']:>6} {results['pages'] / results['wall']:>10.1f} "
+                  f"{1000 * results['p50']:>8.1f} {1000 * results['p99']:>8.1f} {1000 * results['cpu'] / pages:>12.2f} "
+                  f"{results['throttled']:>8}")
+    print(f"Server: {server.report()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
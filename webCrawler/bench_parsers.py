@@ -0,0 +1,61 @@
+"""Benchmark de los backends de html_extract sobre HTML de Parsoid guardado.
+
+Guardar algunas páginas primero, por ejemplo:
+
+    mkdir -p html_samples
+    curl -o html_samples/Inteligencia_artificial.html \\
+        https://es.wikipedia.org/api/rest_v1/page/html/Inteligencia_artificial
+
+    python bench_parsers.py html_samples --rounds 5
+"""
+import argparse
+import glob
+import os
+import time
+
+from html_extract import available_backends, extract_page
+
+
+def load_samples(folder):
+    samples = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            samples.append(f.read())
+    return samples
+
+
+def bench_backend(backend, samples, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in samples:
+            extract_page(html, backend)
+    return len(samples) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages/sec per HTML parser backend")
+    parser.add_argument("folder", help="Folder with saved Parsoid .html pages")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = load_samples(args.folder)
+    if not samples:
+        print(f"No .html files found in '{args.folder}'")
+        return
+    total_mb = sum(len(html.encode("utf-8")) for html in samples) / (1024 * 1024)
+    print(f"{len(samples)} pages ({total_mb:.2f} MB), {args.rounds} rounds")
+
+    backends = available_backends()
+    reference = [extract_page(html, backends[-1]) for html in samples]
+    for backend in backends:
+        pages_per_sec = bench_backend(backend, samples, args.rounds)
+        # Compara contra el backend de respaldo: mismas palabras y mismos links
+        same = all(
+            ref[1].split() == out[1].split() and sorted(ref[2]) == sorted(out[2])
+            for ref, out in zip(reference, (extract_page(html, backend) for html in samples))
+        )
+        print(f"{backend:<12} {pages_per_sec:>9.1f} pages/sec  output matches {backends[-1]}: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark del rate limiter: CPU consumido a un rate fijo.
+
+Compara el polling original (consume() + sleep(0.001)) contra acquire()
+con threads, y acquire_async() con un solo event loop.
+
+    python bench_rate_limiter.py --rate 200 --workers 50 --seconds 5
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from rate_limiter import RateLimiter
+
+
+def run_threads(rate, workers, seconds, take):
+    """Lanza workers threads que toman tokens con take() hasta que se acabe el tiempo"""
+    limiter = RateLimiter(rate, capacity=1)
+    counts = [0] * workers
+    deadline = time.monotonic() + seconds
+
+    def loop(i):
+        while time.monotonic() < deadline:
+            take(limiter)
+            counts[i] += 1
+
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(workers)]
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts, time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+
+def polling_take(limiter):
+    while not limiter.consume():
+        time.sleep(0.001)
+
+
+def blocking_take(limiter):
+    limiter.acquire()
+
+
+def run_async(rate, workers, seconds):
+    limiter = RateLimiter(rate, capacity=1)
+    counts = [0] * workers
+
+    async def loop(i, deadline):
+        while time.monotonic() < deadline:
+            await limiter.acquire_async()
+            counts[i] += 1
+
+    async def run():
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(*(loop(i, deadline) for i in range(workers)))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    asyncio.run(run())
+    return counts, time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+
+def report(name, counts, cpu, wall):
+    total = sum(counts)
+    # Coeficiente de variación de requests por worker: ~0 significa reparto justo
+    spread = statistics.pstdev(counts) / statistics.mean(counts) if total else 0.0
+    print(f"{name:<18} {total / wall:>8.1f} req/s  CPU {100 * cpu / wall:>6.1f}%  "
+          f"{1e6 * cpu / max(total, 1):>8.1f} us CPU/req  fairness cv {spread:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"rate={args.rate:g}/s workers={args.workers} seconds={args.seconds:g}")
+    report("polling (threads)", *run_threads(args.rate, args.workers, args.seconds, polling_take))
+    report("acquire (threads)", *run_threads(args.rate, args.workers, args.seconds, blocking_take))
+    report("acquire (asyncio)", *run_async(args.rate, args.workers, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark del tokenizer sobre HTML de Parsoid guardado (ver bench_parsers.py).
+
+Compara la tokenización anterior (re.sub sin compilar y stopwords en
+inglés) contra Tokenizer.tokenize y Tokenizer.tokenize_batch, y mide
+cuánto se achica la salida (word_list + bigrams + trigrams en JSON) con
+cada lista de stopwords.
+
+Sin carpeta usa páginas sintéticas con la forma del HTML de Parsoid
+(secciones con texto, un link a un artículo y uno a un archivo); los
+números con páginas reales salen de guardarlas como en bench_parsers.py.
+
+    python bench_tokenizer.py --pages 20
+    python bench_tokenizer.py html_samples --rounds 5
+"""
+import argparse
+import json
+import re
+import time
+
+from bench_parsers import load_samples
+from html_extract import extract_page
+from page_parser import generate_ngrams
+from tokenizer import Tokenizer, load_stopwords
+
+
+def synthetic_page(index, sections=60, paragraphs=3):
+    """Página de Parsoid generada, igual para cada índice salvo el título"""
+    body = "".join(
+        f'<section><h2>Sec {s}</h2><p>Texto <b>negrita</b> con '
+        f'<a href="./Art_{s}_{p}" rel="mw:WikiLink">enlace</a> y '
+        f'<a href="./Archivo:X.jpg">img</a> más palabras aquí {p}.</p></section>'
+        for s in range(sections) for p in range(paragraphs)
+    )
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>T</title></head>'
+            f'<body><h1>Página {index}</h1>{body}</body></html>')
+
+
+def legacy_tokenize(text, excluded):
+    """clean_and_process_text antes del módulo tokenizer"""
+    text = re.sub(r'[^\w\s]', '', text, flags=re.UNICODE).lower()
+    words = text.split()
+    return [word for word in words if word not in excluded]
+
+
+def bench(function, texts, rounds):
+    """Mejor tiempo de una pasada sobre todos los textos"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def serialize(word_lists):
+    """Lo que build_page_record hace con cada word_list: n-gramas y JSON"""
+    lines = []
+    for words in word_lists:
+        record = {"word_list": words, "bigrams": generate_ngrams(words, 2), "trigrams": generate_ngrams(words, 3)}
+        lines.append(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens/sec and output size per tokenizer and stopword list")
+    parser.add_argument("folder", nargs="?", help="Folder with saved Parsoid .html pages (default: synthetic pages)")
+    parser.add_argument("--pages", type=int, default=20, help="Synthetic pages to generate when no folder is given")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--stopwords", action="append",
+                        help="Stopword spec to compare (repeatable; default: en, es and es,en)")
+    args = parser.parse_args()
+
+    if args.folder is None:
+        samples = [synthetic_page(i) for i in range(args.pages)]
+    else:
+        samples = load_samples(args.folder)
+    if not samples:
+        print(f"No .html files found in '{args.folder}'")
+        return
+    texts = [extract_page(html)[1] for html in samples]
+    tokens = sum(len(text.split()) for text in texts)
+    print(f"{len(texts)} pages, {tokens} raw tokens, best of {args.rounds} rounds")
+
+    english = load_stopwords("en")
+    tokenizer = Tokenizer("en")
+    runs = [
+        ("legacy re.sub", lambda ts: [legacy_tokenize(t, english) for t in ts]),
+        ("tokenize", lambda ts: [tokenizer.tokenize(t) for t in ts]),
+        ("tokenize_batch", tokenizer.tokenize_batch),
+    ]
+    reference = [legacy_tokenize(t, english) for t in texts]
+    for name, function in runs:
+        seconds = bench(function, texts, args.rounds)
+        same = function(texts) == reference
+        print(f"{name:<16} {tokens / seconds / 1e6:>7.2f} M tokens/sec  output matches legacy: {same}")
+
+    # El costo que sigue a la tokenización (n-gramas y JSON) crece con los tokens que quedan
+    baseline = sum(map(len, serialize(reference)))
+    print(f"\n{'stopwords':<16} {'tokens':>10} {'output MB':>10} {'vs en':>8} {'pages/sec':>10}")
+    for spec in args.stopwords or ["en", "es", "es,en"]:
+        candidate = Tokenizer(spec)
+        word_lists = candidate.tokenize_batch(texts)
+        size = sum(map(len, serialize(word_lists)))
+        seconds = bench(lambda ts: serialize(candidate.tokenize_batch(ts)), texts, args.rounds)
+        print(f"{spec:<16} {sum(map(len, word_lists)):>10} {size / (1024 * 1024):>10.2f} "
+              f"{100 * (size - baseline) / baseline:>+7.1f}% {len(texts) / seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Checkpoints del crawl para poder reanudarlo con --resume.
+
+El checkpoint guarda la frontera (pendientes y páginas en vuelo, con su
+profundidad), el tamaño acumulado y el offset del archivo de salida en ese
+momento. Se escribe en un archivo temporal y se reemplaza de forma atómica,
+así que un crash nunca deja un checkpoint a medias.
+"""
+import json
+import os
+import time
+
+
+def save_checkpoint(path, state):
+    state = dict(state, updated=time.strftime('%Y-%m-%d %H:%M:%S'))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Error loading checkpoint {path}: {e}")
+        return None
+
+
+def repair_output(path):
+    """Quita una última línea incompleta y retorna (bytes del archivo, tamaño de datos).
+
+    El tamaño de datos es el mismo que cuenta el crawler: bytes de cada
+    registro sin el salto de línea.
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+    return end, end - data.count(b"\n", 0, end)
+
+
+def iter_records_after(path, offset):
+    """Registros escritos después de offset (los que el checkpoint todavía no cubre)"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
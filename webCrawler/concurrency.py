@@ -0,0 +1,182 @@
+"""Control adaptativo de concurrencia y rate (AIMD) para los requests del crawler.
+
+ConcurrencyGate limita cuántos requests están abiertos a la vez. Lo usan
+tanto los threads como las corrutinas del engine async, y su límite se
+puede cambiar en caliente.
+
+AIMDController mira la latencia y el status de cada respuesta y decide
+una vez por ventana:
+
+- 429/503 o un error de red: divide el límite y el rate por dos. Si la
+  respuesta trae Retry-After, el rate limiter se pausa ese tiempo.
+- p95 de la ventana por encima de tolerance veces la latencia base: baja
+  un 10% (la cola del servidor está creciendo).
+- Latencia estable: sube el límite y el rate un paso, o los duplica
+  mientras no haya habido ninguna señal de congestión (slow start).
+
+La latencia base es el p95 más bajo que se ha visto. Sube de a poco para
+seguir cambios de red que no se deben a congestión.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def retry_after_seconds(value):
+    """Segundos de un header Retry-After (segundos o fecha HTTP), o None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ConcurrencyGate:
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()  # Funciones que entregan un slot a quien espera
+
+    def _take(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._take():
+                return
+            event = threading.Event()
+            self._waiters.append(event.set)
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take():
+                return
+            future = loop.create_future()
+            self._waiters.append(lambda: loop.call_soon_threadsafe(self._hand_over, future))
+        await future
+
+    def _hand_over(self, future):
+        if future.cancelled():
+            # La corrutina se canceló mientras esperaba; el slot pasa al siguiente
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self._wake()
+
+    def set_limit(self, limit):
+        with self._lock:
+            self.limit = limit
+            self._wake()
+
+    def _wake(self):
+        while self._waiters and self.active < self.limit:
+            self.active += 1
+            self._waiters.popleft()()
+
+
+class AIMDController:
+    def __init__(self, rate_limiter, gate, max_limit, max_rate, min_limit=1, min_rate=1.0,
+                 window=50, interval=2.0, tolerance=1.5, limit_step=2, rate_step=10.0):
+        self.rate_limiter = rate_limiter
+        self.gate = gate
+        self.max_limit = max_limit
+        self.max_rate = max_rate
+        self.min_limit = min_limit
+        self.min_rate = min_rate
+        self.window = window
+        self.interval = interval
+        self.tolerance = tolerance
+        self.limit_step = limit_step
+        self.rate_step = rate_step
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._throttled = 0
+        self._window_start = time.monotonic()
+        self.baseline = None
+        self.slow_start = True
+        self.increases = 0
+        self.decreases = 0
+        self.throttled = 0
+        self.retry_after_total = 0.0
+        # Se arranca con una quinta parte del máximo y se sube con slow start
+        self.limit = max(min_limit, max_limit // 5)
+        self.rate = max(min_rate, max_rate / 5)
+        gate.set_limit(self.limit)
+        rate_limiter.set_rate(self.rate)
+
+    def observe(self, seconds, status, retry_after=None):
+        """Registra una respuesta; status None es un error de red o timeout"""
+        with self._lock:
+            if status is None or status in THROTTLE_STATUSES:
+                self._throttled += 1
+                self.throttled += 1
+                wait = retry_after_seconds(retry_after)
+                if wait:
+                    self.retry_after_total += wait
+                    self.rate_limiter.pause(wait)
+            else:
+                self._latencies.append(seconds)
+            if (len(self._latencies) + self._throttled >= self.window
+                    or time.monotonic() - self._window_start >= self.interval):
+                self._adjust()
+
+    def _adjust(self):
+        latencies, throttled = sorted(self._latencies), self._throttled
+        self._latencies, self._throttled = [], 0
+        self._window_start = time.monotonic()
+        if throttled:
+            self._set(self.limit / 2, self.rate / 2)
+            self.slow_start = False
+            self.decreases += 1
+            return
+        if not latencies:
+            return
+        p95 = latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)]
+        if self.baseline is None or p95 < self.baseline:
+            self.baseline = p95
+        else:
+            self.baseline += (p95 - self.baseline) * 0.02
+        if p95 > self.tolerance * self.baseline:
+            self._set(self.limit * 0.9, self.rate * 0.9)
+            self.slow_start = False
+            self.decreases += 1
+        elif self.slow_start:
+            self._set(self.limit * 2, self.rate * 2)
+            self.increases += 1
+        else:
+            self._set(self.limit + self.limit_step, self.rate + self.rate_step)
+            self.increases += 1
+
+    def _set(self, limit, rate):
+        limit = int(min(max(limit, self.min_limit), self.max_limit))
+        rate = min(max(rate, self.min_rate), self.max_rate)
+        if limit != self.limit:
+            self.limit = limit
+            self.gate.set_limit(limit)
+        if rate != self.rate:
+            self.rate = rate
+            self.rate_limiter.set_rate(rate)
+
+    def report(self):
+        baseline = f"{1000 * self.baseline:.1f} ms" if self.baseline is not None else "n/a"
+        return (f"concurrency {self.limit}/{self.max_limit}, rate {self.rate:.0f}/{self.max_rate:.0f} req/s, "
+                f"{self.increases} increases, {self.decreases} decreases, {self.throttled} throttled responses, "
+                f"Retry-After {self.retry_after_total:.1f}s, baseline p95 {baseline}")
@@ -1,59 +1,150 @@
+import time
+PROCESS_START = time.perf_counter()  # Para medir el arranque, imports incluidos
+
 import requests
-from bs4 import BeautifulSoup
-import re
 import json
-import time
-from urllib.parse import urljoin, unquote, quote
-from nltk.util import ngrams
-from nltk.corpus import stopwords
-import nltk
+from urllib.parse import unquote, quote
 import threading
-from queue import Queue
+from queue import Empty, Queue
 from threading import Semaphore
 import os
 import subprocess
-from datetime import datetime
+import asyncio
+import argparse
+import contextlib
+
+from http_session import SessionPool, AsyncPoolStats, create_async_session, format_pool_stats, import_aiohttp
+from rate_limiter import RateLimiter
+from concurrency import ConcurrencyGate, AIMDController, THROTTLE_STATUSES, retry_after_seconds
+from edit_rate import EditRateBatcher, edit_rate_params, edit_rate_from_response
+from html_extract import resolve_backend
+from page_parser import build_page_record_timed
+from parse_stage import ParseStage
+from tokenizer import load_stopwords
+from visited_journal import VisitedJournal
+from visited_store import SetStore, create_visited_store, describe_store
+from frontier import Frontier, PriorityFrontier, AsyncFrontier, SCORERS, skip_prefixes
+from frontier_service import DistributedFrontier, open_frontier_store
+from checkpoint import save_checkpoint, load_checkpoint, repair_output, iter_records_after
+from shard_writer import ShardWriter, COMPRESSIONS, remove_shards
+from parquet_writer import ParquetWriter
+from webhdfs import WebHDFSClient, ShardUploader, DEFAULT_CHUNK_BYTES
+from replay_cache import ResponseCache, REST_HTML_PATH
+from title_resolver import TitleResolver, title_from_link
+from revisions import RevisionLog, IncrementalCrawl, load_revisions, revision_from_headers
+from metrics import Registry, MetricsServer
+
+IMPORTS_DONE = time.perf_counter()
+aiohttp = None  # Se importa en crawl_async; el engine de threads no lo necesita
 
 # Base configuration
 BASE_WIKI = "https://es.wikipedia.org/wiki/"
 REST_API_HTML = "https://es.wikipedia.org/api/rest_v1/page/html/"
 API_URL = "https://es.wikipedia.org/w/api.php"
 HEADERS = {"User-Agent": "WikipediaCrawlerBot/1.0 (bliang@estudiantec.cr)"}
+START_TITLE = "Inteligencia_artificial"
 
 MAX_DEPTH = 3
 MAX_DATA_SIZE = 10 * 1024 * 1024  # 10 MB
 MAX_THREADS = 50  # Número de threads concurrentes (dentro del límite de rate)
 REQUESTS_PER_SECOND = 200  # Límite de la API
 REQUEST_INTERVAL = 1.0 / REQUESTS_PER_SECOND  # Intervalo entre requests
+HTML_REQUEST_COST = 1  # Tokens que consume un request al REST API (HTML)
+API_REQUEST_COST = 1  # Tokens que consume un request al action API
+EDIT_RATE_BATCH_SIZE = 50  # Títulos por request del action API (redirects y revisiones de --incremental)
+EDIT_RATE_WORKERS = 8  # Requests de revisiones (uno por página: MediaWiki no agrupa rvlimit) en paralelo
+RESOLVE_REDIRECTS = True  # Resolver redirects y variantes de los links (action API por lotes) antes de encolarlos
+LINK_WORKERS = 4  # Threads que resuelven y encolan los links de las páginas parseadas (engine threads)
+LINK_BATCH_PAGES = 16  # Páginas cuyos links se resuelven juntos en un thread de links
+PARSER_BACKEND = "auto"  # selectolax, lxml, bs4 o auto (el más rápido instalado)
+COMPACT_RECORDS = False  # Registros sin bigrams/trigrams (el analizador los deriva de word_list)
+STOPWORDS = "es"  # Stopwords de word_list: es, en, un archivo propio o varios separados por coma
+PARSE_WORKERS = max((os.cpu_count() or 2) - 1, 1)  # Procesos de parseo (0 = parsear en los threads de fetch)
+PARSE_QUEUE_SIZE = 32  # Páginas descargadas esperando parseo antes de frenar el fetch
+MAX_INFLIGHT_REQUESTS = 500  # Requests simultáneos en el engine async
+REQUEST_TIMEOUT = 10  # Segundos
+ADAPTIVE_CONCURRENCY = True  # AIMD: MAX_THREADS/MAX_INFLIGHT_REQUESTS y REQUESTS_PER_SECOND pasan a ser techos
+FETCH_RETRIES = 2  # Reintentos de una página que recibió 429/503 o un error de red
 
 # HDFS Configuration
 CONTAINER_NAME = "namenode"
 LOCAL_FOLDER = "wiki_data"
 CONTAINER_FOLDER = "/wiki_data"
 HDFS_TARGET_DIR = "/user/root/wiki_data"
+WEBHDFS_URL = None  # http://namenode:9870: sube cada shard por WebHDFS apenas se cierra, sin docker cp
+HDFS_USER = "root"
+UPLOAD_WORKERS = 4  # Chunks subidos en paralelo
+UPLOAD_CHUNK_BYTES = DEFAULT_CHUNK_BYTES  # Tamaño de chunk y blocksize de los archivos en HDFS
 
 # Cache file configuration
-CACHE_FILE = "visited_pages_cache.json"
+VISITED_JOURNAL = "visited_pages.log"  # Journal append-only (+ .snapshot compactado)
+CACHE_FILE = "visited_pages_cache.json"  # Formato anterior, solo se lee para migrarlo
+REVISIONS_FILE = "page_revisions.tsv"  # Revisión y ETag de cada página escrita (para --incremental)
+REDIRECT_MAP_FILE = "redirect_map.tsv"  # Mapa persistente título -> canónico (redirects y variantes)
+PREVIOUS_SUFFIX = ".previous"  # Salida y revisiones de la corrida anterior en un crawl incremental
+VISITED_STORE = "set"  # set, fingerprint (huellas de 64 bits) o bloom (probabilístico)
+VISITED_STORE_CAPACITY = 1000000  # Tamaño inicial del store; crece si hace falta
+BLOOM_FP_RATE = 0.001  # Tasa de falsos positivos del modo bloom
+
+# Frontier configuration
+FRONTIER_MEMORY_LIMIT = 100000  # Títulos en memoria antes de derramar a disco
+FRONTIER_SPILL_DIR = "frontier_spill"
+FRONTIER_ORDER = "fifo"  # fifo (BFS por profundidad) o priority (heap por puntaje)
+FRONTIER_SCORER = "inlinks"  # Scorer del modo priority: inlinks o depth
+SKIP_PREFIXES = ()  # Prefijos de título que el modo priority no encola
+FRONTIER_SERVICE = None  # Crawl distribuido: http://coordinador:puerto o sqlite:///ruta (ver frontier_service.py)
+WORKER_ID = 0  # Partición de este worker en un crawl distribuido
 
-# Descargar stopwords de NLTK si no están disponibles
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# Output configuration
+OUTPUT_MODE = "jsonl"  # jsonl (un solo wiki_data.jsonl) o shards (part-*.jsonl[.gz|.zst] + manifest.json)
+OUTPUT_FORMAT = "jsonl"  # jsonl o parquet (archivos part-*.parquet + manifest.json)
+OUTPUT_COMPRESSION = "gzip"  # Compresión de los shards/Parquet: none, gzip o zstd
+SHARD_MAX_BYTES = 64 * 1024 * 1024  # Tamaño en disco al que se cierra un shard y se abre otro
+SHARD_BUFFER_BYTES = 256 * 1024  # Registros en memoria por shard antes de comprimirlos y escribirlos
+PARQUET_ROW_GROUP_RECORDS = 1000  # Registros por row group en --format parquet
 
-EXCLUDED_WORDS = set(stopwords.words('english'))
+# Telemetry configuration
+LOG_EVERY_PAGE = True  # Una línea por página escrita; a rates altos el print mismo es un cuello de botella
+SUMMARY_INTERVAL = 10  # Segundos entre líneas de resumen (0 = sin resumen)
+METRICS_PORT = 0  # Puerto local del endpoint /metrics de Prometheus (0 = desactivado)
+
+# Checkpoint configuration
+CHECKPOINT_FILE = "crawl_checkpoint.json"
+CHECKPOINT_INTERVAL = 30  # Segundos entre checkpoints
 
 # Variables compartidas y mecanismos de control
-visited = set()
+visited = SetStore()
 visited_lock = threading.Lock()
 total_data_size = 0
 size_lock = threading.Lock()
-queue = Queue()
+queue = None  # Frontier, se crea al iniciar el crawl
 output_lock = threading.Lock()
 last_request_time = 0
 rate_lock = threading.Lock()
 request_semaphore = Semaphore(REQUESTS_PER_SECOND)  # Control de rate
-cache_lock = threading.Lock()  # Lock para acceso al cache
+request_gate = ConcurrencyGate(MAX_THREADS)  # Requests abiertos a la vez; el límite lo mueve aimd
+aimd = None  # AIMDController si ADAPTIVE_CONCURRENCY
+visited_journal = VisitedJournal(VISITED_JOURNAL)
+revision_log = RevisionLog(REVISIONS_FILE)
+page_revisions = {}  # Título -> (revisión, etag) de las páginas descargadas que aún no se escriben
+incremental = None  # IncrementalCrawl con --incremental
+title_resolver = None  # TitleResolver si RESOLVE_REDIRECTS
+event_loop = None  # Loop del engine async; ahí links_to_enqueue solo consulta el mapa de redirects
+link_queue = None  # Páginas parseadas esperando que se encolen sus links (engine threads)
+link_threads = []
+frontier_store = None  # Store compartido con FRONTIER_SERVICE
+NOT_MODIFIED = object()  # Respuesta 304 a un request condicional
+edit_rate_batcher = None  # Se crea al iniciar el crawl
+parse_stage = None  # Pool de procesos de parseo, si PARSE_WORKERS > 0
+fetch_busy_seconds = 0.0  # Tiempo total de los threads de fetch esperando la red
+fetch_lock = threading.Lock()
+shard_writer = None  # ShardWriter en el modo de salida shards
+output_bytes = 0  # Bytes escritos en el archivo de salida (offset para el checkpoint)
+last_checkpoint = time.monotonic()
+first_fetch_at = None  # perf_counter del primer request de HTML
+summary_stop = threading.Event()
+hdfs_check = None  # Thread que prepara HDFS mientras arranca el crawl
+uploader = None  # ShardUploader con WEBHDFS_URL
 
 def run_command(cmd):
     """Execute subprocess command with error handling"""
@@ -68,6 +159,10 @@ def run_command(cmd):
         if e.stderr:
             print(f"Error output: {e.stderr}")
         return False
+    except OSError as e:
+        # Por ejemplo docker no instalado
+        print(f"Error: {e}")
+        return False
 
 def setup_hdfs_environment():
     """Setup local folder and HDFS environment"""
@@ -113,243 +208,546 @@ def check_hdfs_status():
         "hdfs", "dfsadmin", "-report"
     ])
 
+def prepare_hdfs():
+    print("Setting up HDFS environment...")
+    if not setup_hdfs_environment():
+        print("Failed to setup HDFS environment. Continuing with local storage only.")
+    check_hdfs_status()
+
+def start_hdfs_check():
+    """Prepara HDFS en un thread aparte: el dfsadmin -report no frena el primer fetch"""
+    global hdfs_check
+    hdfs_check = threading.Thread(target=prepare_hdfs, daemon=True)
+    hdfs_check.start()
+
+def new_visited_store():
+    return create_visited_store(VISITED_STORE, VISITED_STORE_CAPACITY, BLOOM_FP_RATE)
+
 def load_visited_cache():
-    """Carga las páginas visitadas desde el archivo de cache"""
+    """Carga las páginas visitadas desde el journal (o migra el cache JSON anterior)"""
     global visited
-    if os.path.exists(CACHE_FILE):
+    start = time.perf_counter()
+    visited = new_visited_store()
+    if visited_journal.exists():
+        try:
+            if VISITED_STORE == "set":
+                visited = SetStore(visited_journal.load())
+            else:
+                # Los stores compactos se llenan en streaming para no armar el set de títulos
+                visited.update(visited_journal.iter_titles())
+            print(f"Loaded {len(visited)} previously visited pages from cache in {time.perf_counter() - start:.2f}s")
+        except IOError as e:
+            print(f"Error loading cache file: {e}")
+            visited = new_visited_store()
+    elif os.path.exists(CACHE_FILE):
         try:
             with open(CACHE_FILE, 'r', encoding='utf-8') as f:
                 cache_data = json.load(f)
-                visited = set(cache_data.get('visited_pages', []))
-                print(f"Loaded {len(visited)} previously visited pages from cache")
+            titles = cache_data.get('visited_pages', [])
+            visited.update(titles)
+            # Migrar al formato de journal para los siguientes arranques
+            visited_journal.compact(titles)
+            print(f"Migrated {len(visited)} visited pages from {CACHE_FILE} to {VISITED_JOURNAL}")
         except (json.JSONDecodeError, IOError) as e:
             print(f"Error loading cache file: {e}")
-            visited = set()
+            visited = new_visited_store()
     else:
-        visited = set()
         print("No cache file found, starting fresh")
 
 def save_visited_cache():
-    """Guarda las páginas visitadas al archivo de cache"""
+    """Compacta el journal de páginas visitadas en su snapshot"""
     try:
-        with cache_lock:
-            cache_data = {
-                'visited_pages': list(visited),
-                'last_updated': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        if isinstance(visited, SetStore):
+            with visited_lock:
+                titles = list(visited)
+            visited_journal.compact(titles)
+        else:
+            # Los stores compactos no guardan los títulos; el journal ya los tiene todos
+            visited_journal.checkpoint()
+        revision_log.flush()
     except IOError as e:
         print(f"Error saving cache file: {e}")
 
 def add_to_visited_cache(page_id):
-    """Añade una página al cache de visitadas y actualiza el archivo"""
+    """Añade una página al store de visitadas y la agrega al journal"""
     with visited_lock:
-        if page_id not in visited:
-            visited.add(page_id)
-            # Actualizar el cache cada 10 páginas para no sobrecargar el I/O
-            if len(visited) % 10 == 0:
-                threading.Thread(target=save_visited_cache, daemon=True).start()
-            return True
-    return False
+        if not visited.add(page_id):
+            return False
+    visited_journal.append(page_id)
+    return True
 
 def is_page_visited(page_id):
     """Verifica si una página ya ha sido visitada"""
     with visited_lock:
         return page_id in visited
 
-class RateLimiter:
-    def __init__(self, rate):
-        self.rate = rate
-        self.tokens = rate
-        self.last_check = time.time()
-        self.lock = threading.Lock()
-
-    def consume(self):
-        with self.lock:
-            now = time.time()
-            elapsed = now - self.last_check
-            self.last_check = now
-            
-            # Añadir tokens basados en el tiempo transcurrido
-            self.tokens += elapsed * self.rate
-            if self.tokens > self.rate:
-                self.tokens = self.rate
-            
-            if self.tokens >= 1:
-                self.tokens -= 1
-                return True
-            return False
-
 # Global rate limiter
 rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
 
-def clean_and_process_text(text):
-    text = re.sub(r'[^\w\s]', '', text, flags=re.UNICODE).lower()
-    words = text.split()
-    return [word for word in words if word not in EXCLUDED_WORDS]
+# Pool de conexiones keep-alive compartido (un slot por thread)
+http_pool = SessionPool(MAX_THREADS, HEADERS)
+async_pool_stats = AsyncPoolStats()
 
-def generate_ngrams(words, n):
-    return [' '.join(gram) for gram in ngrams(words, n)] if len(words) >= n else []
+# Métricas por etapa (metrics.py); se leen en /metrics y en la línea de resumen
+metrics = Registry()
+fetch_seconds = metrics.histogram("crawler_fetch_seconds", "Latency of REST HTML requests")
+parse_seconds = metrics.histogram("crawler_parse_seconds", "HTML extraction and tokenization time per page")
+ngram_seconds = metrics.histogram("crawler_ngram_seconds", "Bigram and trigram generation time per page")
+edit_rate_seconds = metrics.histogram("crawler_edit_rate_request_seconds",
+                                      "Latency of action API requests made for edits_per_day")
+output_lock_wait_seconds = metrics.histogram("crawler_output_lock_wait_seconds",
+                                             "Time spent waiting for the output writer lock")
+pages_written = metrics.counter("crawler_pages_written_total", "Records written to the output")
+record_bytes_written = metrics.counter("crawler_record_bytes_total", "Bytes of JSON records written")
+fetch_errors = metrics.counter("crawler_fetch_errors_total", "REST HTML requests that failed or got an error status")
+metrics.gauge("crawler_queue_depth", "Titles waiting in the frontier", lambda: queue.qsize() if queue is not None else 0)
+metrics.gauge("crawler_edit_rate_pending", "Parsed pages waiting for their edits_per_day",
+              lambda: edit_rate_batcher.backlog() if edit_rate_batcher is not None else 0)
+metrics.counter_fn("crawler_rate_limiter_wait_seconds_total", "Time requests waited for rate limiter tokens",
+                   lambda: rate_limiter.total_wait)
+throttled_responses = metrics.counter("crawler_throttled_responses_total", "Responses with status 429 or 503")
+metrics.counter_fn("crawler_title_resolution_requests_total", "Action API requests made to resolve link redirects",
+                   lambda: title_resolver.api_requests if title_resolver is not None else 0)
+metrics.gauge("crawler_concurrency_limit", "Requests allowed in flight at once", lambda: request_gate.limit)
+metrics.gauge("crawler_rate_limit", "Current rate limiter rate in requests per second", lambda: rate_limiter.rate)
 
 def get_page_html_rest(title):
-    global last_request_time
-    
-    # Esperar nuestro turno para cumplir con el rate limit
-    while not rate_limiter.consume():
-        time.sleep(0.001)  # Espera activa muy corta
-    
     url = REST_API_HTML + quote(title.replace(' ', '_'))
-    try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        if resp.status_code == 200:
-            return resp.text
-        else:
-            print(f"[{resp.status_code}] Failed to fetch {title}")
+    headers = incremental.conditional_headers(title) if incremental is not None else None
+    for attempt in range(FETCH_RETRIES + 1):
+        # Esperar nuestro turno para cumplir con el rate limit
+        rate_limiter.acquire(HTML_REQUEST_COST)
+        request_gate.acquire()
+        start = time.perf_counter()
+        note_first_fetch(start)
+        resp = None
+        try:
+            resp = http_pool.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            fetch_errors.inc()
+            print(f"Request error fetching {title}: {str(e)}")
+        finally:
+            seconds = time.perf_counter() - start
+            request_gate.release()
+            add_fetch_time(seconds)
+        status = resp.status_code if resp is not None else None
+        retry = observe_response(seconds, status, resp.headers if resp is not None else None)
+        if status == 200:
+            page_revisions[title] = revision_from_headers(resp.headers)
+            # Bytes crudos: se decodifican en la etapa de parseo
+            return resp.content
+        if status == 304:
+            return NOT_MODIFIED
+        if status is not None:
+            fetch_errors.inc()
+            print(f"[{status}] Failed to fetch {title}")
+        if not retry or attempt == FETCH_RETRIES:
             return None
-    except requests.RequestException as e:
-        print(f"Request error fetching {title}: {str(e)}")
-        return None
 
-def extract_links(soup):
-    links = set()
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        if href.startswith('/wiki/'):
-            if ':' not in href and '#' not in href:
-                full_url = urljoin(BASE_WIKI, href)
-                links.add(full_url)
-        elif href.startswith('./'):
-            clean_href = href[2:]
-            if clean_href and ':' not in clean_href and '#' not in clean_href:
-                full_url = BASE_WIKI + clean_href
-                links.add(full_url)
-        elif 'wikipedia.org/wiki/' in href:
-            if ':' not in href.split('/wiki/')[-1] and '#' not in href:
-                links.add(href)
-    
-    return list(links)
+def observe_response(seconds, status, headers, latency_sample=True):
+    """Pasa una respuesta al controlador AIMD; retorna True si vale la pena reintentar el request.
+
+    status None es un error de red. Sin controlador, un Retry-After igual pausa el rate limiter.
+    """
+    throttled = status is None or status in THROTTLE_STATUSES
+    retry_after = headers.get("Retry-After") if headers is not None else None
+    if status in THROTTLE_STATUSES:
+        throttled_responses.inc()
+    if aimd is not None:
+        if latency_sample or throttled:
+            aimd.observe(seconds, status, retry_after)
+    elif throttled:
+        wait = retry_after_seconds(retry_after)
+        if wait:
+            rate_limiter.pause(wait)
+    return throttled
+
+def note_first_fetch(start):
+    global first_fetch_at
+    if first_fetch_at is None:
+        first_fetch_at = start
+
+def add_fetch_time(seconds):
+    global fetch_busy_seconds
+    fetch_seconds.observe(seconds)
+    with fetch_lock:
+        fetch_busy_seconds += seconds
+
+def fetch_api_json(params):
+    """GET al action API respetando el rate limit"""
+    rate_limiter.acquire(API_REQUEST_COST)
+    request_gate.acquire()
+    start = time.perf_counter()
+    resp = None
+    try:
+        resp = http_pool.get(API_URL, params=params, timeout=REQUEST_TIMEOUT)
+    finally:
+        request_gate.release()
+        # La latencia del action API no se compara con la del HTML; solo cuentan los 429/503
+        observe_response(time.perf_counter() - start, resp.status_code if resp is not None else None,
+                         resp.headers if resp is not None else None, latency_sample=False)
+    return resp.json()
+
+def fetch_edit_rate_json(params):
+    """fetch_api_json para el batcher de edits_per_day, midiendo cada request"""
+    start = time.perf_counter()
+    try:
+        return fetch_api_json(params)
+    finally:
+        edit_rate_seconds.observe(time.perf_counter() - start)
 
 def get_edit_rate(title):
-    # También aplicamos rate limiting a las llamadas a la API
-    while not rate_limiter.consume():
-        time.sleep(0.001)
-    
     try:
-        params = {
-            "action": "query",
-            "format": "json",
-            "prop": "revisions",
-            "rvlimit": "500",
-            "rvprop": "timestamp",
-            "titles": title
-        }
-        resp = requests.get(API_URL, params=params, headers=HEADERS, timeout=10)
-        data = resp.json()
-        pages = data.get('query', {}).get('pages', {})
-        for page in pages.values():
-            revisions = page.get('revisions', [])
-            if len(revisions) < 2:
-                return 0
-            timestamps = [time.strptime(r["timestamp"], "%Y-%m-%dT%H:%M:%SZ") for r in revisions]
-            timestamps.sort()
-            start = time.mktime(timestamps[0])
-            end = time.mktime(timestamps[-1])
-            days = max((end - start) / (60 * 60 * 24), 1)
-            return round(len(revisions) / days, 2)
+        return edit_rate_from_response(fetch_api_json(edit_rate_params(title)))
     except Exception as e:
         print(f"Error getting edit rate for {title}: {str(e)}")
         return 0
 
-def process_page(title, depth, file_handle):
+def reserve_record_size(item):
+    """Suma el tamaño del registro al total antes de escribirlo, con edits_per_day en 0"""
     global total_data_size
+    size = len(json.dumps(item, ensure_ascii=False).encode('utf-8'))
+    with size_lock:
+        total_data_size += size
+
+def write_page_record(item, depth, file_handle, title):
+    """Escribe el registro en el archivo de salida y marca la página como visitada"""
+    global total_data_size, output_bytes
+
+    json_line = json.dumps(item, ensure_ascii=False)
+    line_bytes = len(json_line.encode('utf-8')) + 1
+
+    if shard_writer is not None:
+        # Cada thread escribe en su propio shard, sin output_lock; el shard writer
+        # llama a mark_written cuando el buffer llega al archivo
+        shard_writer.write(json_line, title, item)
+    else:
+        wait_start = time.perf_counter()
+        with output_lock:
+            output_lock_wait_seconds.observe(time.perf_counter() - wait_start)
+            file_handle.write(json_line + "\n")
+            file_handle.flush()
+            output_bytes += line_bytes
+            mark_written([title])
     
-    # Verificar si ya visitamos esta página
-    if is_page_visited(title):
-        print(f"Skipping already visited page: {title}")
-        return
+    with size_lock:
+        # El tamaño se reservó con edits_per_day = 0; solo falta la diferencia
+        total_data_size += len(json.dumps(item["edits_per_day"])) - 1
     
-    html = get_page_html_rest(title)
-    if not html:
+    pages_written.inc()
+    record_bytes_written.inc(line_bytes)
+    if LOG_EVERY_PAGE:
+        print(f"Crawled: {item['title']} | Depth: {depth} | Links: {len(item['links'])} | Size: {total_data_size / (1024 * 1024):.2f} MB")
+
+    if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+        write_checkpoint(file_handle)
+
+def mark_written(titles):
+    """Marca como visitadas las páginas cuyo registro ya está en la salida.
+
+    Una página cuenta como visitada recién aquí, así un checkpoint nunca da
+    por visitada una página que no se escribió.
+    """
+    for title in titles:
+        add_to_visited_cache(title)
+        revision = page_revisions.pop(title, None)
+        if revision is not None:
+            revision_log.append(title, *revision)
+        queue.release(title)
+
+def close_shard_writer():
+    if shard_writer is not None:
+        shard_writer.close()
+
+def write_checkpoint(file_handle):
+    """Guarda la frontera y la posición de la salida para poder reanudar con --resume"""
+    if queue is None:
         return
+    # Mientras se guarda no se escribe ni se libera ningún registro: frontera y posición quedan consistentes
+    if shard_writer is not None:
+        with shard_writer.checkpoint() as positions:
+            state = queue.snapshot()
+            state["shards"] = positions
+            save_checkpoint_state(state)
+    else:
+        with output_lock:
+            state = queue.snapshot()
+            state["output_offset"] = output_bytes
+            os.fsync(file_handle.fileno())
+            save_checkpoint_state(state)
 
-    # Marcar como visitada después de obtener el HTML exitosamente
-    add_to_visited_cache(title)
+def save_checkpoint_state(state):
+    global last_checkpoint
+    state["start_title"] = START_TITLE
+    visited_journal.flush()
+    revision_log.flush()
+    try:
+        save_checkpoint(CHECKPOINT_FILE, state)
+    except IOError as e:
+        print(f"Error saving checkpoint: {e}")
+    last_checkpoint = time.monotonic()
 
-    soup = BeautifulSoup(html, "html.parser")
-    text_blocks = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5'])
-    full_text = " ".join(block.get_text(separator=" ", strip=True) for block in text_blocks)
+def records_after_checkpoint(state, file_handle):
+    if shard_writer is not None:
+        return shard_writer.iter_records_after(state.get("shards", {}))
+    return iter_records_after(file_handle.name, state.get("output_offset", 0))
 
-    page_title_tag = soup.find('h1')
-    page_title = page_title_tag.text.strip() if page_title_tag else title.replace('_', ' ')
+def restore_checkpoint(frontier, state, file_handle):
+    """Reencola la frontera de un checkpoint y recupera lo escrito después de él"""
+    depths = {}
+    for depth, titles in state.get("pending", {}).items():
+        for title in titles:
+            depths[title] = int(depth)
+    # Las páginas que estaban en vuelo se vuelven a pedir
+    depths.update(state.get("in_flight", {}))
 
-    word_list = clean_and_process_text(full_text)
-    bigrams = generate_ngrams(word_list, 2)
-    trigrams = generate_ngrams(word_list, 3)
-    edits_per_day = get_edit_rate(page_title)
-    links = extract_links(soup)
+    # Los registros escritos después del checkpoint ya están en la salida: se dan por
+    # visitados y sus links se encolan como lo habría hecho finish_page
+    recovered = 0
+    for record in records_after_checkpoint(state, file_handle):
+        title = unquote(record["url"].split("/wiki/")[-1])
+        add_to_visited_cache(title)
+        recovered += 1
+        depth = depths.get(title)
+        if depth is not None:
+            for link_title in links_to_enqueue(record, depth):
+                depths.setdefault(link_title, depth + 1)
 
-    item = {
-        "url": BASE_WIKI + quote(title.replace(' ', '_')),
-        "title": page_title,
-        "word_list": word_list,
-        "bigrams": bigrams,
-        "trigrams": trigrams,
-        "edits_per_day": edits_per_day,
-        "links": links
-    }
+    restored = 0
+    for title, depth in sorted(depths.items(), key=lambda entry: entry[1]):
+        if not is_page_visited(title) and frontier.put_nowait((title, depth)):
+            restored += 1
+    print(f"Resumed from checkpoint of {state.get('updated')}: {restored} pages queued, "
+          f"{recovered} records recovered after the checkpoint")
 
-    json_line = json.dumps(item, ensure_ascii=False)
-    
-    with output_lock:
-        file_handle.write(json_line + "\n")
-        file_handle.flush()
-    
-    with size_lock:
-        total_data_size += len(json_line.encode('utf-8'))
-        if total_data_size >= MAX_DATA_SIZE:
-            # Vaciar la cola si alcanzamos el límite de tamaño
-            while not queue.empty():
-                try:
-                    queue.get_nowait()
-                    queue.task_done()
-                except:
-                    pass
-    
-    print(f"Crawled: {page_title} | Depth: {depth} | Links: {len(links)} | Size: {total_data_size / (1024 * 1024):.2f} MB")
+def links_to_enqueue(item, depth, canonical=None):
+    """Títulos canónicos de los links que todavía no se han visitado.
+
+    canonical es un mapa ya resuelto (resolve_link_titles). Sin él, el
+    engine de threads resuelve acá mismo y el async usa solo el mapa en
+    memoria, porque un request bloquearía el event loop.
+    """
+    # Solo se encolan links nuevos si no hemos alcanzado el límite
+    if depth >= MAX_DEPTH or total_data_size >= MAX_DATA_SIZE:
+        return []
+    new_titles = [title for title in link_titles(item) if not is_page_visited(title)]
+    if title_resolver is None:
+        return new_titles
+    if canonical is None:
+        canonical = title_resolver.lookup(new_titles) if event_loop is not None else title_resolver.resolve(new_titles)
+    # Redirects y variantes de una misma página quedan en un solo título; None es una página inexistente
+    resolved = (canonical.get(title, title) for title in new_titles)
+    return [title for title in dict.fromkeys(resolved) if title and not is_page_visited(title)]
+
+def link_titles(item):
+    return list(dict.fromkeys(title_from_link(link_url) for link_url in item["links"]))
+
+def resolve_link_titles(pages):
+    """Resuelve de una vez los links de varias páginas (item, depth); None si no hay nada que resolver"""
+    if title_resolver is None or total_data_size >= MAX_DATA_SIZE:
+        return None
+    titles = [title for item, depth in pages if depth < MAX_DEPTH
+              for title in link_titles(item) if not is_page_visited(title)]
+    return title_resolver.resolve(list(dict.fromkeys(titles))) if titles else None
+
+async def resolve_links_async(item, depth):
+    """Mapa canónico de los links de item, resuelto en un thread para no bloquear el event loop"""
+    if title_resolver is None:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(None, resolve_link_titles, [(item, depth)])
+
+def new_frontier():
+    if frontier_store is not None:
+        return DistributedFrontier(frontier_store, WORKER_ID, claim_size=2 * MAX_THREADS)
+    # El set de encolados usa el mismo tipo de store que las visitadas
+    seen = create_visited_store(VISITED_STORE, VISITED_STORE_CAPACITY, BLOOM_FP_RATE)
+    if FRONTIER_ORDER == "priority":
+        scorer = SCORERS[FRONTIER_SCORER]
+        if SKIP_PREFIXES:
+            scorer = skip_prefixes(scorer, SKIP_PREFIXES)
+        return PriorityFrontier(scorer, FRONTIER_MEMORY_LIMIT, FRONTIER_SPILL_DIR, seen)
+    return Frontier(FRONTIER_MEMORY_LIMIT, FRONTIER_SPILL_DIR, seen)
+
+def finish_page(item, depth, frontier, title, canonical=None):
+    """Pide el edits_per_day del registro parseado y encola sus links en frontier"""
+    reserve_record_size(item)
+    # El registro se escribe cuando llegue su edits_per_day
+    edit_rate_batcher.submit(item, depth, title)
+    enqueue_links(item, depth, frontier, canonical)
+
+def carry_forward_record(title, depth, file_handle, not_modified=False):
+    """Copia el registro de la corrida anterior de una página que no cambió, con su edits_per_day"""
+    item, page_revisions[title] = incremental.carry_forward(title, not_modified)
+    edits_per_day = item["edits_per_day"]
+    item["edits_per_day"] = 0
+    reserve_record_size(item)
+    item["edits_per_day"] = edits_per_day
+    write_page_record(item, depth, file_handle, title)
+    return item
+
+def carry_forward(title, depth, frontier, file_handle, not_modified=False):
+    item = carry_forward_record(title, depth, file_handle, not_modified)
+    enqueue_links(item, depth, frontier)
+
+def enqueue_links(item, depth, frontier, canonical=None):
+    if total_data_size >= MAX_DATA_SIZE:
+        # Vaciar la cola si alcanzamos el límite de tamaño
+        frontier.clear()
+    for link_title in links_to_enqueue(item, depth, canonical):
+        frontier.put_nowait((link_title, depth + 1))
+
+def start_link_stage():
+    """Threads que terminan las páginas parseadas: el callback de la etapa de parseo no hace I/O"""
+    global link_queue, link_threads
+    link_queue = Queue()
+    link_threads = [threading.Thread(target=link_worker, daemon=True) for _ in range(LINK_WORKERS)]
+    for t in link_threads:
+        t.start()
+
+def stop_link_stage():
+    if link_queue is None:
+        return
+    for _ in link_threads:
+        link_queue.put(None)
+    for t in link_threads:
+        t.join()
 
-    # Añadir nuevos links a la cola si no hemos alcanzado el límite
-    if depth < MAX_DEPTH and total_data_size < MAX_DATA_SIZE:
-        for link_url in links:
-            link_title = unquote(link_url.split("/wiki/")[-1])
-            if not is_page_visited(link_title):
-                queue.put((link_title, depth + 1))
+def link_worker():
+    """Toma las páginas parseadas que haya (hasta LINK_BATCH_PAGES), resuelve sus links juntos y las termina"""
+    while True:
+        pages = [link_queue.get()]
+        while pages[-1] is not None and len(pages) < LINK_BATCH_PAGES:
+            try:
+                pages.append(link_queue.get_nowait())
+            except Empty:
+                break
+        stop = pages[-1] is None
+        if stop:
+            pages.pop()
+        canonical = None
+        try:
+            canonical = resolve_link_titles([(item, depth) for item, depth, _ in pages])
+        except Exception as e:
+            print(f"Error resolving links: {str(e)}")
+        for item, depth, title in pages:
+            try:
+                finish_page(item, depth, queue, title, canonical)
+            except Exception as e:
+                print(f"Error finishing page {title}: {str(e)}")
+                queue.release(title)
+            finally:
+                queue.task_done()
+        if stop:
+            return
+
+def process_page(title, depth, file_handle):
+    """Descarga y procesa una página. Retorna True si el parseo quedó en la etapa de parseo,
+    en cuyo caso es esa etapa la que marca la tarea de la cola como terminada"""
+    # Verificar si ya visitamos esta página
+    if is_page_visited(title):
+        print(f"Skipping already visited page: {title}")
+        queue.release(title)
+        return False
+
+    if incremental is not None and incremental.is_unchanged(title):
+        carry_forward(title, depth, queue, file_handle)
+        return False
+
+    html = get_page_html_rest(title)
+    if html is NOT_MODIFIED:
+        carry_forward(title, depth, queue, file_handle, not_modified=True)
+        return False
+    if not html:
+        queue.release(title)
+        return False
+
+    # La página se marca como visitada al escribir su registro (write_page_record)
+    if parse_stage is None:
+        finish_page(parse_inline(title, html), depth, queue, title)
+        return False
+
+    def on_parsed(item):
+        # Corre en el thread del pool de parseo: los requests de links van en los threads de links
+        if item is not None:
+            link_queue.put((item, depth, title))
+        else:
+            queue.release(title)
+            queue.task_done()
+
+    parse_stage.submit(title, html, on_parsed)
+    return True
 
 def worker(file_handle):
     while True:
+        title = None
         try:
-            title, depth = queue.get(timeout=5)  # Timeout más corto para responder más rápido al cierre
-            
+            try:
+                title, depth = queue.get(timeout=1)
+            except Empty:
+                # Los links se encolan después del parseo, así que la cola puede estar vacía un momento
+                # con páginas todavía en vuelo; el crawl termina recién cuando no queda ninguna
+                if queue.unfinished_tasks == 0 or isinstance(queue, DistributedFrontier):
+                    break
+                continue
+
             if total_data_size >= MAX_DATA_SIZE:
+                queue.release(title)
                 queue.task_done()
                 break
                 
-            process_page(title, depth, file_handle)
-            queue.task_done()
-        except Queue.Empty:
-            break
+            if not process_page(title, depth, file_handle):
+                queue.task_done()
         except Exception as e:
             print(f"Error in worker thread: {str(e)}")
-            queue.task_done()
+            if title is not None:
+                queue.release(title)
+                queue.task_done()
 
-def crawl_rest(start_title, file_handle):
-    global total_data_size
+def observe_parse_timings(timings):
+    parse_seconds.observe(timings["parse"])
+    if not COMPACT_RECORDS:
+        ngram_seconds.observe(timings["ngrams"])
+
+def parse_inline(title, html):
+    """Parseo en el mismo thread (o event loop) del fetch, cuando no hay etapa de parseo"""
+    item, timings = build_page_record_timed(title, html, PARSER_BACKEND, COMPACT_RECORDS, STOPWORDS)
+    observe_parse_timings(timings)
+    return item
+
+def start_edit_rate_batcher(file_handle):
+    global edit_rate_batcher
+    edit_rate_batcher = EditRateBatcher(
+        fetch_edit_rate_json,
+        lambda item, depth, title: write_page_record(item, depth, file_handle, title),
+        # Solo el mapa: el request de revisiones sigue los redirects que el mapa no conozca
+        title_resolver.lookup if title_resolver is not None else None,
+        EDIT_RATE_WORKERS,
+    )
+
+def start_parse_stage(workers):
+    global parse_stage
+    if workers > 0:
+        parse_stage = ParseStage(workers, PARSE_QUEUE_SIZE, PARSER_BACKEND, COMPACT_RECORDS, STOPWORDS,
+                                 on_timings=observe_parse_timings)
+
+def stop_parse_stage():
+    if parse_stage is not None:
+        parse_stage.close()
+
+def crawl_rest(start_title, file_handle, parse_workers=PARSE_WORKERS, resume_state=None):
+    global total_data_size, queue
     
     # Cargar cache de páginas visitadas al inicio
     load_visited_cache()
+    queue = new_frontier()
+    start_edit_rate_batcher(file_handle)
+    start_parse_stage(parse_workers)
+    start_link_stage()
     
+    if resume_state is not None:
+        restore_checkpoint(queue, resume_state, file_handle)
     # Solo añadir la página inicial si no ha sido visitada
-    if not is_page_visited(start_title):
+    elif not is_page_visited(start_title):
         queue.put((start_title, 0))
     else:
         print(f"Start page {start_title} already visited, loading from cache")
@@ -362,54 +760,462 @@ def crawl_rest(start_title, file_handle):
         t.start()
         threads.append(t)
     
-    # Esperar a que se complete la cola
-    queue.join()
-    
-    # Esperar a que todos los threads terminen
-    for t in threads:
-        t.join()
+    try:
+        # Esperar a que se complete la cola (incluye las páginas en la etapa de parseo)
+        queue.join()
+        
+        # Esperar a que todos los threads terminen
+        for t in threads:
+            t.join()
+    finally:
+        stop_parse_stage()
+        stop_link_stage()
+        # Escribir los registros que aún esperan su edits_per_day
+        edit_rate_batcher.close()
+        close_shard_writer()
+        write_checkpoint(file_handle)
     
     # Guardar el cache final
     save_visited_cache()
 
-def main():
+async def get_page_html_async(session, title):
+    url = REST_API_HTML + quote(title.replace(' ', '_'))
+    headers = incremental.conditional_headers(title) if incremental is not None else None
+    for attempt in range(FETCH_RETRIES + 1):
+        await rate_limiter.acquire_async(HTML_REQUEST_COST)
+        await request_gate.acquire_async()
+        start = time.perf_counter()
+        note_first_fetch(start)
+        status, response_headers, body = None, None, None
+        try:
+            async with session.get(url, headers=headers) as resp:
+                status, response_headers = resp.status, resp.headers
+                if status == 200:
+                    body = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = None
+            fetch_errors.inc()
+            print(f"Request error fetching {title}: {str(e)}")
+        finally:
+            seconds = time.perf_counter() - start
+            request_gate.release()
+            add_fetch_time(seconds)
+        retry = observe_response(seconds, status, response_headers)
+        if status == 200:
+            page_revisions[title] = revision_from_headers(response_headers)
+            return body
+        if status == 304:
+            return NOT_MODIFIED
+        if status is not None:
+            fetch_errors.inc()
+            print(f"[{status}] Failed to fetch {title}")
+        if not retry or attempt == FETCH_RETRIES:
+            return None
+
+async def process_page_async(session, title, depth, file_handle, frontier):
+    """Misma semántica que process_page, pero sobre el event loop"""
+    if is_page_visited(title):
+        print(f"Skipping already visited page: {title}")
+        frontier.release(title)
+        return
+
+    if incremental is not None and incremental.is_unchanged(title):
+        await carry_forward_async(title, depth, frontier, file_handle)
+        return
+
+    html = await get_page_html_async(session, title)
+    if html is NOT_MODIFIED:
+        await carry_forward_async(title, depth, frontier, file_handle, not_modified=True)
+        return
+    if not html:
+        frontier.release(title)
+        return
+
+    if parse_stage is None:
+        item = parse_inline(title, html)
+    else:
+        item = await parse_stage.parse_async(title, html)
+    if item is not None:
+        # Los requests de resolución corren en un thread; finish_page solo usa el mapa ya resuelto
+        finish_page(item, depth, frontier, title, await resolve_links_async(item, depth))
+    else:
+        frontier.release(title)
+
+async def carry_forward_async(title, depth, frontier, file_handle, not_modified=False):
+    item = carry_forward_record(title, depth, file_handle, not_modified)
+    enqueue_links(item, depth, frontier, await resolve_links_async(item, depth))
+
+async def async_worker(session, frontier, file_handle):
+    while True:
+        title, depth = await frontier.get()
+        try:
+            if total_data_size < MAX_DATA_SIZE:
+                await process_page_async(session, title, depth, file_handle, frontier)
+            else:
+                frontier.release(title)
+        except Exception as e:
+            print(f"Error in async worker: {str(e)}")
+            frontier.release(title)
+        finally:
+            frontier.task_done()
+
+async def crawl_async(start_title, file_handle, max_inflight=MAX_INFLIGHT_REQUESTS, parse_workers=PARSE_WORKERS,
+                      resume_state=None):
+    """Engine async: un solo event loop con hasta max_inflight requests abiertos"""
+    global queue, aiohttp, event_loop
+    aiohttp = import_aiohttp()
+    event_loop = asyncio.get_running_loop()
+
+    load_visited_cache()
+    start_edit_rate_batcher(file_handle)
+    start_parse_stage(parse_workers)
+
+    queue = new_frontier()
+    frontier = AsyncFrontier(queue)
+    if resume_state is not None:
+        restore_checkpoint(frontier, resume_state, file_handle)
+    elif not is_page_visited(start_title):
+        frontier.put_nowait((start_title, 0))
+    else:
+        print(f"Start page {start_title} already visited, loading from cache")
+
+    session = create_async_session(max_inflight, HEADERS, REQUEST_TIMEOUT, async_pool_stats)
+    async with session:
+        # Un worker por request simultáneo permitido
+        workers = [
+            asyncio.create_task(async_worker(session, frontier, file_handle))
+            for _ in range(max_inflight)
+        ]
+        try:
+            await frontier.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # La etapa de parseo y el batcher usan sus propios threads; se cierran fuera del event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, stop_parse_stage)
+            await loop.run_in_executor(None, edit_rate_batcher.close)
+            close_shard_writer()
+            write_checkpoint(file_handle)
+
+    save_visited_cache()
+
+def new_shard_writer(args):
+    max_bytes = int(args.shard_size_mb * 1024 * 1024)
+    if args.format == "parquet":
+        return ParquetWriter(LOCAL_FOLDER, args.compression, max_bytes, PARQUET_ROW_GROUP_RECORDS,
+                             on_flushed=mark_written, on_closed=upload_closed_file)
+    return ShardWriter(LOCAL_FOLDER, args.compression, max_bytes, SHARD_BUFFER_BYTES, on_flushed=mark_written,
+                       on_closed=upload_closed_file)
+
+def start_uploader(url):
+    """Sube por WebHDFS; en un crawl distribuido cada worker usa su propio subdirectorio"""
+    global uploader
+    target_dir = HDFS_TARGET_DIR + (f"/worker-{WORKER_ID}" if frontier_store is not None else "")
+    uploader = ShardUploader(WebHDFSClient(url, HDFS_USER), target_dir, UPLOAD_WORKERS, UPLOAD_CHUNK_BYTES)
+    print(f"Uploading closed output files to {url}{target_dir} during the crawl")
+
+def upload_closed_file(path):
+    if uploader is not None:
+        uploader.submit(path)
+
+def finish_uploads(output_file):
+    """Espera las subidas pendientes y sube lo que solo está completo al final (manifest o wiki_data.jsonl)"""
+    failed = uploader.wait()
+    # El manifest va último: si está en HDFS, los shards que lista también
+    uploader.submit(shard_writer.manifest_path if shard_writer is not None else output_file)
+    failed += uploader.wait()
+    print(f"WebHDFS upload: {uploader.report()}")
+    if failed:
+        print(f"{failed} uploads failed; the local files in {LOCAL_FOLDER} are intact")
+    uploader.close()
+
+def stage_summary():
+    def ms(histogram, q):
+        return f"{1000 * histogram.quantile(q):.1f}"
+    pending = edit_rate_batcher.backlog() if edit_rate_batcher is not None else 0
+    return (f"queue {queue.qsize() if queue is not None else 0}, {pending} awaiting edit rate | "
+            f"fetch p50/p95 {ms(fetch_seconds, 0.5)}/{ms(fetch_seconds, 0.95)} ms | "
+            f"parse p50 {ms(parse_seconds, 0.5)} ms | ngrams p50 {ms(ngram_seconds, 0.5)} ms | "
+            f"edit-rate p50 {ms(edit_rate_seconds, 0.5)} ms | limiter wait {rate_limiter.total_wait:.1f}s | "
+            f"limit {request_gate.limit} @ {rate_limiter.rate:.0f} req/s, {throttled_responses.value} throttled | "
+            f"writer lock p99 {ms(output_lock_wait_seconds, 0.99)} ms | {fetch_errors.value} fetch errors")
+
+def start_request_control(max_limit):
+    """Crea el gate de concurrencia y, con ADAPTIVE_CONCURRENCY, el controlador AIMD que lo mueve"""
+    global request_gate, aimd
+    request_gate = ConcurrencyGate(max_limit)
+    if ADAPTIVE_CONCURRENCY:
+        aimd = AIMDController(rate_limiter, request_gate, max_limit, REQUESTS_PER_SECOND)
+        print(f"Adaptive concurrency: starting at {aimd.limit} requests in flight, {aimd.rate:.0f} req/s "
+              f"(ceilings {max_limit} and {REQUESTS_PER_SECOND})")
+
+def start_title_resolver():
+    """Carga el mapa de redirects y resuelve el título inicial; retorna el título con el que empezar"""
+    global title_resolver
+    title_resolver = TitleResolver(fetch_api_json, REDIRECT_MAP_FILE, EDIT_RATE_BATCH_SIZE)
+    print(f"Redirect map: {title_resolver.loaded} titles loaded from {REDIRECT_MAP_FILE}")
+    start_title = title_resolver.resolve([START_TITLE])[START_TITLE]
+    if start_title is None:
+        print(f"Start page {START_TITLE} does not exist")
+        return START_TITLE
+    return start_title
+
+def start_summary(interval):
+    """Imprime cada interval segundos el throughput reciente y los tiempos por etapa"""
+    def report():
+        last_pages, last_time = 0, time.monotonic()
+        while not summary_stop.wait(interval):
+            pages, now = pages_written.value, time.monotonic()
+            print(f"[stats] {pages} pages ({(pages - last_pages) / (now - last_time):.1f}/s) | {stage_summary()}")
+            last_pages, last_time = pages, now
+    threading.Thread(target=report, daemon=True).start()
+
+def start_incremental(output_file, resuming):
+    """Prepara un crawl incremental a partir de la salida y las revisiones de la corrida anterior"""
+    global incremental
+    previous_output = output_file + PREVIOUS_SUFFIX
+    previous_revisions = REVISIONS_FILE + PREVIOUS_SUFFIX
+    if not resuming:
+        # Esta corrida escribe una salida nueva; la anterior queda como fuente de los registros sin cambios
+        for path, target in ((output_file, previous_output), (REVISIONS_FILE, previous_revisions)):
+            if os.path.exists(path):
+                os.replace(path, target)
+        # Todas las páginas se vuelven a recorrer para seguir sus links
+        visited_journal.compact([])
+    incremental = IncrementalCrawl(previous_output, load_revisions(previous_revisions))
+    if not incremental.revisions:
+        print(f"No previous revisions in {previous_revisions}, every page will be fetched")
+        return
+    start = time.perf_counter()
+    incremental.check(fetch_api_json, EDIT_RATE_BATCH_SIZE)
+    print(f"Checked {len(incremental.revisions)} previous pages in {incremental.api_requests} API requests "
+          f"({time.perf_counter() - start:.2f}s): {len(incremental.unchanged)} unchanged")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Wikipedia crawler with HDFS upload")
+    parser.add_argument("--engine", choices=["threads", "async"], default="threads",
+                        help="Crawl engine: OS threads (default) or a single asyncio event loop")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT_REQUESTS,
+                        help="Concurrent requests for the async engine")
+    parser.add_argument("--parser", choices=["auto", "selectolax", "lxml", "bs4"], default=PARSER_BACKEND,
+                        help="HTML parser backend (auto picks the fastest installed)")
+    parser.add_argument("--no-resolve-redirects", action="store_true", default=not RESOLVE_REDIRECTS,
+                        help="Enqueue link titles as found instead of resolving redirects and variants first")
+    parser.add_argument("--no-adaptive", action="store_true", default=not ADAPTIVE_CONCURRENCY,
+                        help="Keep concurrency and rate fixed instead of adjusting them to latency and 429/503")
+    parser.add_argument("--compact-records", action="store_true", default=COMPACT_RECORDS,
+                        help="Store only word_list; bigrams/trigrams are derived by the analyzer")
+    parser.add_argument("--stopwords", default=STOPWORDS,
+                        help="Stopwords removed from word_list: es, en, a file with one word per line, "
+                             "or a comma-separated union")
+    parser.add_argument("--quiet-pages", action="store_true",
+                        help="Do not print a line per crawled page (rely on the periodic summary)")
+    parser.add_argument("--summary-interval", type=float, default=SUMMARY_INTERVAL,
+                        help="Seconds between throughput/stage-timing summary lines (0 disables them)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (0 disables the endpoint)")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="Parser processes (0 parses inside the fetch threads)")
+    parser.add_argument("--visited-store", choices=["set", "fingerprint", "bloom"], default=VISITED_STORE,
+                        help="Visited-page structure: exact titles, 64-bit fingerprints or a Bloom filter")
+    parser.add_argument("--bloom-fp-rate", type=float, default=BLOOM_FP_RATE,
+                        help="False-positive rate for --visited-store bloom")
+    parser.add_argument("--output", choices=["jsonl", "shards"], default=OUTPUT_MODE,
+                        help="Single wiki_data.jsonl or size-rotated shards with a manifest")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default=OUTPUT_FORMAT,
+                        help="Record format; parquet always writes part files with a manifest")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default=OUTPUT_COMPRESSION,
+                        help="Compression for --output shards and --format parquet")
+    parser.add_argument("--shard-size-mb", type=float, default=SHARD_MAX_BYTES / (1024 * 1024),
+                        help="On-disk size at which a shard is closed and a new one started")
+    parser.add_argument("--frontier", choices=["fifo", "priority"], default=FRONTIER_ORDER,
+                        help="Crawl order: breadth-first by depth or highest score first")
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default=FRONTIER_SCORER,
+                        help="Score for --frontier priority: in-links seen so far or depth")
+    parser.add_argument("--skip-prefix", action="append", default=list(SKIP_PREFIXES),
+                        help="Title prefix that --frontier priority never enqueues (repeatable)")
+    parser.add_argument("--wiki-url", default=None,
+                        help="Fetch from another host with Wikipedia's paths, e.g. a local replay_server.py")
+    parser.add_argument("--record-cache", default=None, metavar="DIR",
+                        help="Save every HTTP response to a replay cache (threads engine only)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-crawl only pages whose revision changed; copy the rest from the previous output")
+    parser.add_argument("--webhdfs", default=WEBHDFS_URL, metavar="URL",
+                        help="Upload output files over WebHDFS as they close (e.g. http://namenode:9870)")
+    parser.add_argument("--upload-workers", type=int, default=UPLOAD_WORKERS,
+                        help="Parallel WebHDFS chunk uploads")
+    parser.add_argument("--skip-hdfs-check", action="store_true",
+                        help="Fast start: skip the HDFS directory setup and dfsadmin report")
+    parser.add_argument("--frontier-service", default=FRONTIER_SERVICE, metavar="URL",
+                        help="Distributed crawl: coordinator URL (http://host:port) or shared sqlite:///path")
+    parser.add_argument("--worker-id", type=int, default=WORKER_ID,
+                        help="This worker's partition in a distributed crawl")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker count, when creating a new sqlite frontier (the coordinator sets it otherwise)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue an interrupted crawl from {CHECKPOINT_FILE}, appending to the output file")
+    args = parser.parse_args(argv)
+    if args.record_cache and args.engine != "threads":
+        parser.error("--record-cache records through the requests session pool and needs --engine threads")
+    if args.incremental and (args.output != "jsonl" or args.format != "jsonl"):
+        parser.error("--incremental copies records from wiki_data.jsonl and needs --output jsonl --format jsonl")
+    if args.frontier_service and (args.engine != "threads" or args.frontier != "fifo"):
+        parser.error("--frontier-service polls the shared frontier from worker threads and needs "
+                     "--engine threads --frontier fifo")
+    return args
+
+def main(argv=None):
     """Main function with HDFS integration"""
-    # Setup HDFS environment
-    print("Setting up HDFS environment...")
-    if not setup_hdfs_environment():
-        print("Failed to setup HDFS environment. Continuing with local storage only.")
-    
-    # Check HDFS status
-    check_hdfs_status()
-    
+    global PARSER_BACKEND, VISITED_STORE, BLOOM_FP_RATE, total_data_size, output_bytes
+    global FRONTIER_ORDER, FRONTIER_SCORER, SKIP_PREFIXES, COMPACT_RECORDS, STOPWORDS, shard_writer
+    global REST_API_HTML, API_URL, http_pool, LOG_EVERY_PAGE, ADAPTIVE_CONCURRENCY
+    global FRONTIER_SERVICE, WORKER_ID, REQUESTS_PER_SECOND, frontier_store, UPLOAD_WORKERS
+    args = parse_args(argv)
+    PARSER_BACKEND = resolve_backend(args.parser)
+    COMPACT_RECORDS = args.compact_records
+    STOPWORDS = args.stopwords
+    load_stopwords(STOPWORDS)  # Falla al inicio si el idioma o el archivo no existen
+    VISITED_STORE = args.visited_store
+    BLOOM_FP_RATE = args.bloom_fp_rate
+    FRONTIER_ORDER = args.frontier
+    FRONTIER_SCORER = args.scorer
+    SKIP_PREFIXES = tuple(args.skip_prefix)
+    LOG_EVERY_PAGE = not args.quiet_pages
+    ADAPTIVE_CONCURRENCY = not args.no_adaptive
+    UPLOAD_WORKERS = args.upload_workers
+    if args.frontier_service:
+        FRONTIER_SERVICE, WORKER_ID = args.frontier_service, args.worker_id
+        frontier_store = open_frontier_store(FRONTIER_SERVICE, args.workers)
+        # Cada worker usa su parte del rate; el límite de la API es para todo el crawl
+        REQUESTS_PER_SECOND = REQUESTS_PER_SECOND / frontier_store.workers
+        rate_limiter.set_rate(REQUESTS_PER_SECOND)
+        print(f"Distributed crawl: worker {WORKER_ID} of {frontier_store.workers} on {FRONTIER_SERVICE}, "
+              f"{REQUESTS_PER_SECOND:.1f} requests/sec share")
+    if args.wiki_url:
+        REST_API_HTML = args.wiki_url.rstrip("/") + REST_HTML_PATH
+        API_URL = args.wiki_url.rstrip("/") + "/w/api.php"
+    if args.record_cache:
+        http_pool = SessionPool(MAX_THREADS, HEADERS, response_hook=ResponseCache(args.record_cache).recorder())
+        print(f"Recording HTTP responses to {args.record_cache}")
+
+    os.makedirs(LOCAL_FOLDER, exist_ok=True)
+    if args.skip_hdfs_check:
+        print("Skipping HDFS setup and status check")
+    elif args.webhdfs:
+        print("Skipping the docker HDFS setup: output goes over WebHDFS")
+    else:
+        start_hdfs_check()
+
     # Create output file in the local wiki_data folder
     output_file = os.path.join(LOCAL_FOLDER, "wiki_data.jsonl")
+
+    resume_state = None
+    if args.resume:
+        resume_state = load_checkpoint(CHECKPOINT_FILE)
+        if resume_state is None:
+            print(f"No checkpoint found at {CHECKPOINT_FILE}, starting a new crawl")
+    elif os.path.exists(CHECKPOINT_FILE):
+        # Un crawl nuevo reescribe la salida, así que el checkpoint anterior ya no aplica
+        os.remove(CHECKPOINT_FILE)
+
+    if args.incremental:
+        start_incremental(output_file, resume_state is not None)
+
+    if args.webhdfs:
+        start_uploader(args.webhdfs)
+    if args.output == "shards" or args.format == "parquet":
+        if not args.resume:
+            remove_shards(LOCAL_FOLDER)
+        # Al reanudar, los archivos que quedaron abiertos se recuperan y se agregan al manifest
+        shard_writer = new_shard_writer(args)
+        total_data_size = shard_writer.data_size()
+        output = contextlib.nullcontext()
+    elif args.resume:
+        # Se continúa la salida existente, sin la última línea si quedó a medias
+        output_bytes, total_data_size = repair_output(output_file)
+        output = open(output_file, "a", encoding="utf-8")
+    else:
+        output = open(output_file, "w", encoding="utf-8")
     
-    with open(output_file, "w", encoding="utf-8") as f:
+    start_request_control(args.max_inflight if args.engine == "async" else MAX_THREADS)
+    start_title = START_TITLE if args.no_resolve_redirects else start_title_resolver()
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(metrics, args.metrics_port).start()
+        print(f"Metrics on http://127.0.0.1:{metrics_server.server_port}/metrics")
+    if args.summary_interval > 0:
+        start_summary(args.summary_interval)
+
+    with output as f:
         start_time = time.time()
         try:
-            crawl_rest("Inteligencia_artificial", f)
+            if args.engine == "async":
+                asyncio.run(crawl_async(start_title, f, args.max_inflight, args.parse_workers, resume_state))
+            else:
+                crawl_rest(start_title, f, args.parse_workers, resume_state)
         except KeyboardInterrupt:
             print("\nReceived keyboard interrupt. Shutting down gracefully...")
-            # Guardar el cache antes de salir
+            # Guardar el cache y el checkpoint antes de salir
             save_visited_cache()
+            write_checkpoint(f)
+            print(f"Checkpoint saved to {CHECKPOINT_FILE}; continue with --resume")
             # Vaciar la cola para permitir que los threads terminen
-            while not queue.empty():
-                try:
-                    queue.get_nowait()
-                    queue.task_done()
-                except:
-                    pass
+            if isinstance(queue, DistributedFrontier):
+                # Lo pendiente de la partición queda en el servicio para cuando el worker vuelva
+                queue.stop()
+            elif queue is not None:
+                queue.clear()
     
     total_time = time.time() - start_time
     total_requests = len(visited)
+    summary_stop.set()
     
     print(f"\n✅ Finished crawling. Total data: {total_data_size / (1024 * 1024):.2f} MB")
+    print(f"Engine: {args.engine} | HTML parser: {PARSER_BACKEND} | Crawl order: {FRONTIER_ORDER}")
     print(f"Time taken: {total_time:.2f} seconds")
+    if first_fetch_at is not None:
+        print(f"Startup: {first_fetch_at - PROCESS_START:.2f} seconds to first fetch "
+              f"({IMPORTS_DONE - PROCESS_START:.2f} in imports)")
     print(f"Total pages crawled: {total_requests}")
     print(f"Average request rate: {total_requests/max(total_time, 1):.2f} requests/sec")
-    print(f"Cache saved to: {CACHE_FILE}")
-    print(f"Output file: {output_file}")
+    pool_stats = async_pool_stats.stats() if args.engine == "async" else http_pool.stats()
+    print(f"HTTP connection pool: {format_pool_stats(pool_stats)}")
+    print(f"Rate limiter wait: {rate_limiter.total_wait:.2f} seconds total")
+    print(f"Stage timings: {stage_summary()}")
+    if aimd is not None:
+        print(f"Adaptive concurrency: {aimd.report()}")
+    fetch_workers = args.max_inflight if args.engine == "async" else MAX_THREADS
+    print(f"Fetch stage: {100 * fetch_busy_seconds / (fetch_workers * max(total_time, 1e-9)):.1f}% of {fetch_workers} workers busy on network")
+    if parse_stage is not None:
+        print(f"Parse stage: {parse_stage.report()}")
+    if incremental is not None:
+        print(f"Incremental: {incremental.report()}")
+        incremental.close()
+    if title_resolver is not None:
+        print(f"Title resolution: {title_resolver.report()}")
+        title_resolver.close()
+    if edit_rate_batcher is not None:
+        print(f"Edit-rate requests: {edit_rate_batcher.api_requests} for {edit_rate_batcher.pages} pages "
+              f"(one per canonical title; MediaWiki does not batch rvlimit across titles)")
+    http_pool.close()
+    print(f"Visited store: {describe_store(VISITED_STORE, visited)}")
+    if queue is not None:
+        print(f"Frontier: {queue.stats()}")
+        queue.close()
+    print(f"Cache saved to: {VISITED_JOURNAL}.snapshot")
+    if shard_writer is not None:
+        print(f"Output shards: {shard_writer.report()}")
+    else:
+        print(f"Output file: {output_file}")
+    if uploader is not None:
+        finish_uploads(output_file)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if hdfs_check is not None and hdfs_check.is_alive():
+        print("Waiting for the HDFS status check to finish...")
+        hdfs_check.join()
     
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+"""Cálculo de edits_per_day usando el action API de MediaWiki"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Máximo de títulos por request para clientes sin permisos de bot
+MAX_TITLES_PER_QUERY = 50
+
+
+def edit_rate_params(title):
+    return {
+        "action": "query",
+        "format": "json",
+        "prop": "revisions",
+        "redirects": "1",
+        "rvlimit": "500",
+        "rvprop": "timestamp",
+        "titles": title
+    }
+
+
+def edit_rate_from_response(data):
+    """Calcula las ediciones por día a partir de la respuesta de la API"""
+    pages = data.get('query', {}).get('pages', {})
+    for page in pages.values():
+        revisions = page.get('revisions', [])
+        if len(revisions) < 2:
+            return 0
+        timestamps = [time.strptime(r["timestamp"], "%Y-%m-%dT%H:%M:%SZ") for r in revisions]
+        timestamps.sort()
+        start = time.mktime(timestamps[0])
+        end = time.mktime(timestamps[-1])
+        days = max((end - start) / (60 * 60 * 24), 1)
+        return round(len(revisions) / days, 2)
+    return 0
+
+
+def resolve_titles_params(titles):
+    return {
+        "action": "query",
+        "format": "json",
+        "prop": "info",
+        "redirects": "1",
+        "titles": "|".join(titles)
+    }
+
+
+def canonical_titles(data, titles):
+    """Mapea cada título pedido a su título canónico, o None si la página no existe"""
+    query = data.get("query", {})
+    mapping = {title: title for title in titles}
+    # La API primero normaliza y luego sigue redirects, en ese orden
+    for step in ("normalized", "redirects"):
+        renames = {entry["from"]: entry["to"] for entry in query.get(step, [])}
+        for title, current in mapping.items():
+            mapping[title] = renames.get(current, current)
+    missing = {
+        page.get("title") for page in query.get("pages", {}).values()
+        if "missing" in page or "invalid" in page
+    }
+    return {title: (None if canon in missing else canon) for title, canon in mapping.items()}
+
+
+class EditRateBatcher:
+    """Resuelve el edits_per_day de cada página terminada antes de escribirla.
+
+    MediaWiki no permite rvlimit con varios títulos, así que el historial de
+    revisiones no se puede pedir por lotes: es un request por página. El
+    request lleva redirects=1 y sigue él mismo un redirect, sin un request
+    de resolución aparte. Esos requests corren en un pool de workers
+    threads, y el registro se entrega a on_ready (desde ese thread) apenas
+    llega el suyo. Lo único que se ahorra es la consulta repetida: cada
+    título canónico se pide una sola vez aunque lleguen varias variantes de
+    él. Con resolve_titles (por ejemplo TitleResolver.lookup, que solo usa
+    su mapa) las variantes conocidas comparten el request de su canónico.
+    """
+
+    def __init__(self, fetch_json, on_ready, resolve_titles=None, workers=8):
+        self.fetch_json = fetch_json
+        self.on_ready = on_ready
+        self.resolve_titles = resolve_titles
+        self.lookups = {}  # Título canónico -> Future con su edits_per_day
+        self.pages = 0
+        self.api_requests = 0
+        self.waiting = 0  # Registros esperando su request de revisiones
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="edit-rate")
+
+    def submit(self, item, *context):
+        """Pide el edits_per_day de un registro; on_ready(item, *context) se llama cuando lo tenga"""
+        title = item["title"]
+        canonical = title
+        if self.resolve_titles is not None:
+            canonical = self.resolve_titles([title]).get(title, title)
+        with self._lock:
+            self.waiting += 1
+            if canonical is None:
+                future = Future()
+                future.set_result(0)
+            else:
+                future = self.lookups.get(canonical)
+                if future is None:
+                    future = self.lookups[canonical] = self._pool.submit(self._edit_rate, canonical)
+        if future.done():
+            # Sin pasar por el pool, on_ready correría en el thread que llamó a submit (en async, el event loop)
+            self._pool.submit(self._ready, item, context, future.result())
+        else:
+            future.add_done_callback(lambda f: self._ready(item, context, f.result()))
+
+    def close(self):
+        """Espera los requests pendientes y detiene el pool"""
+        self._pool.shutdown(wait=True)
+
+    def backlog(self):
+        """Registros que todavía no se entregaron a on_ready"""
+        return self.waiting
+
+    def _fetch(self, params):
+        with self._lock:
+            self.api_requests += 1
+        return self.fetch_json(params)
+
+    def _edit_rate(self, title):
+        try:
+            return edit_rate_from_response(self._fetch(edit_rate_params(title)))
+        except Exception as e:
+            print(f"Error getting edit rate for {title}: {str(e)}")
+            return 0
+
+    def _ready(self, item, context, edits_per_day):
+        item["edits_per_day"] = edits_per_day
+        with self._lock:
+            self.waiting -= 1
+            self.pages += 1
+        try:
+            self.on_ready(item, *context)
+        except Exception as e:
+            print(f"Error writing record for {item['title']}: {str(e)}")
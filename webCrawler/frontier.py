@@ -0,0 +1,416 @@
+"""Frontera del crawl: sin duplicados, acotada en memoria y en orden BFS.
+
+- Cada título se encola una sola vez (se recuerda en un store de
+  visited_store, así que el modo fingerprint/bloom también aplica aquí).
+- Hay una cola FIFO por profundidad y siempre se atiende la menor, lo que
+  preserva el orden BFS aunque los workers terminen en desorden.
+- Cuando hay más de max_in_memory títulos en memoria, los nuevos se
+  derraman a un archivo por profundidad y se recargan en orden al vaciarse
+  la parte en memoria.
+
+Frontier tiene la misma interfaz que queue.Queue para los threads
+(put/get/task_done/join); AsyncFrontier la adapta al engine async.
+Además recuerda los títulos entregados por get() hasta que se llama
+release(), para que snapshot() pueda guardarlos en un checkpoint.
+
+PriorityFrontier cambia el orden BFS por un heap ordenado por un scorer
+(profundidad, links entrantes vistos hasta ahora, filtros por prefijo),
+para que un presupuesto fijo de bytes se gaste primero en las páginas de
+más valor.
+"""
+import asyncio
+import glob
+import heapq
+import itertools
+import os
+import threading
+from collections import deque
+from queue import Empty
+
+from visited_store import SetStore
+
+
+class _SpillFile:
+    """FIFO de títulos en disco, una línea por título"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._read_pos = 0
+        self._writer = open(path, "ab")
+
+    def append(self, title):
+        self._writer.write(title.encode("utf-8") + b"\n")
+        self.count += 1
+
+    def read(self, n):
+        self._writer.flush()
+        titles = []
+        with open(self.path, "rb") as f:
+            f.seek(self._read_pos)
+            for _ in range(n):
+                line = f.readline()
+                if not line:
+                    break
+                titles.append(line[:-1].decode("utf-8"))
+            self._read_pos = f.tell()
+        self.count -= len(titles)
+        if self.count == 0:
+            # Todo lo derramado ya se leyó: se reinicia el archivo
+            self._writer.truncate(0)
+            self._read_pos = 0
+        return titles
+
+    def peek(self):
+        """Títulos todavía no leídos, sin consumirlos"""
+        self._writer.flush()
+        with open(self.path, "rb") as f:
+            f.seek(self._read_pos)
+            return [line[:-1].decode("utf-8") for line in f]
+
+    def clear(self):
+        self._writer.truncate(0)
+        self._read_pos = 0
+        self.count = 0
+
+    def close(self):
+        self._writer.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Frontier:
+    def __init__(self, max_in_memory=100000, spill_dir="frontier_spill", seen=None):
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self._seen = seen if seen is not None else SetStore()
+        self._buckets = {}  # profundidad -> deque de títulos en memoria
+        self._spills = {}  # profundidad -> _SpillFile
+        self._in_flight = {}  # título -> profundidad, entregados por get() y no liberados
+        self._in_memory = 0
+        self._size = 0
+        self._unfinished = 0
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._all_done = threading.Condition(self._mutex)
+        self.duplicates = 0
+        self.spilled = 0
+        self.peak_in_memory = 0
+        os.makedirs(spill_dir, exist_ok=True)
+        # Restos de un crawl anterior que no cerró su frontera
+        for path in glob.glob(os.path.join(spill_dir, "depth_*.spill")):
+            os.remove(path)
+
+    def _spill(self, depth):
+        spill = self._spills.get(depth)
+        if spill is None:
+            spill = _SpillFile(os.path.join(self.spill_dir, f"depth_{depth}.spill"))
+            self._spills[depth] = spill
+        return spill
+
+    def put(self, item, block=True, timeout=None):
+        """Encola (title, depth). Retorna False si el título ya se había encolado"""
+        title, depth = item
+        with self._mutex:
+            if not self._seen.add(title):
+                self.duplicates += 1
+                self._on_duplicate(title)
+                return False
+            if not self._push(title, depth):
+                return False
+            self._size += 1
+            self._unfinished += 1
+            self._not_empty.notify()
+            return True
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def _count_in_memory(self, n=1):
+        self._in_memory += n
+        self.peak_in_memory = max(self.peak_in_memory, self._in_memory)
+
+    def _push(self, title, depth):
+        """Guarda un título nuevo; retorna False si se descarta"""
+        spill = self._spills.get(depth)
+        # Si esta profundidad ya tiene títulos en disco, los nuevos van detrás para mantener el FIFO
+        if self._in_memory >= self.max_in_memory or (spill is not None and spill.count):
+            self._spill(depth).append(title)
+            self.spilled += 1
+        else:
+            self._buckets.setdefault(depth, deque()).append(title)
+            self._count_in_memory()
+        return True
+
+    def _on_duplicate(self, title):
+        """Se llama cuando un título ya encolado vuelve a aparecer"""
+
+    def _pop(self):
+        depth = min(d for d in set(self._buckets) | set(self._spills)
+                    if self._buckets.get(d) or (d in self._spills and self._spills[d].count))
+        bucket = self._buckets.setdefault(depth, deque())
+        if not bucket:
+            titles = self._spills[depth].read(max(self.max_in_memory - self._in_memory, 1))
+            bucket.extend(titles)
+            self._in_memory += len(titles)
+        self._in_memory -= 1
+        return bucket.popleft(), depth
+
+    def _pending(self):
+        """Títulos pendientes por profundidad, en el orden en que se entregarían"""
+        pending = {}
+        for depth in set(self._buckets) | set(self._spills):
+            titles = list(self._buckets.get(depth, ()))
+            if depth in self._spills:
+                titles.extend(self._spills[depth].peek())
+            if titles:
+                pending[depth] = titles
+        return pending
+
+    def _clear_pending(self):
+        for bucket in self._buckets.values():
+            bucket.clear()
+        for spill in self._spills.values():
+            spill.clear()
+
+    def get(self, block=True, timeout=None):
+        with self._not_empty:
+            if block:
+                if not self._not_empty.wait_for(lambda: self._size > 0, timeout):
+                    raise Empty
+            elif self._size == 0:
+                raise Empty
+            title, depth = self._pop()
+            self._size -= 1
+            self._in_flight[title] = depth
+            return title, depth
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def release(self, title):
+        """Marca un título entregado por get() como resuelto (escrito o descartado)"""
+        with self._mutex:
+            self._in_flight.pop(title, None)
+
+    def snapshot(self):
+        """Estado para un checkpoint: pendientes por profundidad y títulos en vuelo"""
+        with self._mutex:
+            pending = {str(depth): titles for depth, titles in self._pending().items()}
+            return {"pending": pending, "in_flight": dict(self._in_flight)}
+
+    def clear(self):
+        """Descarta todos los pendientes (límite de datos alcanzado) y los da por terminados"""
+        with self._mutex:
+            self._clear_pending()
+            self._unfinished -= self._size
+            self._in_memory = 0
+            self._size = 0
+            if self._unfinished == 0:
+                self._all_done.notify_all()
+
+    def task_done(self):
+        with self._all_done:
+            if self._unfinished <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished -= 1
+            if self._unfinished == 0:
+                self._all_done.notify_all()
+
+    def join(self):
+        with self._all_done:
+            while self._unfinished:
+                self._all_done.wait()
+
+    def qsize(self):
+        with self._mutex:
+            return self._size
+
+    def empty(self):
+        return self.qsize() == 0
+
+    @property
+    def unfinished_tasks(self):
+        return self._unfinished
+
+    def close(self):
+        with self._mutex:
+            for spill in self._spills.values():
+                spill.close()
+            self._spills.clear()
+
+    def stats(self):
+        return (f"{len(self._seen)} unique titles enqueued, {self.duplicates} duplicates skipped, "
+                f"{self.spilled} spilled to disk, peak {self.peak_in_memory} in memory")
+
+
+def depth_scorer(title, depth, inlinks):
+    """Equivalente al orden BFS: primero lo menos profundo"""
+    return -depth
+
+
+def inlink_scorer(title, depth, inlinks):
+    """Primero los títulos con más links entrantes vistos; a igual cantidad, el menos profundo"""
+    return inlinks + 1.0 / (depth + 1)
+
+
+SCORERS = {"depth": depth_scorer, "inlinks": inlink_scorer}
+
+
+def skip_prefixes(scorer, prefixes):
+    """Envuelve un scorer para descartar los títulos que empiezan con alguno de los prefijos"""
+    prefixes = tuple(prefixes)
+
+    def score(title, depth, inlinks):
+        if title.startswith(prefixes):
+            return None
+        return scorer(title, depth, inlinks)
+    return score
+
+
+class PriorityFrontier(Frontier):
+    """Frontera ordenada por scorer(title, depth, inlinks): mayor puntaje primero.
+
+    Los pendientes viven en un heap con push/pop O(log n). Cuando un título
+    ya encolado vuelve a aparecer se recalcula su puntaje y se agrega una
+    entrada nueva; la vieja queda obsoleta y se salta al sacarla del heap.
+    Si el scorer retorna None el título se descarta.
+
+    Por encima de max_in_memory los títulos nuevos se derraman a disco como
+    en Frontier y vuelven al heap cuando la parte en memoria baja a la mitad;
+    mientras están en disco no acumulan links entrantes.
+    """
+
+    def __init__(self, scorer=inlink_scorer, max_in_memory=100000, spill_dir="frontier_spill", seen=None):
+        super().__init__(max_in_memory, spill_dir, seen)
+        self.scorer = scorer
+        self._heap = []  # (-puntaje, orden de llegada, título)
+        self._entries = {}  # título -> [profundidad, links entrantes, puntaje, orden de llegada]
+        self._order = itertools.count()
+        self.filtered = 0
+        self.rescored = 0
+
+    def _add_entry(self, title, depth, inlinks, score):
+        entry = [depth, inlinks, score, next(self._order)]
+        self._entries[title] = entry
+        heapq.heappush(self._heap, (-score, entry[3], title))
+
+    def _push(self, title, depth):
+        score = self.scorer(title, depth, 1)
+        if score is None:
+            self.filtered += 1
+            return False
+        if self._in_memory >= self.max_in_memory:
+            self._spill(depth).append(title)
+            self.spilled += 1
+        else:
+            self._add_entry(title, depth, 1, score)
+            self._count_in_memory()
+        return True
+
+    def _on_duplicate(self, title):
+        entry = self._entries.get(title)
+        if entry is None:
+            # Ya se entregó, se descartó o está en disco
+            return
+        entry[1] += 1
+        score = self.scorer(title, entry[0], entry[1])
+        if score is None or score == entry[2]:
+            return
+        entry[2] = score
+        heapq.heappush(self._heap, (-score, entry[3], title))
+        self.rescored += 1
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            # Demasiadas entradas obsoletas: se reconstruye el heap con las vigentes
+            self._heap = [(-e[2], e[3], t) for t, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _refill(self):
+        depths = [d for d, spill in self._spills.items() if spill.count]
+        if not depths or self._in_memory > self.max_in_memory // 2:
+            return
+        depth = min(depths)
+        for title in self._spills[depth].read(max(self.max_in_memory - self._in_memory, 1)):
+            # El scorer es determinista y el título pasó el filtro al encolarse
+            self._add_entry(title, depth, 1, self.scorer(title, depth, 1))
+            self._count_in_memory()
+
+    def _pop(self):
+        self._refill()
+        while True:
+            neg_score, _, title = heapq.heappop(self._heap)
+            entry = self._entries.get(title)
+            if entry is not None and entry[2] == -neg_score:
+                del self._entries[title]
+                self._in_memory -= 1
+                return title, entry[0]
+
+    def _pending(self):
+        pending = {}
+        for title, entry in sorted(self._entries.items(), key=lambda e: (-e[1][2], e[1][3])):
+            pending.setdefault(entry[0], []).append(title)
+        for depth, spill in self._spills.items():
+            if spill.count:
+                pending.setdefault(depth, []).extend(spill.peek())
+        return pending
+
+    def _clear_pending(self):
+        self._heap.clear()
+        self._entries.clear()
+        for spill in self._spills.values():
+            spill.clear()
+
+    def stats(self):
+        return (f"{super().stats()}, {self.filtered} filtered out, "
+                f"{self.rescored} re-scored on new in-links")
+
+
+class AsyncFrontier:
+    """Adaptador de Frontier para corrutinas de un solo event loop"""
+
+    def __init__(self, frontier):
+        self.frontier = frontier
+        self._available = asyncio.Event()
+        self._done = asyncio.Event()
+        self._done.set()
+
+    def put_nowait(self, item):
+        added = self.frontier.put_nowait(item)
+        if added:
+            self._done.clear()
+            self._available.set()
+        return added
+
+    async def get(self):
+        while True:
+            try:
+                return self.frontier.get_nowait()
+            except Empty:
+                # Sin await entre el get fallido y el clear, así que no se pierde ningún put
+                self._available.clear()
+                await self._available.wait()
+
+    def get_nowait(self):
+        try:
+            return self.frontier.get_nowait()
+        except Empty:
+            raise asyncio.QueueEmpty
+
+    def task_done(self):
+        self.frontier.task_done()
+        if self.frontier.unfinished_tasks == 0:
+            self._done.set()
+
+    async def join(self):
+        await self._done.wait()
+
+    def release(self, title):
+        self.frontier.release(title)
+
+    def clear(self):
+        self.frontier.clear()
+        if self.frontier.unfinished_tasks == 0:
+            self._done.set()
+
+    def empty(self):
+        return self.frontier.empty()
@@ -0,0 +1,404 @@
+"""Frontera y visitadas compartidas para repartir un crawl entre varias máquinas.
+
+El espacio de títulos se parte por hash entre N workers. El worker i crawlea
+los títulos con partition_of(título, N) == i y publica en el servicio todos
+los links que encuentra, sean de su partición o no. El servicio deduplica
+globalmente (cada título se inserta una sola vez) y cada worker reclama
+lotes de pendientes de su partición, en orden de profundidad.
+
+Un título pasa por pending -> claimed (entregado a su worker) -> done. Cuando
+un worker reinicia, sus títulos claimed vuelven a pending. Si un worker
+llega a su MAX_DATA_SIZE, su partición se cierra: lo pendiente se descarta
+y lo que otros publiquen para ella ya no cuenta. El crawl termina cuando
+ninguna partición abierta tiene títulos pending ni claimed.
+
+Hay dos stores con la misma interfaz:
+- SqliteFrontierStore: un archivo SQLite. Es el stand-in local, para
+  varios workers en la misma máquina que apuntan al mismo archivo.
+- RemoteFrontierStore: cliente HTTP del coordinador (FrontierServer), que
+  expone un SqliteFrontierStore en la red.
+
+Cada worker corre en su propio directorio (salida, journal de visitadas y
+checkpoint propios) y usa 1/N del rate (ver --frontier-service en crawler.py):
+
+    python frontier_service.py serve crawl_frontier.db --workers 4 --port 8765
+    python crawler.py --frontier-service http://coordinador:8765 --worker-id 0
+    python crawler.py --frontier-service sqlite:///tmp/crawl_frontier.db --workers 2 --worker-id 1
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty
+
+import requests
+
+PENDING, CLAIMED, DONE, DROPPED = 0, 1, 2, 3
+# Métodos del store que el coordinador expone por HTTP
+REMOTE_METHODS = ("info", "add", "claim", "finish", "reset_claims", "close_partition", "counts")
+
+
+def partition_of(title, workers):
+    """Partición de un título; estable entre procesos y máquinas (hash() de Python no lo es)"""
+    digest = hashlib.blake2b(title.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % workers
+
+
+class SqliteFrontierStore:
+    def __init__(self, path, workers=None):
+        self.path = path
+        self._lock = threading.Lock()
+        # Varios procesos escriben el mismo archivo: WAL y espera en vez de fallar si está tomado
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS titles (
+                title TEXT PRIMARY KEY, partition INTEGER, depth INTEGER, state INTEGER);
+            CREATE INDEX IF NOT EXISTS titles_claim ON titles (partition, state, depth);
+            CREATE TABLE IF NOT EXISTS closed (partition INTEGER PRIMARY KEY);
+        """)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'workers'").fetchone()
+            if row is None and workers:
+                self._db.execute("INSERT INTO meta VALUES ('workers', ?)", (str(workers),))
+            self._db.execute("COMMIT")
+        stored = int(row[0]) if row is not None else workers
+        if not stored:
+            raise ValueError(f"{path} has no worker count; create it with --workers")
+        if workers and workers != stored:
+            raise ValueError(f"{path} was created for {stored} workers, not {workers}")
+        self.workers = stored
+
+    def info(self):
+        return {"workers": self.workers}
+
+    def add(self, items):
+        """Inserta (título, profundidad) nuevos como pending; retorna cuántos eran nuevos"""
+        rows = [(title, partition_of(title, self.workers), depth) for title, depth in items]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            before = self._db.total_changes
+            closed = {p for (p,) in self._db.execute("SELECT partition FROM closed")}
+            self._db.executemany("INSERT OR IGNORE INTO titles VALUES (?, ?, ?, ?)",
+                                 [(t, p, d, DROPPED if p in closed else PENDING) for t, p, d in rows])
+            added = self._db.total_changes - before
+            self._db.execute("COMMIT")
+        return added
+
+    def claim(self, partition, limit):
+        """Marca como claimed hasta limit pendientes de la partición y los retorna, los menos profundos primero"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._db.execute(
+                "SELECT title, depth FROM titles WHERE partition = ? AND state = ? ORDER BY depth, rowid LIMIT ?",
+                (partition, PENDING, limit)).fetchall()
+            self._db.executemany("UPDATE titles SET state = ? WHERE title = ?", [(CLAIMED, t) for t, _ in rows])
+            self._db.execute("COMMIT")
+        return [list(row) for row in rows]
+
+    def finish(self, titles):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("UPDATE titles SET state = ? WHERE title = ?", [(DONE, t) for t in titles])
+            self._db.execute("COMMIT")
+
+    def reset_claims(self, partition):
+        """Devuelve a pending lo que la partición tenía reclamado (el worker reinició)"""
+        with self._lock:
+            self._db.execute("UPDATE titles SET state = ? WHERE partition = ? AND state = ?",
+                             (PENDING, partition, CLAIMED))
+
+    def close_partition(self, partition, titles=()):
+        """Cierra una partición: sus pendientes y titles (reclamados sin entregar) se descartan"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("INSERT OR IGNORE INTO closed VALUES (?)", (partition,))
+            self._db.execute("UPDATE titles SET state = ? WHERE partition = ? AND state = ?",
+                             (DROPPED, partition, PENDING))
+            self._db.executemany("UPDATE titles SET state = ? WHERE title = ?", [(DROPPED, t) for t in titles])
+            self._db.execute("COMMIT")
+
+    def counts(self):
+        """Títulos por estado y cuántos quedan por resolver en las particiones abiertas"""
+        with self._lock:
+            by_state = dict(self._db.execute("SELECT state, COUNT(*) FROM titles GROUP BY state").fetchall())
+            open_work = self._db.execute(
+                "SELECT COUNT(*) FROM titles WHERE state IN (?, ?) AND partition NOT IN (SELECT partition FROM closed)",
+                (PENDING, CLAIMED)).fetchone()[0]
+        return {"pending": by_state.get(PENDING, 0), "claimed": by_state.get(CLAIMED, 0),
+                "done": by_state.get(DONE, 0), "dropped": by_state.get(DROPPED, 0), "open": open_work}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RemoteFrontierStore:
+    """Cliente del coordinador; mismos métodos que SqliteFrontierStore"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._lock = threading.Lock()  # requests.Session no es thread-safe
+        self.workers = self.info()["workers"]
+
+    def _call(self, method, *args):
+        with self._lock:
+            resp = self._session.post(f"{self.url}/{method}", json=list(args), timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def __getattr__(self, method):
+        if method not in REMOTE_METHODS:
+            raise AttributeError(method)
+        return lambda *args: self._call(method, *args)
+
+    def close(self):
+        self._session.close()
+
+
+def open_frontier_store(url, workers=None):
+    """Store para --frontier-service: http(s)://coordinador:puerto, sqlite:///ruta o la ruta de un archivo"""
+    if url.startswith(("http://", "https://")):
+        return RemoteFrontierStore(url)
+    path = url[len("sqlite://"):] if url.startswith("sqlite://") else url
+    return SqliteFrontierStore(path, workers)
+
+
+class DistributedFrontier:
+    """Frontera de un worker sobre un store compartido, con la interfaz de frontier.Frontier.
+
+    put() y release() se acumulan en memoria y se envían al store en lote.
+    get() bloquea hasta que haya un título de la partición del worker o el
+    crawl global termine; su timeout se ignora, porque una partición vacía
+    un rato no significa que no vayan a llegar links de otros workers.
+    """
+
+    def __init__(self, store, worker_id, claim_size=100, flush_size=500, poll_interval=1.0):
+        if not 0 <= worker_id < store.workers:
+            raise ValueError(f"worker id {worker_id} out of range for {store.workers} workers")
+        self.store = store
+        self.worker_id = worker_id
+        self.workers = store.workers
+        self.claim_size = claim_size
+        self.flush_size = flush_size
+        self.poll_interval = poll_interval
+        self._local = deque()  # Reclamados en el store y todavía no entregados
+        self._in_flight = {}  # título -> profundidad, entregados por get() y no liberados
+        self._outbox = []  # (título, profundidad) por publicar
+        self._released = []  # Títulos por marcar como done
+        self._unfinished = 0
+        self._mutex = threading.Lock()
+        self._io_lock = threading.Lock()  # Un solo thread habla con el store a la vez
+        self._last_poll = 0.0
+        self._stopped = False
+        self._finished = False
+        self.published = 0
+        self.new_titles = 0
+        self.claimed = 0
+        store.reset_claims(worker_id)
+
+    def put(self, item, block=True, timeout=None):
+        """Publica (title, depth). Retorna True: la deduplicación la hace el store al enviar el lote"""
+        with self._mutex:
+            self._outbox.append(tuple(item))
+            full = len(self._outbox) >= self.flush_size
+        if full:
+            with self._io_lock:
+                self._flush()
+        return True
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def _flush(self):
+        """Envía lo publicado y lo liberado; los links siempre antes que la página que los trajo"""
+        with self._mutex:
+            outbox, self._outbox = self._outbox, []
+            released, self._released = self._released, []
+        if outbox:
+            self.new_titles += self.store.add(outbox)
+            self.published += len(outbox)
+        if released:
+            self.store.finish(released)
+
+    def _refill(self):
+        """Reclama más títulos o, si no hay, revisa si el crawl global terminó"""
+        with self._io_lock:
+            if self._local or self._stopped or time.monotonic() - self._last_poll < self.poll_interval:
+                return
+            self._flush()
+            claimed = self.store.claim(self.worker_id, self.claim_size)
+            if claimed:
+                with self._mutex:
+                    self._local.extend((title, depth) for title, depth in claimed)
+                self.claimed += len(claimed)
+                return
+            self._last_poll = time.monotonic()
+            with self._mutex:
+                # Una tarea sin task_done todavía puede estar publicando los links de su página
+                idle = not self._in_flight and not self._unfinished and not self._outbox and not self._released
+            if idle and self.store.counts()["open"] == 0:
+                self._finished = True
+
+    def get(self, block=True, timeout=None):
+        while True:
+            with self._mutex:
+                if self._local and not self._stopped:
+                    title, depth = self._local.popleft()
+                    self._in_flight[title] = depth
+                    self._unfinished += 1
+                    return title, depth
+                if self._stopped or self._finished:
+                    raise Empty
+            self._refill()
+            with self._mutex:
+                waiting = not self._local and not self._stopped and not self._finished
+            if waiting:
+                if not block:
+                    raise Empty
+                time.sleep(self.poll_interval / 4)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def release(self, title):
+        with self._mutex:
+            if self._in_flight.pop(title, None) is not None:
+                self._released.append(title)
+
+    def snapshot(self):
+        """Lo pendiente vive en el store; el checkpoint solo guarda lo entregado o reclamado por este worker"""
+        with self._mutex:
+            in_flight = dict(self._in_flight)
+            in_flight.update((title, depth) for title, depth in self._local)
+        return {"pending": {}, "in_flight": in_flight}
+
+    def clear(self):
+        """Límite de datos alcanzado: cierra la partición de este worker para que el resto pueda terminar"""
+        with self._mutex:
+            self._stopped = True
+            dropped = [title for title, _ in self._local]
+            self._local.clear()
+        with self._io_lock:
+            self._flush()
+            self.store.close_partition(self.worker_id, dropped)
+
+    def stop(self):
+        """Deja de entregar títulos sin cerrar la partición (Ctrl-C); lo pendiente queda para el reinicio"""
+        with self._mutex:
+            self._stopped = True
+
+    def task_done(self):
+        with self._mutex:
+            if self._unfinished <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished -= 1
+
+    def join(self):
+        while True:
+            with self._mutex:
+                if (self._finished or self._stopped) and self._unfinished == 0:
+                    return
+            time.sleep(self.poll_interval / 4)
+
+    def qsize(self):
+        with self._mutex:
+            return len(self._local)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    @property
+    def unfinished_tasks(self):
+        return self._unfinished
+
+    def close(self):
+        with self._io_lock:
+            self._flush()
+        self.store.close()
+
+    def stats(self):
+        counts = self.store.counts()
+        return (f"worker {self.worker_id}/{self.workers}: {self.claimed} titles claimed, {self.published} links "
+                f"published ({self.new_titles} new) | service: {counts['done']} done, {counts['pending']} pending, "
+                f"{counts['claimed']} claimed, {counts['dropped']} dropped")
+
+
+class _FrontierHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        method = self.path.strip("/")
+        length = int(self.headers.get("Content-Length", 0))
+        args = json.loads(self.rfile.read(length) or b"[]")
+        if method not in REMOTE_METHODS:
+            status, result = 404, {"error": f"unknown method {method}"}
+        else:
+            try:
+                status, result = 200, getattr(self.server.store, method)(*args)
+            except Exception as e:
+                status, result = 500, {"error": str(e)}
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FrontierServer(ThreadingHTTPServer):
+    """Coordinador: expone un SqliteFrontierStore a los workers"""
+    daemon_threads = True
+
+    def __init__(self, store, host="0.0.0.0", port=8765):
+        super().__init__((host, port), _FrontierHandler)
+        self.store = store
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared frontier service for a distributed crawl")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the coordinator")
+    serve.add_argument("db", help="SQLite file holding the frontier")
+    serve.add_argument("--workers", type=int, default=None, help="Number of crawler workers (required for a new db)")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--report-interval", type=float, default=10)
+    stats = sub.add_parser("stats", help="Summarise a frontier db")
+    stats.add_argument("db")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        store = SqliteFrontierStore(args.db)
+        print(f"{store.workers} workers: {store.counts()}")
+        return
+
+    store = SqliteFrontierStore(args.db, args.workers)
+    server = FrontierServer(store, args.host, args.port).start()
+    print(f"Frontier service for {store.workers} workers on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            print(f"[frontier] {store.counts()}")
+    except KeyboardInterrupt:
+        print(f"\n{store.counts()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
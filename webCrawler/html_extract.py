@@ -0,0 +1,140 @@
+"""Extracción de texto y links del HTML de Parsoid con parsers intercambiables.
+
+Cada backend recorre el documento una sola vez y devuelve, en orden de
+aparición, el texto de los bloques p/h1-h5 y los href de los links. Se
+prefiere un parser escrito en C (selectolax/lexbor o lxml) y BeautifulSoup
+queda como respaldo cuando ninguno está instalado.
+"""
+from urllib.parse import urljoin
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+BASE_WIKI = "https://es.wikipedia.org/wiki/"
+TEXT_TAGS = ('p', 'h1', 'h2', 'h3', 'h4', 'h5')
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+
+def wiki_link(href):
+    """Convierte un href en la URL completa del artículo, o None si no es un artículo"""
+    if href.startswith('/wiki/'):
+        if ':' not in href and '#' not in href:
+            return urljoin(BASE_WIKI, href)
+    elif href.startswith('./'):
+        clean_href = href[2:]
+        if clean_href and ':' not in clean_href and '#' not in clean_href:
+            return BASE_WIKI + clean_href
+    elif 'wikipedia.org/wiki/' in href:
+        if ':' not in href.split('/wiki/')[-1] and '#' not in href:
+            return href
+    return None
+
+
+def extract_links(hrefs):
+    links = set()
+    for href in hrefs:
+        if not href:
+            continue
+        link = wiki_link(href)
+        if link:
+            links.add(link)
+    return list(links)
+
+
+def _extract_selectolax(html):
+    tree = LexborHTMLParser(html)
+    title = None
+    blocks = []
+    hrefs = []
+    for node in tree.css('p, h1, h2, h3, h4, h5, a[href]'):
+        if node.tag == 'a':
+            # Un <a href> sin valor trae None en selectolax
+            href = node.attributes.get('href')
+            if href:
+                hrefs.append(href)
+            continue
+        blocks.append(node.text(separator=" ", strip=True))
+        if title is None and node.tag == 'h1':
+            title = node.text().strip()
+    return title, " ".join(blocks), hrefs
+
+
+def _extract_lxml(html):
+    root = lxml_html.document_fromstring(html)
+    title = None
+    blocks = []
+    hrefs = []
+    for element in root.iter('a', *TEXT_TAGS):
+        if element.tag == 'a':
+            href = element.get('href')
+            if href is not None:
+                hrefs.append(href)
+            continue
+        blocks.append(" ".join(s.strip() for s in element.itertext() if s.strip()))
+        if title is None and element.tag == 'h1':
+            title = element.text_content().strip()
+    return title, " ".join(blocks), hrefs
+
+
+def _extract_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    title = None
+    blocks = []
+    hrefs = []
+    for tag in soup.find_all(['a', *TEXT_TAGS]):
+        if tag.name == 'a':
+            if tag.has_attr('href'):
+                hrefs.append(tag['href'])
+            continue
+        blocks.append(tag.get_text(separator=" ", strip=True))
+        if title is None and tag.name == 'h1':
+            title = tag.text.strip()
+    return title, " ".join(blocks), hrefs
+
+
+_EXTRACTORS = {
+    "selectolax": _extract_selectolax,
+    "lxml": _extract_lxml,
+    "bs4": _extract_bs4,
+}
+
+
+def available_backends():
+    installed = {
+        "selectolax": LexborHTMLParser is not None,
+        "lxml": lxml_html is not None,
+        "bs4": BeautifulSoup is not None,
+    }
+    return [name for name in BACKENDS if installed[name]]
+
+
+def resolve_backend(name="auto"):
+    """Valida el backend pedido; "auto" elige el más rápido instalado"""
+    available = available_backends()
+    if not available:
+        raise RuntimeError("No HTML parser installed (selectolax, lxml or beautifulsoup4)")
+    if name == "auto":
+        return available[0]
+    if name not in available:
+        raise RuntimeError(f"HTML parser backend '{name}' is not installed")
+    return name
+
+
+def extract_page(html, backend="auto"):
+    """Retorna (título del h1 o None, texto de los bloques, links a artículos)"""
+    if backend == "auto":
+        backend = resolve_backend(backend)
+    title, text, hrefs = _EXTRACTORS[backend](html)
+    return title, text, extract_links(hrefs)
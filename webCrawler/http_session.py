@@ -0,0 +1,126 @@
+"""Sesiones HTTP persistentes (keep-alive) compartidas por el crawler"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ACCEPT_ENCODING
+
+aiohttp = None  # Se importa con import_aiohttp(); solo lo usa el engine async
+
+# urllib3 solo anuncia "br" si brotli está instalado, así nunca pedimos
+# una codificación que no sepamos descomprimir
+ACCEPT_ENCODING = URLLIB3_ACCEPT_ENCODING.replace(",", ", ")
+
+
+def import_aiohttp():
+    """Importa aiohttp la primera vez que se pide, para no pagarlo al arrancar con el engine de threads"""
+    global aiohttp
+    if aiohttp is None:
+        try:
+            import aiohttp as module
+        except ImportError:
+            raise RuntimeError("The async engine requires aiohttp (pip install aiohttp)") from None
+        aiohttp = module
+    return aiohttp
+
+
+class SessionPool:
+    """Pool de conexiones keep-alive compartido entre todos los threads.
+
+    Cada thread usa su propia requests.Session (Session no es thread-safe),
+    pero todas montan el mismo HTTPAdapter, así que comparten el pool de
+    conexiones por host de urllib3.
+    """
+
+    def __init__(self, pool_size, headers=None, max_hosts=10, response_hook=None):
+        """response_hook(resp) se llama con cada respuesta, incluidos los redirects"""
+        self.response_hook = response_hook
+        self.adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_size)
+        self.headers = dict(headers or {})
+        self.headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        self.headers.setdefault("Connection", "keep-alive")
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def session(self):
+        """Retorna la sesión del thread actual, creándola si no existe"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            if self.response_hook is not None:
+                session.hooks["response"].append(self.response_hook)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def get(self, url, **kwargs):
+        return self.session().get(url, **kwargs)
+
+    def stats(self):
+        """Conexiones reutilizadas (hits) vs. conexiones nuevas (misses)"""
+        total_requests = 0
+        new_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            new_connections += pool.num_connections
+        return {"hits": max(total_requests - new_connections, 0), "misses": new_connections}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self.adapter.close()
+
+
+class AsyncPoolStats:
+    """Cuenta conexiones nuevas y reutilizadas de una aiohttp.ClientSession"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def _on_reuse(self, session, ctx, params):
+        self.hits += 1
+
+    async def _on_create(self, session, ctx, params):
+        self.misses += 1
+
+    def trace_config(self):
+        config = aiohttp.TraceConfig()
+        config.on_connection_reuseconn.append(self._on_reuse)
+        config.on_connection_create_end.append(self._on_create)
+        return config
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def create_async_session(pool_size, headers=None, timeout=10, stats=None):
+    """Crea una aiohttp.ClientSession con keep-alive y pool por host de pool_size"""
+    import_aiohttp()
+
+    session_headers = dict(headers or {})
+    session_headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+    connector = aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size, keepalive_timeout=30)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        headers=session_headers,
+        trace_configs=[stats.trace_config()] if stats is not None else None,
+    )
+
+
+def format_pool_stats(stats):
+    total = stats["hits"] + stats["misses"]
+    hit_rate = 100.0 * stats["hits"] / total if total else 0.0
+    return f"{stats['hits']} reused / {stats['misses']} new connections ({hit_rate:.1f}% reuse)"
@@ -0,0 +1,61 @@
+"""Procesamiento de una página descargada: texto, n-gramas y links.
+
+Todo lo que está aquí es trabajo de CPU sin estado compartido, así que se
+puede ejecutar tanto en los threads del crawler como en procesos aparte.
+"""
+import time
+from urllib.parse import quote
+
+from html_extract import BASE_WIKI, extract_page
+from tokenizer import get_tokenizer
+
+STOPWORDS = "es"  # Idioma de las stopwords (es, en), archivo propio o varios separados por coma
+
+
+def clean_and_process_text(text, stopwords=STOPWORDS):
+    return get_tokenizer(stopwords).tokenize(text)
+
+
+def generate_ngrams(words, n):
+    """Mismos n-gramas que nltk.util.ngrams, sin importar NLTK (~0.2 s al arrancar)"""
+    return [' '.join(gram) for gram in zip(*(words[i:] for i in range(n)))]
+
+
+def build_page_record(title, html, backend="auto", compact=False, stopwords=STOPWORDS, timings=None):
+    """Parsea el HTML de una página y arma su registro (sin edits_per_day).
+
+    Con compact=True el registro no incluye bigrams ni trigrams: se derivan
+    de word_list donde se consumen (ngram_column en spark_analyzer). Si se
+    pasa timings (un dict), se le agregan los segundos de "ngrams".
+    """
+    if isinstance(html, bytes):
+        html = html.decode('utf-8', errors='replace')
+    page_title, full_text, links = extract_page(html, backend)
+    if not page_title:
+        page_title = title.replace('_', ' ')
+
+    word_list = clean_and_process_text(full_text, stopwords)
+
+    record = {
+        "url": BASE_WIKI + quote(title.replace(' ', '_')),
+        "title": page_title,
+        "word_list": word_list,
+    }
+    if not compact:
+        start = time.perf_counter()
+        record["bigrams"] = generate_ngrams(word_list, 2)
+        record["trigrams"] = generate_ngrams(word_list, 3)
+        if timings is not None:
+            timings["ngrams"] = time.perf_counter() - start
+    record["edits_per_day"] = 0
+    record["links"] = links
+    return record
+
+
+def build_page_record_timed(title, html, backend="auto", compact=False, stopwords=STOPWORDS):
+    """build_page_record más sus tiempos: {"parse": segundos sin los n-gramas, "ngrams": segundos}"""
+    timings = {"ngrams": 0.0}
+    start = time.perf_counter()
+    item = build_page_record(title, html, backend, compact, stopwords, timings)
+    timings["parse"] = time.perf_counter() - start - timings["ngrams"]
+    return item, timings
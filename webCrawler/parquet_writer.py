@@ -0,0 +1,230 @@
+"""Salida del crawler en archivos Parquet (--format parquet).
+
+Los registros se acumulan por columna y se escriben en row groups de
+row_group_records registros. Las columnas de texto (word_list, bigrams,
+trigrams, links) son listas de strings con codificación de diccionario,
+así cada n-grama repetido se guarda una vez por row group en lugar de una
+vez por página.
+
+Un archivo Parquet solo se puede leer cuando tiene el footer, así que los
+títulos de un archivo se entregan a on_flushed recién al cerrarlo (por
+tamaño o al terminar). Un checkpoint no cierra archivos: guarda solo los
+cerrados, y las páginas de los abiertos siguen en vuelo, así que si el
+crawl se corta se vuelven a pedir. Los archivos usan los mismos nombres
+part-NNNNN y el mismo manifest.json que shard_writer.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# pyarrow se importa con _import_pyarrow() al crear el primer ParquetWriter
+pa = None
+pq = None
+
+from shard_writer import MANIFEST_NAME, SHARD_PREFIX, load_manifest
+
+EXTENSION = ".parquet"
+
+
+def _import_pyarrow():
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from None
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def record_schema():
+    """Mismos campos y orden que build_page_record"""
+    _import_pyarrow()
+    return pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("word_list", pa.list_(pa.string())),
+        ("bigrams", pa.list_(pa.string())),
+        ("trigrams", pa.list_(pa.string())),
+        ("edits_per_day", pa.float64()),
+        ("links", pa.list_(pa.string())),
+    ])
+
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class _ParquetFile:
+    def __init__(self, path, schema, compression):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._writer = pq.ParquetWriter(path, schema, compression=compression, use_dictionary=True)
+        self.schema = schema
+        self.lock = threading.Lock()  # Lo toman el thread dueño del archivo y los checkpoints
+        self.columns = {name: [] for name in schema.names}
+        self.titles = []
+        self.records = 0
+        self.raw_bytes = 0  # Bytes que ocuparían los registros en JSONL
+
+    def write(self, item, line, title):
+        for name, values in self.columns.items():
+            values.append(item.get(name))
+        self.titles.append(title)
+        self.records += 1
+        self.raw_bytes += len(line.encode("utf-8")) + 1
+
+    @property
+    def buffered(self):
+        return len(self.columns["url"])
+
+    def write_row_group(self):
+        if not self.buffered:
+            return
+        self._writer.write_table(pa.Table.from_pydict(self.columns, schema=self.schema))
+        for values in self.columns.values():
+            values.clear()
+
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def finish(self):
+        self.write_row_group()
+        self._writer.close()
+        return self.titles
+
+
+class ParquetWriter:
+    """Misma interfaz que ShardWriter, con archivos Parquet en lugar de JSONL"""
+
+    def __init__(self, folder, compression="zstd", max_file_bytes=128 * 1024 * 1024,
+                 row_group_records=1000, on_flushed=None, on_closed=None):
+        _import_pyarrow()
+        self.folder = folder
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        self.row_group_records = row_group_records
+        self.on_flushed = on_flushed
+        self.on_closed = on_closed
+        self.schema = record_schema()
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._open = {}  # id del thread -> _ParquetFile
+        self.shards = load_manifest(folder)["shards"]
+        self._recover()
+        self._next_index = max((int(s["path"][len(SHARD_PREFIX):].split(".", 1)[0]) for s in self.shards),
+                               default=-1) + 1
+
+    def _recover(self):
+        """Agrega al manifest los archivos completos de un crawl interrumpido y borra los que no tienen footer"""
+        listed = {s["path"] for s in self.shards}
+        changed = False
+        for path in sorted(glob.glob(os.path.join(self.folder, SHARD_PREFIX + "*" + EXTENSION))):
+            if os.path.basename(path) in listed:
+                continue
+            try:
+                metadata = pq.read_metadata(path)
+            except Exception:
+                # Sus páginas nunca se marcaron como visitadas, así que se vuelven a pedir
+                os.remove(path)
+                print(f"Removed unclosed Parquet file {os.path.basename(path)}")
+                continue
+            raw_bytes = sum(len(json.dumps(r, ensure_ascii=False).encode("utf-8")) + 1
+                            for r in pq.read_table(path).to_pylist())
+            self.shards.append(self._entry(os.path.basename(path), metadata.num_rows, raw_bytes))
+            changed = True
+        if changed:
+            self._save_manifest()
+
+    def _entry(self, name, records, raw_bytes):
+        path = os.path.join(self.folder, name)
+        return {
+            "path": name,
+            "records": records,
+            "bytes": raw_bytes,
+            "compressed_bytes": os.path.getsize(path),
+            "compression": f"parquet-{self.compression}",
+            "sha256": _file_sha256(path),
+            "closed": time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"compression": f"parquet-{self.compression}", "shards": self.shards}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _new_file(self):
+        with self._lock:
+            name = f"{SHARD_PREFIX}{self._next_index:05d}{EXTENSION}"
+            self._next_index += 1
+            parquet_file = _ParquetFile(os.path.join(self.folder, name), self.schema, self.compression)
+            self._open[threading.get_ident()] = parquet_file
+        return parquet_file
+
+    def write(self, line, title=None, item=None):
+        if item is None:
+            item = json.loads(line)
+        parquet_file = self._open.get(threading.get_ident()) or self._new_file()
+        full = False
+        with parquet_file.lock:
+            parquet_file.write(item, line, title)
+            if parquet_file.buffered >= self.row_group_records:
+                parquet_file.write_row_group()
+                full = parquet_file.size() >= self.max_file_bytes
+        if full:
+            self._close_file(threading.get_ident())
+
+    def _close_file(self, key):
+        with self._lock:
+            parquet_file = self._open.pop(key)
+        # El footer y el sha256 se escriben sin el lock compartido
+        with parquet_file.lock:
+            titles = parquet_file.finish()
+        entry = self._entry(parquet_file.name, parquet_file.records, parquet_file.raw_bytes)
+        with self._lock:
+            self.shards.append(entry)
+            self._save_manifest()
+            if titles and self.on_flushed is not None:
+                self.on_flushed(titles)
+        if self.on_closed is not None:
+            self.on_closed(parquet_file.path)
+        print(f"Closed Parquet file {parquet_file.name}: {entry['records']} records, "
+              f"{entry['bytes'] / (1024 * 1024):.2f} MB as JSONL -> {entry['compressed_bytes'] / (1024 * 1024):.2f} MB")
+
+    @contextmanager
+    def checkpoint(self):
+        """Registros por archivo cerrado; los abiertos no se tocan y siguen creciendo hasta max_file_bytes"""
+        with self._lock:
+            yield {s["path"]: s["records"] for s in self.shards}
+
+    def iter_records_after(self, positions):
+        for entry in list(self.shards):
+            table = pq.read_table(os.path.join(self.folder, entry["path"]))
+            for record in table.slice(positions.get(entry["path"], 0)).to_pylist():
+                yield record
+
+    def data_size(self):
+        return sum(s["bytes"] - s["records"] for s in self.shards)
+
+    def close(self):
+        for key in list(self._open):
+            self._close_file(key)
+
+    def report(self):
+        raw = sum(s["bytes"] for s in self.shards)
+        on_disk = sum(s["compressed_bytes"] for s in self.shards)
+        ratio = raw / on_disk if on_disk else 0
+        return (f"{len(self.shards)} Parquet files ({self.compression}), {raw / (1024 * 1024):.2f} MB as JSONL -> "
+                f"{on_disk / (1024 * 1024):.2f} MB on disk ({ratio:.1f}x), manifest {self.manifest_path}")
@@ -0,0 +1,97 @@
+"""Etapa de parseo del crawler sobre un ProcessPoolExecutor.
+
+Los threads de fetch entregan el HTML crudo (bytes) por una cola acotada;
+cuando la cola se llena, submit() bloquea y el fetch se frena solo
+(backpressure). Un thread despachador pasa los trabajos al pool sin tener
+nunca más de un trabajo en vuelo por proceso.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+
+from page_parser import build_page_record_timed
+
+
+class ParseStage:
+    def __init__(self, workers, queue_size, backend="auto", compact=False, stopwords="es", on_timings=None):
+        """on_timings(timings) recibe los tiempos de cada página (ver build_page_record_timed)"""
+        self.workers = workers
+        self.backend = backend
+        self.compact = compact
+        self.stopwords = stopwords
+        self.on_timings = on_timings
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.handoff = Queue(maxsize=queue_size)
+        self._slots = threading.Semaphore(workers)
+        self._stats_lock = threading.Lock()
+        self.pages = 0
+        self.errors = 0
+        self.busy_seconds = 0.0  # Suma del tiempo de parseo en los procesos
+        self.blocked_seconds = 0.0  # Tiempo que el fetch esperó por cola llena
+        self.started = time.perf_counter()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, title, html, callback):
+        """Entrega una página; callback(item) se llama con el registro, o None si falló"""
+        start = time.perf_counter()
+        self.handoff.put((title, html, callback))
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.blocked_seconds += waited
+
+    async def parse_async(self, title, html):
+        """Versión para el engine async: espera el registro sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+
+        def callback(item):
+            loop.call_soon_threadsafe(result.set_result, item)
+
+        # submit() puede bloquear si la cola está llena, así que corre en un thread
+        await loop.run_in_executor(None, self.submit, title, html, callback)
+        return await result
+
+    def _dispatch(self):
+        while True:
+            job = self.handoff.get()
+            if job is None:
+                return
+            title, html, callback = job
+            self._slots.acquire()
+            future = self.executor.submit(build_page_record_timed, title, html, self.backend, self.compact,
+                                          self.stopwords)
+            future.add_done_callback(lambda f, title=title, callback=callback: self._done(f, title, callback))
+
+    def _done(self, future, title, callback):
+        self._slots.release()
+        item = None
+        try:
+            item, timings = future.result()
+            with self._stats_lock:
+                self.pages += 1
+                self.busy_seconds += timings["parse"] + timings["ngrams"]
+            if self.on_timings is not None:
+                self.on_timings(timings)
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            print(f"Error parsing {title}: {str(e)}")
+        callback(item)
+
+    def close(self):
+        """Espera a que se parseen las páginas pendientes y apaga el pool"""
+        self.handoff.put(None)
+        self._dispatcher.join()
+        self.executor.shutdown(wait=True)
+
+    def utilisation(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return self.busy_seconds / (self.workers * elapsed)
+
+    def report(self):
+        return (f"{self.pages} pages on {self.workers} processes, "
+                f"{100 * self.utilisation():.1f}% busy, "
+                f"fetch blocked {self.blocked_seconds:.2f}s on full hand-off queue")
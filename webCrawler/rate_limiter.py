@@ -0,0 +1,76 @@
+"""Token bucket para limitar los requests del crawler sin espera activa"""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket thread-safe con costos por request.
+
+    acquire() reserva los tokens de inmediato, aunque el saldo quede negativo,
+    y luego duerme exactamente el tiempo necesario para pagar esa deuda. Cada
+    reserva nueva hereda la deuda de las anteriores, así que los waiters se
+    atienden en orden de llegada (FIFO) y nadie hace polling.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self._fixed_capacity = capacity is not None
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last_check = time.monotonic()
+        self.lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_check
+        self.last_check = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def _reserve(self, cost):
+        """Descuenta cost tokens y retorna los segundos que hay que esperar"""
+        with self.lock:
+            self._refill()
+            self.tokens -= cost
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            self.total_wait += wait
+            return wait
+
+    def set_rate(self, rate):
+        """Cambia el rate en caliente; los tokens acumulados hasta ahora se respetan"""
+        with self.lock:
+            self._refill()
+            self.rate = rate
+            if not self._fixed_capacity:
+                self.capacity = rate
+            self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Nadie obtiene tokens durante al menos seconds (Retry-After), llevando el saldo a esa deuda"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def consume(self, cost=1):
+        """Versión no bloqueante: toma los tokens solo si están disponibles"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return True
+            return False
+
+    def acquire(self, cost=1):
+        """Bloquea el thread hasta que el request pueda salir; retorna la espera"""
+        wait = self._reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, cost=1):
+        """Igual que acquire(), pero cede el event loop mientras espera"""
+        wait = self._reserve(cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
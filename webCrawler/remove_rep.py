@@ -1,12 +1,54 @@
+"""Quita los registros repetidos (misma url normalizada) de la salida del crawler.
+
+Se queda con la primera aparición de cada url y respeta el orden de la
+entrada. Las líneas se copian tal cual: la url se lee del prefijo
+{"url": "...", que es como empiezan los registros del crawler, y solo las
+líneas con otra forma pasan por json.loads.
+
+Mientras las urls vistas entran en --memory-mb todo se hace en una pasada.
+Si no, el resto de la entrada se reparte en particiones en disco según el
+hash de la url (con las urls ya vistas como marcas al principio de cada
+una), cada partición se deduplica por separado y los sobrevivientes se
+juntan por posición. Una partición que tampoco entra se vuelve a repartir.
+Con --workers N > 1 cada archivo de entrada se particiona en un proceso y
+las particiones se deduplican en paralelo.
+
+    python webCrawler/remove_rep.py
+    python webCrawler/remove_rep.py webCrawler/wiki_data -o dedup.jsonl --workers 4 --memory-mb 512
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import heapq
+import io
 import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+from multiprocessing import Pool
 from urllib.parse import unquote
 
+try:
+    import zstandard  # Solo requerido para leer shards .jsonl.zst
+except ImportError:
+    zstandard = None
+
 input_file = "webCrawler/wiki_data/wiki_data.jsonl"
 output_file = "webCrawler/wiki_data/wiki_dataREVISED.jsonl"
 
-seen_urls = set() # Guardar la url unica
-duplicates = 0 
-total = 0
+MEMORY_MB = 1024  # Límite para el set de urls vistas (entre todos los procesos)
+PARTITIONS = 64  # Particiones por cada reparto a disco
+MAX_LEVELS = 6  # Repartos anidados de una partición que no entra en memoria
+SET_ENTRY_BYTES = 75  # Costo aproximado de cada url en el set, además de su largo
+MANIFEST_NAME = "manifest.json"
+
+_URL_PREFIX = b'{"url": "'
+_RECORD = struct.Struct(">IQII")  # archivo, línea, largo de la url, largo de la línea (0 = marca)
+_SURVIVOR = struct.Struct(">IQI")  # archivo, línea, largo de la línea
+
 
 def normalize_url(url):
     if not url:
@@ -16,19 +58,291 @@ def normalize_url(url):
     url = url.lower() # Necesario normalizar la url para evitar duplicados
     return url
 
-with open(input_file, "r", encoding="utf-8") as infile, open(output_file, "w", encoding="utf-8") as outfile:
-    for line in infile:
-        total += 1
-        try:
-            obj = json.loads(line)
-            url = obj.get("url")
-            norm_url = normalize_url(url)
-            if norm_url and norm_url not in seen_urls:
-                seen_urls.add(norm_url)
-                outfile.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+def extract_url(line, fast=True):
+    """url de una línea JSONL; None si no tiene, y ValueError si la línea no es JSON"""
+    if fast and line.startswith(_URL_PREFIX):
+        start = len(_URL_PREFIX)
+        end = line.find(b'"', start)
+        # Una url con escapes, o una línea cortada, se deja a json.loads
+        if end != -1 and line.find(b"\\", start, end) == -1 and line.rstrip().endswith(b"}"):
+            return line[start:end].decode("utf-8")
+    obj = json.loads(line)
+    return obj.get("url") if isinstance(obj, dict) else None
+
+
+def input_paths(paths):
+    """Expande carpetas a sus shards (en el orden del manifest) o a sus *.jsonl"""
+    result = []
+    for path in paths:
+        if not os.path.isdir(path):
+            result.append(path)
+        elif os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                result.extend(os.path.join(path, s["path"]) for s in json.load(f)["shards"])
+        else:
+            result.extend(sorted(glob.glob(os.path.join(path, "*.jsonl"))))
+    return result
+
+
+def open_lines(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Reading zstd shards requires zstandard (pip install zstandard)")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb", buffering=1024 * 1024)
+
+
+def scan(file_index, path, counts, fast=True):
+    """Registros (archivo, línea, url normalizada, línea) de un archivo de entrada"""
+    with open_lines(path) as f:
+        for lineno, line in enumerate(f):
+            counts["lines"] += 1
+            try:
+                url = extract_url(line, fast)
+            except ValueError:
+                counts["invalid"] += 1  # Si existe alguna linea que no se pueda decodificar, simplemente la ignoramos
+                continue
+            key = normalize_url(url).encode("utf-8")
+            if not key:
+                counts["duplicates"] += 1  # Como antes, un registro sin url se descarta
+                continue
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            yield file_index, lineno, key, line
+
+
+def new_counts():
+    return {"lines": 0, "duplicates": 0, "invalid": 0, "spilled": 0, "partitions": 0}
+
+
+def add_counts(total, counts):
+    for name, value in counts.items():
+        total[name] += value
+
+
+class Spill:
+    """Particiones en disco de los registros, según el hash de la url; cada nivel usa otro hash"""
+
+    def __init__(self, tmp_dir, level, fanout=PARTITIONS):
+        self.folder = tempfile.mkdtemp(prefix=f"level{level}-", dir=tmp_dir)
+        self.salt = level.to_bytes(2, "big")
+        self.paths = [os.path.join(self.folder, f"{p:03d}") for p in range(fanout)]
+        self._files = [None] * fanout
+
+    def add(self, file_index, lineno, key, line, counts):
+        p = int.from_bytes(hashlib.blake2b(key, digest_size=8, salt=self.salt).digest(), "big") % len(self.paths)
+        f = self._files[p]
+        if f is None:
+            f = self._files[p] = open(self.paths[p], "wb", buffering=256 * 1024)
+        f.write(_RECORD.pack(file_index, lineno, len(key), len(line)))
+        f.write(key)
+        f.write(line)
+        if line:
+            counts["spilled"] += 1
+
+    def add_marker(self, key, counts):
+        """La url ya apareció antes: sus próximas apariciones son repetidas"""
+        self.add(0, 0, key, b"", counts)
+
+    def close(self):
+        """Cierra los archivos; retorna las particiones que recibieron algo"""
+        for f in self._files:
+            if f is not None:
+                f.close()
+        return [path for path, f in zip(self.paths, self._files) if f is not None]
+
+
+def read_records(paths):
+    for path in paths:
+        with open(path, "rb", buffering=1024 * 1024) as f:
+            while True:
+                header = f.read(_RECORD.size)
+                if not header:
+                    break
+                file_index, lineno, key_len, line_len = _RECORD.unpack(header)
+                key = f.read(key_len)
+                yield file_index, lineno, key, f.read(line_len)
+
+
+def dedupe_stream(records, write, memory_bytes, tmp_dir, level, counts):
+    """Deduplica records en orden pasando los sobrevivientes a write(archivo, línea, texto).
+
+    Cuando el set de urls pasa memory_bytes, lo que queda se reparte en un
+    Spill, precedido por las urls vistas hasta ahí. Retorna las particiones
+    que quedan por deduplicar (una lista vacía si todo entró en memoria).
+    """
+    seen = set()
+    used = 0
+    records = iter(records)
+    for file_index, lineno, key, line in records:
+        if key in seen:
+            if line:
+                counts["duplicates"] += 1
+            continue
+        seen.add(key)
+        if line:
+            write(file_index, lineno, line)
+        used += len(key) + SET_ENTRY_BYTES
+        if used > memory_bytes and level < MAX_LEVELS:
+            break
+    else:
+        return []
+    spill = Spill(tmp_dir, level)
+    for key in seen:
+        spill.add_marker(key, counts)
+    seen = None
+    for record in records:
+        spill.add(*record, counts)
+    partitions = spill.close()
+    counts["partitions"] += len(partitions)
+    return partitions
+
+
+def reduce_partition(path, memory_bytes, tmp_dir, level):
+    """Deduplica una partición; retorna su archivo de sobrevivientes (ordenado) y los contadores"""
+    counts = new_counts()
+    survivors = path + ".out"
+    with open(survivors, "wb", buffering=1024 * 1024) as out:
+        def write(file_index, lineno, line):
+            out.write(_SURVIVOR.pack(file_index, lineno, len(line)))
+            out.write(line)
+
+        nested = dedupe_stream(read_records([path]), write, memory_bytes, tmp_dir, level, counts)
+    os.remove(path)
+    if not nested:
+        return survivors, counts
+    outputs = [survivors]
+    for sub in nested:
+        sub_output, sub_counts = reduce_partition(sub, memory_bytes, tmp_dir, level + 1)
+        outputs.append(sub_output)
+        add_counts(counts, sub_counts)
+    # Se juntan acá para que el merge final tenga a lo sumo un archivo por partición abierto
+    merged = path + ".merged"
+    with open(merged, "wb", buffering=1024 * 1024) as out:
+        for file_index, lineno, line in heapq.merge(*(read_survivors(output) for output in outputs)):
+            out.write(_SURVIVOR.pack(file_index, lineno, len(line)))
+            out.write(line)
+    for output in outputs:
+        os.remove(output)
+    return merged, counts
+
+
+def read_survivors(path):
+    # Buffer chico: en el merge hay un archivo abierto por partición
+    with open(path, "rb", buffering=64 * 1024) as f:
+        while True:
+            header = f.read(_SURVIVOR.size)
+            if not header:
+                return
+            file_index, lineno, line_len = _SURVIVOR.unpack(header)
+            yield file_index, lineno, f.read(line_len)
+
+
+def merge_survivors(paths, out):
+    """Agrega al final de out los sobrevivientes de las particiones, en el orden de la entrada"""
+    for _, _, line in heapq.merge(*(read_survivors(path) for path in paths)):
+        out.write(line)
+
+
+def _partition_input(job):
+    """Proceso de --workers: reparte un archivo de entrada entero en particiones"""
+    file_index, path, tmp_dir, fast = job
+    counts = new_counts()
+    spill = Spill(tmp_dir, 0)
+    for record in scan(file_index, path, counts, fast):
+        spill.add(*record, counts)
+    return spill.paths, spill.close(), counts
+
+
+def _reduce_job(job):
+    path, memory_bytes, tmp_dir = job
+    return reduce_partition(path, memory_bytes, tmp_dir, 1)
+
+
+def concat_partition(paths, target):
+    """Une las partes de una misma partición, en el orden de los archivos de entrada"""
+    with open(target, "wb") as out:
+        for path in paths:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+            os.remove(path)
+    return target
+
+
+def dedupe(paths, output, memory_bytes, workers=1, tmp_dir=None, fast=True):
+    counts = new_counts()
+    tmp_dir = tempfile.mkdtemp(prefix="remove_rep-", dir=tmp_dir or os.path.dirname(os.path.abspath(output)))
+    try:
+        with open(output, "wb", buffering=1024 * 1024) as out:
+            if workers <= 1:
+                def records():
+                    for file_index, path in enumerate(paths):
+                        yield from scan(file_index, path, counts, fast)
+
+                partitions = dedupe_stream(records(), lambda file_index, lineno, line: out.write(line),
+                                           memory_bytes, tmp_dir, 0, counts)
+                survivors = []
+                for path in partitions:
+                    survivor, part_counts = reduce_partition(path, memory_bytes, tmp_dir, 1)
+                    survivors.append(survivor)
+                    add_counts(counts, part_counts)
+                merge_survivors(survivors, out)
             else:
-                duplicates += 1
-        except json.JSONDecodeError:
-            continue  # Si existe alguna linea que no se pueda decodificar, simplemente la ignoramos
+                with Pool(workers) as pool:
+                    # Partición p de cada archivo, en el orden de los archivos
+                    parts = {}
+                    jobs = [(i, path, tmp_dir, fast) for i, path in enumerate(paths)]
+                    for all_paths, written, part_counts in pool.imap(_partition_input, jobs):
+                        add_counts(counts, part_counts)
+                        for p, path in enumerate(all_paths):
+                            if path in written:
+                                parts.setdefault(p, []).append(path)
+                    partitions = [concat_partition(parts[p], os.path.join(tmp_dir, f"partition-{p:03d}"))
+                                  for p in sorted(parts)]
+                    counts["partitions"] += len(partitions)
+                    jobs = [(path, memory_bytes // workers, tmp_dir) for path in partitions]
+                    survivors = []
+                    for survivor, part_counts in pool.imap_unordered(_reduce_job, jobs):
+                        survivors.append(survivor)
+                        add_counts(counts, part_counts)
+                merge_survivors(survivors, out)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Remove records with a repeated normalized url, keeping the first")
+    parser.add_argument("inputs", nargs="*", default=[input_file],
+                        help="JSONL files or shards (.gz/.zst), or folders with a manifest.json or *.jsonl")
+    parser.add_argument("-o", "--output", default=output_file)
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_MB,
+                        help="Memory for the set of seen urls before spilling partitions to disk")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes; with more than 1 every input file is partitioned in its own process")
+    parser.add_argument("--tmp-dir", help="Folder for the partitions (default: next to the output)")
+    parser.add_argument("--full-parse", action="store_true", help="Read the url with json.loads on every line")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    paths = input_paths(args.inputs)
+    if os.path.abspath(args.output) in map(os.path.abspath, paths):
+        raise SystemExit("The output file cannot be one of the inputs")
+    start = time.perf_counter()
+    counts = dedupe(paths, args.output, int(args.memory_mb * 1024 * 1024), args.workers, args.tmp_dir,
+                    not args.full_parse)
+    seconds = time.perf_counter() - start
+    rate = counts["lines"] / seconds if seconds else 0
+    print(f"Processed {counts['lines']} lines from {len(paths)} files in {seconds:.2f}s ({rate:,.0f} lines/s). "
+          f"Removed {counts['duplicates']} duplicates, skipped {counts['invalid']} invalid lines. Output: {args.output}")
+    if counts["partitions"]:
+        print(f"Spilled {counts['spilled']} records to {counts['partitions']} partitions on disk")
+
 
-print(f"Processed {total} lines. Removed {duplicates} duplicates. Output: {output_file}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Cache en disco de respuestas HTTP para reproducir un crawl sin Wikipedia.
+
+Los cuerpos se guardan por contenido, en objects/<sha256[:2]>/<sha256>, así
+que las respuestas idénticas ocupan un solo archivo. index.jsonl es
+append-only y lleva una línea por request: clave, status, headers
+relevantes y sha256 del cuerpo. La clave es el path más el query ordenado,
+sin el host, y por eso el mismo cache sirve detrás de cualquier servidor
+(ver replay_server.py).
+
+Los requests del action API con varios títulos (titles=A|B|...) se agrupan
+según el orden en que terminan las páginas, así que un replay casi nunca
+repite los mismos lotes. Al grabarlos, la respuesta se guarda además
+partida en una entrada por título, y get() arma la respuesta de cualquier
+combinación de títulos a partir de esas entradas.
+
+Se llena de dos formas:
+- crawleando con --record-cache DIR (engine de threads);
+- importando HTML de Parsoid ya guardado:
+  python replay_cache.py import-html html_samples replay_cache
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+INDEX_NAME = "index.jsonl"
+OBJECTS_DIR = "objects"
+REST_HTML_PATH = "/api/rest_v1/page/html/"
+# Pasos con los que el action API cambia un título pedido antes de buscar su página, en ese orden
+RENAME_STEPS = ("normalized", "converted", "redirects")
+# Headers que el crawler usa de una respuesta; el resto no se guarda
+KEPT_HEADERS = ("Content-Type", "ETag", "Content-Revision-Id", "Location")
+
+
+def request_key(url):
+    """Path y query ordenado de una URL, sin esquema ni host"""
+    parts = urlsplit(url)
+    # El path se vuelve a codificar para que "%C3%AD" y "í" den la misma clave
+    path = quote(unquote(parts.path))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return path + ("?" + query if query else "")
+
+
+def _multi_title_query(key):
+    """(path, parámetros sin titles, títulos) de un request del action API con varios títulos, o None"""
+    path, _, query = key.partition("?")
+    params = parse_qsl(query, keep_blank_values=True)
+    titles = [value for name, value in params if name == "titles"]
+    if not path.endswith("api.php") or len(titles) != 1 or "|" not in titles[0]:
+        return None
+    return path, [(name, value) for name, value in params if name != "titles"], titles[0].split("|")
+
+
+def _title_key(path, params, title):
+    return path + "?" + urlencode(sorted(params + [("titles", title)]))
+
+
+def split_query(data, titles):
+    """Título -> la respuesta que el API habría dado pidiéndolo solo, a partir de una con varios"""
+    query = data.get("query", {})
+    pages = list(query.get("pages", {}).items())
+    rest = {name: value for name, value in data.items() if name != "query"}
+    pieces = {}
+    for title in titles:
+        piece_query = {}
+        current = title
+        for step in RENAME_STEPS:
+            for entry in query.get(step, []):
+                if entry["from"] == current:
+                    piece_query[step] = [entry]
+                    current = entry["to"]
+                    break
+        # Los títulos inválidos vuelven con la forma pedida, no con la normalizada
+        found = [(pageid, page) for pageid, page in pages if page.get("title") in (current, title)]
+        if not found:
+            continue
+        piece_query["pages"] = dict(found[:1])
+        pieces[title] = dict(rest, query=piece_query)
+    return pieces
+
+
+def merge_queries(pieces):
+    """Une respuestas de un título cada una en la de un solo request con todos"""
+    merged = {name: value for name, value in pieces[0].items() if name != "query"}
+    query = {}
+    pages = {}
+    missing_ids = 0
+    for piece in pieces:
+        for step in RENAME_STEPS:
+            for entry in piece["query"].get(step, []):
+                if entry not in query.setdefault(step, []):
+                    query[step].append(entry)
+        for pageid, page in piece["query"].get("pages", {}).items():
+            # Dos títulos que llevan a la misma página (un redirect y su destino) la traen una sola vez
+            if any(other.get("title") == page.get("title") for other in pages.values()):
+                continue
+            if int(pageid) < 0:
+                # Las páginas inexistentes usan ids negativos que solo son únicos dentro de un request
+                missing_ids -= 1
+                pageid = str(missing_ids)
+            pages[pageid] = page
+    query = {step: entries for step, entries in query.items() if entries}
+    query["pages"] = pages
+    merged["query"] = query
+    return merged
+
+
+class ResponseCache:
+    def __init__(self, folder):
+        self.folder = folder
+        self.index_path = os.path.join(folder, INDEX_NAME)
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def _object_path(self, digest):
+        return os.path.join(self.folder, OBJECTS_DIR, digest[:2], digest)
+
+    def put(self, url, status, headers, body):
+        key = request_key(url)
+        headers = {name: headers[name] for name in KEPT_HEADERS if headers.get(name) is not None}
+        responses = [(key, body)]
+        multi = _multi_title_query(key)
+        if multi is not None and status == 200:
+            path, params, titles = multi
+            try:
+                pieces = split_query(json.loads(body), titles)
+            except (ValueError, AttributeError, KeyError):
+                pieces = {}
+            for title, piece in pieces.items():
+                responses.append((_title_key(path, params, title), json.dumps(piece, ensure_ascii=False).encode("utf-8")))
+        with self._lock:
+            lines = []
+            for response_key, response_body in responses:
+                entry = {"key": response_key, "status": status, "headers": headers,
+                         "sha256": self._store_object(response_body)}
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+                self.entries[response_key] = entry
+            os.makedirs(self.folder, exist_ok=True)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    def _store_object(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+        return digest
+
+    def _read(self, entry):
+        with open(self._object_path(entry["sha256"]), "rb") as f:
+            return entry["status"], entry["headers"], f.read()
+
+    def get(self, key):
+        """(status, headers, cuerpo) de la última respuesta guardada para key, o None.
+
+        Un request del action API con varios títulos que no se grabó tal cual
+        se arma con las entradas de cada título; si falta alguno, es None.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            return self._read(entry)
+        multi = _multi_title_query(key)
+        if multi is None:
+            return None
+        path, params, titles = multi
+        entries = [self.entries.get(_title_key(path, params, title)) for title in titles]
+        if any(entry is None or entry["status"] != 200 for entry in entries):
+            return None
+        pieces = [json.loads(self._read(entry)[2]) for entry in entries]
+        return 200, entries[0]["headers"], json.dumps(merge_queries(pieces), ensure_ascii=False).encode("utf-8")
+
+    def recorder(self):
+        """Hook de respuestas de requests (SessionPool(response_hook=...)) que guarda cada respuesta"""
+        def record(resp, *args, **kwargs):
+            if resp.status_code < 500:
+                self.put(resp.url, resp.status_code, resp.headers, resp.content)
+        return record
+
+    def size_bytes(self):
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.folder, OBJECTS_DIR, "*", "*")))
+
+
+def import_html(folder, cache_folder):
+    """Agrega al cache cada <título>.html de folder como respuesta del REST API"""
+    cache = ResponseCache(cache_folder)
+    paths = sorted(glob.glob(os.path.join(folder, "*.html")))
+    for path in paths:
+        title = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as f:
+            cache.put(REST_HTML_PATH + quote(title.replace(" ", "_")), 200,
+                      {"Content-Type": "text/html; charset=utf-8"}, f.read())
+    return cache, len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or fill the crawler replay cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    importer = sub.add_parser("import-html", help="Add saved Parsoid .html pages as REST API responses")
+    importer.add_argument("folder", help="Folder with <title>.html files")
+    importer.add_argument("cache", help="Replay cache folder")
+    stats = sub.add_parser("stats", help="Summarise a replay cache")
+    stats.add_argument("cache", help="Replay cache folder")
+    args = parser.parse_args()
+
+    if args.command == "import-html":
+        cache, imported = import_html(args.folder, args.cache)
+        print(f"Imported {imported} pages; {len(cache)} responses in {args.cache}")
+    else:
+        cache = ResponseCache(args.cache)
+        html = sum(1 for key in cache.entries if key.startswith(REST_HTML_PATH))
+        print(f"{len(cache)} responses ({html} REST HTML, {len(cache) - html} action API), "
+              f"{cache.size_bytes() / (1024 * 1024):.2f} MB of unique bodies")
+
+
+if __name__ == "__main__":
+    main()
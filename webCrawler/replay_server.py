@@ -0,0 +1,142 @@
+"""Servidor local que reproduce un replay_cache como si fuera Wikipedia.
+
+Responde los paths del REST API y del action API desde el cache, con una
+latencia configurable (base más jitter uniforme), una fracción de
+respuestas 503 y, con --max-rps, un 429 para los requests que pasan ese
+límite en un mismo segundo, como el throttling de Wikipedia. Los lotes de
+títulos del action API se arman con las entradas por título del cache,
+así que no hace falta que el replay repita los lotes de la grabación. Si
+un request no está en el cache, devuelve 404. Para apuntar el crawler al
+servidor se usa --wiki-url:
+
+    python replay_server.py replay_cache --port 8080 --latency-ms 80 --jitter-ms 40 --error-rate 0.01 --max-rps 150
+    python crawler.py --wiki-url http://127.0.0.1:8080 --skip-hdfs-check
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from replay_cache import ResponseCache, request_key
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cache, port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, max_rps=0):
+        super().__init__(("127.0.0.1", port), _ReplayHandler)
+        self.cache = cache
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self._second = None  # Segundo actual y requests atendidos en él, para max_rps
+        self._second_requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+        self.errors = 0
+        self.throttled = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        """Atiende requests en un thread daemon; retorna el servidor"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def plan(self):
+        """(segundos de espera, status de error o None) para un request"""
+        with self._lock:
+            self.requests += 1
+            second = int(time.monotonic())
+            if second != self._second:
+                self._second, self._second_requests = second, 0
+            self._second_requests += 1
+            if self.max_rps and self._second_requests > self.max_rps:
+                self.throttled += 1
+                return 0.0, 429
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return delay, 503
+        return delay, None
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def report(self):
+        return (f"{self.requests} requests, {self.misses} not in cache, {self.errors} injected errors, "
+                f"{self.throttled} throttled")
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, como Wikipedia
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        delay, error = server.plan()
+        if delay > 0:
+            time.sleep(delay)
+        if error is not None:
+            self._send(error, {"Retry-After": "1"}, b"")
+            return
+        cached = server.cache.get(request_key(self.path))
+        if cached is None:
+            server.miss()
+            self._send(404, {}, b"")
+            return
+        status, headers, body = cached
+        headers = dict(headers)
+        if "Location" in headers:
+            # Los redirects grabados apuntan a Wikipedia; se reescriben a este servidor
+            location = urlsplit(headers["Location"])
+            if location.netloc:
+                headers["Location"] = location.path + (f"?{location.query}" if location.query else "")
+        etag = headers.get("ETag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self._send(304, {"ETag": etag}, b"")
+            return
+        self._send(status, headers, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a replay cache as a local Wikipedia")
+    parser.add_argument("cache", help="Replay cache folder (see replay_cache.py)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra uniform random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--max-rps", type=int, default=0, help="Answer 429 above this many requests per second (0 = off)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache)
+    server = ReplayServer(cache, args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.seed,
+                          args.max_rps)
+    print(f"Replaying {len(cache)} responses from {args.cache} on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{server.report()}")
+
+
+if __name__ == "__main__":
+    main()
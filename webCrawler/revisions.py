@@ -0,0 +1,187 @@
+"""Revisiones de las páginas escritas y crawl incremental (--incremental).
+
+Por cada registro escrito se agrega a un log append-only la revisión y el
+ETag del HTML de Parsoid, una línea "título<TAB>revisión<TAB>etag" por
+página. Un crawl incremental compara esas revisiones con la última de cada
+página usando el action API, 50 títulos por request. Las páginas que no
+cambiaron se copian de la salida anterior sin pedir ni parsear su HTML. Si
+el lote no pudo resolver un título, se pide su HTML con If-None-Match y un
+304 tiene el mismo efecto.
+"""
+import json
+import os
+import re
+import threading
+from urllib.parse import unquote
+
+from edit_rate import MAX_TITLES_PER_QUERY, canonical_titles, resolve_titles_params
+
+# Parsoid responde ETag: W/"<revisión>/<id de render>"
+_ETAG_REVISION = re.compile(r'^(?:W/)?"(\d+)/')
+
+
+def revision_from_headers(headers):
+    """(revisión, etag) de una respuesta del REST API; cualquiera puede ser None"""
+    etag = headers.get("ETag")
+    revision = headers.get("Content-Revision-Id")
+    if revision is None and etag:
+        match = _ETAG_REVISION.match(etag)
+        if match:
+            revision = match.group(1)
+    if revision is not None:
+        revision = int(revision) if str(revision).isdigit() else None
+    return revision, etag
+
+
+def load_revisions(path):
+    """Título -> (revisión, etag); la última línea de cada título gana"""
+    revisions = {}
+    if not os.path.exists(path):
+        return revisions
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # La última línea queda incompleta si el proceso murió a mitad de un write
+            if not line.endswith("\n"):
+                break
+            title, revision, etag = line[:-1].split("\t")
+            revisions[title] = (int(revision) if revision else None, etag or None)
+    return revisions
+
+
+class RevisionLog:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, title, revision, etag):
+        line = f"{title}\t{'' if revision is None else revision}\t{etag or ''}\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def latest_revisions(titles, fetch_json, batch_size=MAX_TITLES_PER_QUERY):
+    """Última revisión de cada título (None si ya no existe) y requests usados.
+    Los títulos de un lote que falló no aparecen en el resultado."""
+    latest = {}
+    api_requests = 0
+    for i in range(0, len(titles), batch_size):
+        chunk = titles[i:i + batch_size]
+        try:
+            api_requests += 1
+            data = fetch_json(resolve_titles_params(chunk))
+        except Exception as e:
+            print(f"Error checking revisions: {str(e)}")
+            continue
+        pages = data.get("query", {}).get("pages", {}).values()
+        by_title = {page.get("title"): page.get("lastrevid") for page in pages}
+        for title, canonical in canonical_titles(data, chunk).items():
+            latest[title] = by_title.get(canonical) if canonical is not None else None
+    return latest, api_requests
+
+
+class PreviousOutput:
+    """Índice título -> (offset, largo) de los registros de una salida JSONL anterior"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if not os.path.exists(path):
+            return
+        self._file = open(path, "rb")
+        offset = 0
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                url = json.loads(line)["url"]
+            except (json.JSONDecodeError, KeyError):
+                offset += len(line)
+                continue
+            self.offsets[unquote(url.split("/wiki/")[-1])] = (offset, len(line))
+            offset += len(line)
+
+    def __contains__(self, title):
+        return title in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record(self, title):
+        offset, length = self.offsets[title]
+        with self._lock:
+            self._file.seek(offset)
+            return json.loads(self._file.read(length))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class IncrementalCrawl:
+    """Decide qué páginas de la corrida anterior se copian en lugar de volver a pedirse"""
+
+    def __init__(self, previous_output_path, previous_revisions):
+        self.previous = PreviousOutput(previous_output_path)
+        # Solo sirven las revisiones de páginas cuyo registro se puede copiar
+        self.revisions = {t: r for t, r in previous_revisions.items() if t in self.previous}
+        self.unchanged = set()
+        self._compared = set()
+        self._lock = threading.Lock()
+        self.api_requests = 0
+        self.carried = 0
+        self.not_modified = 0
+
+    def check(self, fetch_json, batch_size=MAX_TITLES_PER_QUERY):
+        """Compara las revisiones guardadas con las actuales antes de empezar el crawl"""
+        titles = [title for title, (revision, _) in self.revisions.items() if revision is not None]
+        latest, self.api_requests = latest_revisions(titles, fetch_json, batch_size)
+        self._compared = set(latest)
+        self.unchanged = {title for title, revision in latest.items()
+                          if revision is not None and revision == self.revisions[title][0]}
+
+    def is_unchanged(self, title):
+        return title in self.unchanged
+
+    def conditional_headers(self, title):
+        """If-None-Match para las páginas que el lote no pudo comparar"""
+        if title in self._compared:
+            return None
+        etag = self.revisions.get(title, (None, None))[1]
+        return {"If-None-Match": etag} if etag else None
+
+    def carry_forward(self, title, not_modified=False):
+        """Registro anterior de la página y su (revisión, etag)"""
+        record = self.previous.record(title)
+        with self._lock:
+            if not_modified:
+                self.not_modified += 1
+            else:
+                self.carried += 1
+        return record, self.revisions[title]
+
+    def close(self):
+        self.previous.close()
+
+    def report(self):
+        return (f"{self.carried + self.not_modified} records carried forward "
+                f"({self.carried} by revision check, {self.not_modified} by 304), "
+                f"{len(self.revisions)} pages in previous output, {len(self.unchanged)} unchanged, "
+                f"{self.api_requests} API requests")
@@ -0,0 +1,324 @@
+"""Salida del crawler en shards JSONL comprimidos y rotados por tamaño.
+
+Cada thread que escribe tiene su propio shard abierto, con su buffer y su
+lock, así que la compresión corre en paralelo y el lock compartido solo se
+toma al abrir o cerrar un shard y en los checkpoints. El buffer se
+comprime y se baja al archivo cada buffer_bytes; con gzip y zstd se hace
+un flush de bloque, de modo que lo ya escrito se puede leer aunque el
+proceso muera antes de cerrar el shard.
+
+Un shard se cierra al pasar max_shard_bytes en disco y se registra en
+manifest.json (registros, bytes, sha256), que es lo que usan el
+checkpoint del crawler y el uploader a HDFS.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import zstandard  # Solo requerido para compression="zstd"
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+EXTENSIONS = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+MANIFEST_NAME = "manifest.json"
+SHARD_PREFIX = "part-"
+
+
+class _NoCompression:
+    def compress(self, data):
+        return data
+
+    def sync(self):
+        return b""
+
+    def finish(self):
+        return b""
+
+
+class _GzipCompression:
+    def __init__(self, level):
+        # wbits=31: formato gzip, legible por gzip/zcat/Hadoop
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def sync(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _ZstdCompression:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def sync(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _compressor(kind, level):
+    if kind == "gzip":
+        return _GzipCompression(6 if level is None else level)
+    if kind == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires zstandard (pip install zstandard)")
+        return _ZstdCompression(3 if level is None else level)
+    if kind == "none":
+        return _NoCompression()
+    raise ValueError(f"Unknown compression '{kind}'")
+
+
+def _compression_of(path):
+    for kind, ext in EXTENSIONS.items():
+        if kind != "none" and path.endswith(ext):
+            return kind
+    return "none"
+
+
+def read_shard_lines(path):
+    """Líneas completas de un shard; tolera un shard que quedó sin cerrar"""
+    with open(path, "rb") as f:
+        data = f.read()
+    kind = _compression_of(path)
+    if kind == "gzip":
+        data = zlib.decompressobj(31).decompress(data)
+    elif kind == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd shards requires zstandard (pip install zstandard)")
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    # Lo que sigue al último salto de línea es un registro incompleto
+    return data[:data.rfind(b"\n") + 1].splitlines()
+
+
+def load_manifest(folder):
+    path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"shards": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def remove_shards(folder):
+    """Borra los shards y el manifest de un crawl anterior"""
+    for path in glob.glob(os.path.join(folder, SHARD_PREFIX + "*")) + [os.path.join(folder, MANIFEST_NAME)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class _Shard:
+    def __init__(self, path, compression, level):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.compression = compression
+        self._file = open(path, "wb")
+        self._compressor = _compressor(compression, level)
+        self.lock = threading.Lock()  # Lo toman el thread dueño del shard y los checkpoints
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._titles = []
+        self.records = 0
+        self.flushed_records = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def write(self, data, title):
+        self._buffer += data
+        self._titles.append(title)
+        self.records += 1
+        self.raw_bytes += len(data)
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    def _emit(self, chunk):
+        self._file.write(chunk)
+        self._sha256.update(chunk)
+        self.compressed_bytes += len(chunk)
+
+    def flush(self):
+        """Comprime el buffer y lo baja al archivo; retorna los títulos que quedaron escritos"""
+        if not self._buffer:
+            return []
+        self._emit(self._compressor.compress(bytes(self._buffer)) + self._compressor.sync())
+        self._file.flush()
+        self._buffer.clear()
+        titles, self._titles = self._titles, []
+        self.flushed_records = self.records
+        return titles
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def finish(self):
+        titles = self.flush()
+        self._emit(self._compressor.finish())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return titles
+
+    def manifest_entry(self):
+        return {
+            "path": self.name,
+            "records": self.records,
+            "bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "compression": self.compression,
+            "sha256": self._sha256.hexdigest(),
+            "closed": time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+class ShardWriter:
+    def __init__(self, folder, compression="gzip", max_shard_bytes=128 * 1024 * 1024,
+                 buffer_bytes=1024 * 1024, level=None, on_flushed=None, on_closed=None):
+        """on_flushed(titles) se llama con los títulos cuyos registros ya llegaron al archivo;
+        on_closed(path) con cada shard cerrado y registrado en el manifest"""
+        self.folder = folder
+        self.compression = compression
+        self.max_shard_bytes = max_shard_bytes
+        self.buffer_bytes = buffer_bytes
+        self.level = level
+        self.on_flushed = on_flushed
+        self.on_closed = on_closed
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+        _compressor(compression, level)  # Falla al inicio si falta la librería
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._open = {}  # id del thread -> _Shard
+        self.shards = load_manifest(folder)["shards"]
+        self._recover()
+        self._next_index = max((self._index_of(s["path"]) for s in self.shards), default=-1) + 1
+
+    @staticmethod
+    def _index_of(name):
+        return int(name[len(SHARD_PREFIX):].split(".", 1)[0])
+
+    def _recover(self):
+        """Cierra los shards que un crawl interrumpido dejó abiertos y los agrega al manifest"""
+        listed = {s["path"] for s in self.shards}
+        leftovers = sorted(p for p in glob.glob(os.path.join(self.folder, SHARD_PREFIX + "*"))
+                           if os.path.basename(p) not in listed and not p.endswith(".tmp"))
+        for path in leftovers:
+            lines = read_shard_lines(path)
+            shard = _Shard(path + ".tmp", _compression_of(path), self.level)
+            for line in lines:
+                shard.write(line + b"\n", None)
+            shard.finish()
+            os.replace(shard.path, path)
+            shard.path, shard.name = path, os.path.basename(path)
+            self.shards.append(shard.manifest_entry())
+            print(f"Recovered {len(lines)} records from unclosed shard {shard.name}")
+        if leftovers:
+            self._save_manifest()
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"compression": self.compression, "shards": self.shards}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _new_shard(self):
+        with self._lock:
+            name = f"{SHARD_PREFIX}{self._next_index:05d}{EXTENSIONS[self.compression]}"
+            self._next_index += 1
+            shard = _Shard(os.path.join(self.folder, name), self.compression, self.level)
+            self._open[threading.get_ident()] = shard
+        return shard
+
+    def _flushed(self, titles):
+        if titles and self.on_flushed is not None:
+            self.on_flushed(titles)
+
+    def write(self, line, title=None, item=None):
+        """item (el registro sin serializar) no se usa; está por compatibilidad con ParquetWriter"""
+        data = line.encode("utf-8") + b"\n"
+        shard = self._open.get(threading.get_ident()) or self._new_shard()
+        full = False
+        with shard.lock:
+            shard.write(data, title)
+            if shard.buffered >= self.buffer_bytes:
+                # Comprime sin el lock compartido; los otros threads siguen escribiendo
+                self._flushed(shard.flush())
+                full = shard.compressed_bytes >= self.max_shard_bytes
+        if full:
+            self._close_shard(threading.get_ident())
+
+    def _close_shard(self, key):
+        # Siempre self._lock antes que shard.lock, igual que checkpoint()
+        with self._lock:
+            shard = self._open.pop(key)
+            with shard.lock:
+                self._flushed(shard.finish())
+            self.shards.append(shard.manifest_entry())
+            self._save_manifest()
+        if self.on_closed is not None:
+            self.on_closed(shard.path)
+        print(f"Closed shard {shard.name}: {shard.records} records, "
+              f"{shard.raw_bytes / (1024 * 1024):.2f} MB -> {shard.compressed_bytes / (1024 * 1024):.2f} MB")
+
+    @contextmanager
+    def checkpoint(self):
+        """Baja a disco todos los buffers y da los registros escritos por shard.
+
+        Mientras dura el with ningún thread escribe ni entrega títulos a
+        on_flushed, así que lo que se guarde adentro queda consistente con
+        las posiciones.
+        """
+        with self._lock:
+            shards = list(self._open.values())
+            for shard in shards:
+                shard.lock.acquire()
+            try:
+                positions = {s["path"]: s["records"] for s in self.shards}
+                for shard in shards:
+                    self._flushed(shard.flush())
+                    shard.sync()
+                    positions[shard.name] = shard.flushed_records
+                yield positions
+            finally:
+                for shard in shards:
+                    shard.lock.release()
+
+    def iter_records_after(self, positions):
+        """Registros de los shards cerrados que no estaban escritos en positions"""
+        for entry in list(self.shards):
+            skip = positions.get(entry["path"], 0)
+            for line in read_shard_lines(os.path.join(self.folder, entry["path"]))[skip:]:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def data_size(self):
+        """Bytes de registros en los shards cerrados, sin contar los saltos de línea"""
+        return sum(s["bytes"] - s["records"] for s in self.shards)
+
+    def close(self):
+        for key in list(self._open):
+            self._close_shard(key)
+
+    def report(self):
+        raw = sum(s["bytes"] for s in self.shards)
+        compressed = sum(s["compressed_bytes"] for s in self.shards)
+        ratio = raw / compressed if compressed else 0
+        return (f"{len(self.shards)} {self.compression} shards, {raw / (1024 * 1024):.2f} MB raw -> "
+                f"{compressed / (1024 * 1024):.2f} MB on disk ({ratio:.1f}x), manifest {self.manifest_path}")
@@ -0,0 +1,142 @@
+"""Un crawl grabado con --record-cache se reproduce sin requests fuera del cache.
+
+    python -m pytest webCrawler/test_replay.py -q
+"""
+import contextlib
+import json
+import multiprocessing
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from edit_rate import canonical_titles
+from replay_cache import REST_HTML_PATH, ResponseCache, merge_queries, split_query
+from replay_server import ReplayServer
+
+PAGES = 30  # Page_0 .. Page_29 existen; Redir_N redirige a Page_N y Nada_N no existe
+
+
+def page_html(index):
+    links = [f"./Page_{(index * 3 + k) % PAGES}" for k in range(3)]
+    links += [f"./Redir_{(index + 5) % PAGES}", f"./Nada_{index}"]
+    anchors = " ".join(f'<a href="{link}" rel="mw:WikiLink">enlace</a>' for link in links)
+    return (f"<html><body><h1>Page {index}</h1><p>Texto de la página número {index} sobre la historia "
+            f"de la ciencia.</p><p>{anchors}</p></body></html>")
+
+
+def info_query(titles):
+    """Lo que responde prop=info&redirects=1: normalizaciones, redirects y páginas"""
+    query = {"normalized": [], "redirects": [], "pages": {}}
+    for title in titles:
+        current = title.replace("_", " ")
+        if current != title:
+            query["normalized"].append({"from": title, "to": current})
+        if current.startswith("Redir "):
+            target = "Page " + current.split()[-1]
+            query["redirects"].append({"from": current, "to": target})
+            current = target
+        name, _, number = current.partition(" ")
+        if name == "Page" and number.isdigit() and int(number) < PAGES:
+            query["pages"][str(100 + int(number))] = {"pageid": 100 + int(number), "ns": 0, "title": current}
+        elif not any(page["title"] == current for page in query["pages"].values()):
+            pageid = -1 - len([p for p in query["pages"] if int(p) < 0])
+            query["pages"][str(pageid)] = {"ns": 0, "title": current, "missing": ""}
+    return {"batchcomplete": "", "query": {step: value for step, value in query.items() if value}}
+
+
+class _FakeWikiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith(REST_HTML_PATH):
+            name, _, number = unquote(url.path[len(REST_HTML_PATH):]).partition("_")
+            if name == "Page" and number.isdigit() and int(number) < PAGES:
+                self._send(200, "text/html; charset=utf-8", page_html(int(number)).encode("utf-8"))
+            else:
+                self._send(404, "text/plain", b"")
+            return
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        data = info_query(params.get("titles", "").split("|"))
+        if params.get("prop") == "revisions":
+            for page in data["query"]["pages"].values():
+                if "missing" not in page:
+                    page["revisions"] = [{"timestamp": f"2024-01-0{day}T00:00:00Z"} for day in range(1, 4)]
+        self._send(200, "application/json", json.dumps(data).encode("utf-8"))
+
+
+def crawl(base_url, workdir, threads, record_folder, results):
+    """Corre crawl_rest en un proceso nuevo (el crawler usa globales) y deja los títulos escritos en results"""
+    import crawler
+    from http_session import SessionPool
+
+    crawler.REST_API_HTML = base_url + REST_HTML_PATH
+    crawler.API_URL = base_url + "/w/api.php"
+    crawler.MAX_THREADS = threads
+    crawler.MAX_DEPTH = 2
+    crawler.LOG_EVERY_PAGE = False
+    hook = ResponseCache(record_folder).recorder() if record_folder else None
+    crawler.http_pool = SessionPool(threads, crawler.HEADERS, response_hook=hook)
+    os.chdir(workdir)
+    os.makedirs(crawler.LOCAL_FOLDER, exist_ok=True)
+    output = os.path.join(crawler.LOCAL_FOLDER, "wiki_data.jsonl")
+    with open(output, "w", encoding="utf-8") as f, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        crawler.start_request_control(threads)
+        crawler.crawl_rest("Page_0", f, 0)
+    crawler.http_pool.close()
+    with open(output, "r", encoding="utf-8") as f:
+        results["titles"] = sorted(json.loads(line)["title"] for line in f)
+
+
+def run_crawl(base_url, workdir, threads, record_folder=None):
+    os.makedirs(workdir)
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.dict()
+        process = context.Process(target=crawl, args=(base_url, str(workdir), threads, record_folder, results))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        return dict(results)
+
+
+def test_split_and_merge_rebuild_any_batch():
+    titles = ["Page_1", "Redir_2", "Nada_3", "Page_2", "Redir_4"]
+    pieces = split_query(info_query(titles), titles)
+    assert sorted(pieces) == sorted(titles)
+    regrouped = ["Redir_4", "Nada_3", "Page_1"]
+    merged = merge_queries([pieces[title] for title in regrouped])
+    assert canonical_titles(merged, regrouped) == canonical_titles(info_query(regrouped), regrouped)
+
+
+def test_replay_reproduces_recorded_crawl(tmp_path):
+    source = ThreadingHTTPServer(("127.0.0.1", 0), _FakeWikiHandler)
+    threading.Thread(target=source.serve_forever, daemon=True).start()
+    cache_folder = str(tmp_path / "cache")
+    try:
+        recorded = run_crawl(f"http://127.0.0.1:{source.server_port}", tmp_path / "record", 4, cache_folder)
+    finally:
+        source.shutdown()
+
+    server = ReplayServer(ResponseCache(cache_folder)).start()
+    try:
+        # Otro número de threads cambia el orden de las páginas y los lotes de títulos
+        replayed = run_crawl(server.base_url, tmp_path / "replay", 8)
+    finally:
+        server.shutdown()
+
+    assert server.misses == 0, server.report()
+    assert replayed["titles"] == recorded["titles"]
+    assert recorded["titles"] and not any(title.startswith(("Redir", "Nada")) for title in recorded["titles"])
@@ -0,0 +1,140 @@
+"""Títulos canónicos antes de encolar: normalización local y redirects por lotes.
+
+Los links de una página llegan como hrefs crudos, y un mismo artículo
+aparece como redirect, con guiones bajos o espacios, o con la primera
+letra en minúscula. Antes de encolar, cada título se normaliza localmente
+(sin query, guiones bajos en vez de espacios, primera letra en mayúscula
+como hace MediaWiki). Después se resuelve contra el action API, 50 títulos
+por request, siguiendo normalizaciones y redirects. Así cada artículo se
+encola una sola vez, con el título de su página real.
+
+Lo resuelto se guarda en un mapa persistente que sirve a las corridas
+siguientes. Es un TSV append-only con una línea "título<TAB>canónico" por
+título, con el canónico vacío si la página no existe. Los títulos del mapa
+usan guiones bajos, igual que las claves de visited y de la frontera.
+"""
+import os
+import re
+import threading
+from urllib.parse import unquote
+
+from edit_rate import MAX_TITLES_PER_QUERY, canonical_titles, resolve_titles_params
+
+_SPACES = re.compile(r"[\s_]+")
+
+
+def normalize_title(title, capital_links=True):
+    """Forma local de un título: sin espacios repetidos, con guiones bajos y la primera letra en mayúscula"""
+    title = _SPACES.sub(" ", title).strip()
+    if capital_links and title:
+        first = title[0].upper()
+        # Algunas letras cambian de largo al pasarlas a mayúscula (ß -> SS); MediaWiki las deja
+        if len(first) == 1:
+            title = first + title[1:]
+    return title.replace(" ", "_")
+
+
+def title_from_link(link_url, capital_links=True):
+    """Título normalizado de la URL de un artículo, sin query (los redlinks llevan ?action=edit)"""
+    path = link_url.split("/wiki/")[-1].split("?", 1)[0]
+    return normalize_title(unquote(path), capital_links)
+
+
+def load_redirect_map(path):
+    """Título -> canónico (None si la página no existe); la última línea de cada título gana"""
+    mapping = {}
+    if not os.path.exists(path):
+        return mapping
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # La última línea queda incompleta si el proceso murió a mitad de un write
+            if not line.endswith("\n"):
+                break
+            title, canonical = line[:-1].split("\t")
+            mapping[title] = canonical or None
+    return mapping
+
+
+class TitleResolver:
+    def __init__(self, fetch_json, path=None, batch_size=MAX_TITLES_PER_QUERY, capital_links=True):
+        self.fetch_json = fetch_json
+        self.path = path
+        self.batch_size = min(batch_size, MAX_TITLES_PER_QUERY)
+        self.capital_links = capital_links
+        self.map = load_redirect_map(path) if path else {}
+        self.loaded = len(self.map)
+        self._lock = threading.Lock()
+        self._file = None
+        self.hits = 0
+        self.api_requests = 0
+        self.redirects = 0
+        self.missing = 0
+        self.errors = 0
+
+    def resolve(self, titles):
+        """Mapea cada título a su canónico, o a None si la página no existe.
+
+        Solo se consultan al API los títulos que no están en el mapa. Si un
+        lote falla, sus títulos quedan con la forma normalizada y se vuelven
+        a consultar la próxima vez.
+        """
+        normalized = {title: normalize_title(title, self.capital_links) for title in titles}
+        with self._lock:
+            unknown = [title for title in dict.fromkeys(normalized.values()) if title not in self.map]
+            self.hits += len(normalized) - len(unknown)
+
+        resolved = {}
+        for i in range(0, len(unknown), self.batch_size):
+            chunk = unknown[i:i + self.batch_size]
+            with self._lock:
+                self.api_requests += 1
+            try:
+                canon = canonical_titles(self.fetch_json(resolve_titles_params(chunk)), chunk)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"Error resolving redirects: {str(e)}")
+                continue
+            chunk_map = {title: canonical.replace(" ", "_") if canonical else None for title, canonical in canon.items()}
+            self._store(chunk_map)
+            resolved.update(chunk_map)
+
+        with self._lock:
+            return {title: resolved.get(norm, self.map.get(norm, norm)) for title, norm in normalized.items()}
+
+    def lookup(self, titles):
+        """Como resolve, pero solo con el mapa: un título desconocido queda con su forma normalizada"""
+        normalized = {title: normalize_title(title, self.capital_links) for title in titles}
+        with self._lock:
+            return {title: self.map.get(norm, norm) for title, norm in normalized.items()}
+
+    def _store(self, chunk_map):
+        lines = []
+        with self._lock:
+            for title, canonical in chunk_map.items():
+                self.map[title] = canonical
+                lines.append(f"{title}\t{canonical or ''}\n")
+                if canonical is None:
+                    self.missing += 1
+                elif canonical != title:
+                    self.redirects += 1
+                    # El canónico se resuelve a sí mismo sin otro request
+                    if canonical not in self.map:
+                        self.map[canonical] = canonical
+                        lines.append(f"{canonical}\t{canonical}\n")
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write("".join(lines))
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def report(self):
+        return (f"{len(self.map)} titles in the redirect map ({self.loaded} loaded), "
+                f"{self.redirects} redirects and {self.missing} missing pages resolved in "
+                f"{self.api_requests} API requests, {self.hits} cache hits")
@@ -0,0 +1,61 @@
+"""Tokenización del texto de las páginas para word_list.
+
+El patrón de puntuación se compila una vez y las stopwords son un
+frozenset por idioma (es, en) o archivo propio, cargado una sola vez por
+proceso. tokenize_batch procesa varias páginas con una sola pasada de
+regex y de lower() sobre el texto unido.
+"""
+import functools
+import os
+import re
+
+STOPWORDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stopwords")
+LANGUAGES = ("es", "en")
+
+_PUNCTUATION = re.compile(r'[^\w\s]', flags=re.UNICODE)
+# Separador de páginas en tokenize_batch; \x1e cuenta como \s, así que el patrón no lo borra
+_PAGE_SEPARATOR = "\x1e"
+
+
+def _read_words(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip() and not line.startswith("#")}
+
+
+@functools.lru_cache(maxsize=None)
+def load_stopwords(spec):
+    """spec: "es", "en", la ruta a un archivo (una palabra por línea) o varios separados por coma"""
+    words = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if part in LANGUAGES:
+            words |= _read_words(os.path.join(STOPWORDS_DIR, part + ".txt"))
+        elif os.path.exists(part):
+            words |= _read_words(part)
+        else:
+            raise ValueError(f"Unknown stopword list '{part}' (use {', '.join(LANGUAGES)} or a file path)")
+    return frozenset(words)
+
+
+class Tokenizer:
+    def __init__(self, stopwords="es"):
+        """stopwords: un spec para load_stopwords o un conjunto de palabras ya armado"""
+        self.stopwords = load_stopwords(stopwords) if isinstance(stopwords, str) else frozenset(stopwords)
+
+    def tokenize(self, text):
+        excluded = self.stopwords
+        return [word for word in _PUNCTUATION.sub('', text).lower().split() if word not in excluded]
+
+    def tokenize_batch(self, texts):
+        """Lista de tokens por texto, en el mismo orden"""
+        texts = [text.replace(_PAGE_SEPARATOR, " ") for text in texts]
+        if not texts:
+            return []
+        excluded = self.stopwords
+        pages = _PUNCTUATION.sub('', _PAGE_SEPARATOR.join(texts)).lower().split(_PAGE_SEPARATOR)
+        return [[word for word in page.split() if word not in excluded] for page in pages]
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(stopwords="es"):
+    """Un Tokenizer por spec y por proceso (los procesos de parseo lo reutilizan entre páginas)"""
+    return Tokenizer(stopwords)
@@ -1,41 +1,247 @@
-import subprocess
+"""Sube a HDFS la salida del crawler, solo lo que todavía no está subido.
+
+Lee el manifest.json de la carpeta local (o, sin manifest, wiki_data.jsonl)
+y sube con un pool de workers los archivos que no figuran en el log de
+subidas con el mismo sha256. El log (uploads.jsonl, en la misma carpeta) es
+append-only y cada línea se escribe recién cuando la subida terminó, así
+que un corte a mitad de una corrida deja registrado todo lo completo. Cada
+subida se reintenta con backoff exponencial. El manifest va último y solo
+si subieron todos los shards, para que en HDFS nunca liste uno que falta.
+
+Con --webhdfs los archivos grandes se suben en chunks, y un reintento o una
+corrida nueva solo sube los chunks que faltan. Un archivo que ya está en
+HDFS con el mismo checksum se registra sin subirlo otra vez. Sin --webhdfs
+se usa docker cp + hdfs dfs -put contra el contenedor namenode, porque el
+docker-compose no publica el puerto del datanode.
+
+    python uploader.py
+    python uploader.py --webhdfs http://localhost:9870 --workers 8
+"""
+import argparse
+import hashlib
+import json
 import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shard_writer import MANIFEST_NAME, load_manifest
+from webhdfs import DEFAULT_CHUNK_BYTES, ShardUploader, WebHDFSClient, checksum_matches
 
 container_name = "namenode"
 local_folder = "wiki_data"
 container_folder = "/wiki_data"
 hdfs_target_dir = "/user/root/wiki_data"
+hdfs_user = "root"
+upload_log_name = "uploads.jsonl"  # Subidas completas, en local_folder
+workers = 4  # Archivos que se suben a la vez
+retries = 4  # Reintentos por archivo
+backoff_seconds = 2.0  # Espera antes del primer reintento; se duplica en cada uno
 
 def run_command(cmd):
+    print(f"Running: {' '.join(cmd)}") #Imprime el comando que se desea correr
     try:
-        print(f"Running: {' '.join(cmd)}") #Imprime el comando que se desea correr
-        subprocess.run(cmd, check=True) # Ejecuta el comando y verifica si hubo errores
+        subprocess.run(cmd, check=True, capture_output=True, text=True) # Ejecuta el comando y verifica si hubo errores
     except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
+        raise RuntimeError(f"{' '.join(cmd[:4])}... exited with {e.returncode}: {e.stderr.strip()[:200]}")
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def local_files(folder):
+    """Archivos a subir como dicts con name y sha256, y el que va último (el manifest, o None)"""
+    shards = load_manifest(folder)["shards"]
+    if shards:
+        return [{"name": s["path"], "sha256": s["sha256"]} for s in shards], MANIFEST_NAME
+    return [{"name": "wiki_data.jsonl", "sha256": None}], None
+
+class UploadLog:
+    """Log append-only de subidas completas; la última línea de cada archivo gana"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # La última línea queda incompleta si el proceso murió a mitad de un write
+                    if not line.endswith("\n"):
+                        break
+                    entry = json.loads(line)
+                    self.done[entry["name"]] = entry
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def uploaded(self, name, sha256, remote):
+        entry = self.done.get(name)
+        return entry is not None and entry["sha256"] == sha256 and entry["remote"] == remote
+
+    def record(self, name, sha256, size, remote):
+        entry = {"name": name, "sha256": sha256, "bytes": size, "remote": remote,
+                 "uploaded": time.strftime('%Y-%m-%d %H:%M:%S')}
+        with self._lock:
+            self.done[name] = entry
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class WebHDFSTarget:
+    def __init__(self, url, target_dir, chunk_bytes):
+        self.client = WebHDFSClient(url, hdfs_user)
+        self.uploader = ShardUploader(self.client, target_dir, workers, chunk_bytes)
+        self.chunk_bytes = chunk_bytes
 
-def upload_to_hdfs():
-    if not os.path.exists(local_folder):
-        print(f"Folder '{local_folder}' not found.")
-        return
+    def remote(self, name):
+        return f"{self.uploader.target_dir}/{name}"
 
-    #flujo de trabajo:
-    #1. Inserta el documento en el contenedor
-    #2. Crea el directorio en HDFS
-    #3. Sube el documento al HDFS
-    #4. Verifica que el documento se haya subido correctamente
+    def already_there(self, path, name):
+        """True si HDFS ya tiene el archivo con el mismo largo y checksum (p. ej. si se perdió el log)"""
+        status = self.client.status(self.remote(name))
+        if status is None or status["length"] != os.path.getsize(path):
+            return False
+        return checksum_matches(self.client.checksum(self.remote(name)), path, self.chunk_bytes)
 
-    print(f"Uploading file '{local_folder}'...")
-    run_command(["docker", "cp", local_folder, f"{container_name}:{container_folder}"])
+    def upload(self, path, name):
+        self.uploader.upload(path, name)
 
-    print(f" Creating HDFS directory '{hdfs_target_dir}'...")
-    run_command(["docker", "exec", container_name, "hdfs", "dfs", "-mkdir", "-p", hdfs_target_dir])
+    def close(self):
+        self.uploader.close()
+        print(f"WebHDFS: {self.uploader.report()}")
 
-    print(f"Uploading files from container to HDFS...")
-    run_command(["docker", "exec", container_name, "hdfs", "dfs", "-put", "-f", "/wiki_data/wiki_data.jsonl", hdfs_target_dir])
+class DockerTarget:
+    def __init__(self, target_dir):
+        self.target_dir = target_dir.rstrip("/")
+        run_command(["docker", "exec", container_name, "mkdir", "-p", container_folder])
+        run_command(["docker", "exec", container_name, "hdfs", "dfs", "-mkdir", "-p", self.target_dir])
 
-    print(f"Verifying files in HDFS:")
-    run_command([
-        "docker", "exec", container_name, "hdfs", "dfs", "-ls", hdfs_target_dir
-    ])
+    def remote(self, name):
+        return f"{self.target_dir}/{name}"
+
+    def already_there(self, path, name):
+        return False
+
+    def upload(self, path, name):
+        #flujo de trabajo:
+        #1. Copia el archivo al contenedor
+        #2. Lo sube a HDFS (-put escribe a un ._COPYING_ y renombra al terminar)
+        #3. Lo borra del contenedor
+        staged = f"{container_folder}/{name}"
+        run_command(["docker", "cp", path, f"{container_name}:{staged}"])
+        run_command(["docker", "exec", container_name, "hdfs", "dfs", "-put", "-f", staged, self.target_dir])
+        run_command(["docker", "exec", container_name, "rm", "-f", staged])
+
+    def close(self):
+        print(f"Verifying files in HDFS:")
+        subprocess.run(["docker", "exec", container_name, "hdfs", "dfs", "-ls", self.target_dir])
+
+def with_retries(fn, name):
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"Upload of {name} failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+def upload_file(target, log, folder, entry, force=False):
+    """Sube un archivo si hace falta; retorna 'skipped', 'found' o 'uploaded'"""
+    name = entry["name"]
+    path = os.path.join(folder, name)
+    sha256 = entry["sha256"] or file_sha256(path)
+    size = os.path.getsize(path)
+    remote = target.remote(name)
+    if not force and log.uploaded(name, sha256, remote):
+        return "skipped", size
+    if not force and with_retries(lambda: target.already_there(path, name), name):
+        log.record(name, sha256, size, remote)
+        return "found", size
+    with_retries(lambda: target.upload(path, name), name)
+    log.record(name, sha256, size, remote)
+    return "uploaded", size
+
+def upload_to_hdfs(target, folder, force=False):
+    """Sube los archivos pendientes de folder; retorna cuántos fallaron"""
+    files, last = local_files(folder)
+    log = UploadLog(os.path.join(folder, upload_log_name))
+    totals = {"skipped": [0, 0], "found": [0, 0], "uploaded": [0, 0]}
+    failed = 0
+    start = time.perf_counter()
+
+    def count(outcome, size):
+        totals[outcome][0] += 1
+        totals[outcome][1] += size
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="upload") as pool:
+        futures = {pool.submit(upload_file, target, log, folder, entry, force): entry["name"] for entry in files}
+        for future, name in futures.items():
+            try:
+                count(*future.result())
+            except Exception as e:
+                failed += 1
+                print(f"Giving up on {name}: {e}")
+
+    if last is not None:
+        if failed:
+            print(f"Not uploading {last}: {failed} files failed, run the uploader again to retry them")
+        else:
+            try:
+                count(*upload_file(target, log, folder, {"name": last, "sha256": None}, force))
+            except Exception as e:
+                failed += 1
+                print(f"Giving up on {last}: {e}")
+    log.close()
+
+    seconds = time.perf_counter() - start
+    uploaded_mb = totals["uploaded"][1] / (1024 * 1024)
+    print(f"Uploaded {totals['uploaded'][0]} files ({uploaded_mb:.2f} MB) in {seconds:.2f}s "
+          f"({uploaded_mb / seconds if seconds else 0:.1f} MB/s); "
+          f"{totals['skipped'][0]} already in the upload log ({totals['skipped'][1] / (1024 * 1024):.2f} MB), "
+          f"{totals['found'][0]} already in HDFS, {failed} failed")
+    return failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upload new or changed crawler output files to HDFS")
+    parser.add_argument("--folder", default=local_folder, help="Local folder with the manifest or wiki_data.jsonl")
+    parser.add_argument("--target-dir", default=hdfs_target_dir, help="HDFS directory")
+    parser.add_argument("--webhdfs", metavar="URL",
+                        help="Upload over WebHDFS (e.g. http://localhost:9870) instead of docker cp + hdfs dfs -put")
+    parser.add_argument("--workers", type=int, default=workers, help="Files uploaded at the same time")
+    parser.add_argument("--retries", type=int, default=retries, help="Retries per file, with exponential backoff")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_BYTES / (1024 * 1024),
+                        help="WebHDFS chunk and block size")
+    parser.add_argument("--force", action="store_true", help="Ignore the upload log and upload everything again")
+    return parser.parse_args()
+
+def main():
+    global workers, retries
+    args = parse_args()
+    workers = max(args.workers, 1)
+    retries = max(args.retries, 0)
+    if not os.path.exists(args.folder):
+        print(f"Folder '{args.folder}' not found.")
+        sys.exit(1)
+
+    if args.webhdfs:
+        target = WebHDFSTarget(args.webhdfs, args.target_dir, int(args.chunk_mb * 1024 * 1024))
+    else:
+        target = DockerTarget(args.target_dir)
+    try:
+        failed = upload_to_hdfs(target, args.folder, args.force)
+    finally:
+        target.close()
+    if failed:
+        sys.exit(1)
 
-upload_to_hdfs()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Persistencia append-only de las páginas visitadas.
+
+Se usan dos archivos de texto con un título por línea:
+
+- <path>.snapshot: base compactada y sin duplicados.
+- <path>: journal donde se agrega cada página nueva.
+
+Agregar una página cuesta una línea de I/O; el fsync se hace por lotes.
+Cada cierto número de entradas el journal se pasa al final del snapshot y
+se vacía. Al cerrar el crawl, si el set de títulos está en memoria, el
+snapshot se reescribe desde él para eliminar duplicados.
+"""
+import os
+import threading
+import time
+
+
+class VisitedJournal:
+    def __init__(self, path, fsync_every=500, fsync_interval=1.0, compact_every=50000):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._journal_entries = 0
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.snapshot_path)
+
+    def _read_titles(self, path):
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            data = f.read()
+        lines = data.split("\n")
+        # La última línea queda incompleta si el proceso murió a mitad de un write
+        lines.pop()
+        return lines
+
+    def load(self):
+        """Reconstruye el set de visitadas desde el snapshot y el journal"""
+        with self._lock:
+            journal = self._read_titles(self.path)
+            self._journal_entries = len(journal)
+            titles = set(self._read_titles(self.snapshot_path))
+            titles.update(journal)
+            titles.discard("")
+            return titles
+
+    def iter_titles(self):
+        """Recorre snapshot y journal línea por línea sin armar un set (puede repetir títulos)"""
+        with self._lock:
+            paths = [p for p in (self.snapshot_path, self.path) if os.path.exists(p)]
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n") and len(line) > 1:
+                        yield line[:-1]
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, title):
+        with self._lock:
+            self._open()
+            self._file.write(title + "\n")
+            self._unsynced += 1
+            self._journal_entries += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+            if self._journal_entries >= self.compact_every:
+                self._fold_journal()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def checkpoint(self):
+        """Pasa el journal al snapshot sin necesitar el set completo de títulos"""
+        with self._lock:
+            self._fold_journal()
+
+    def _fold_journal(self):
+        """Pasa el journal al final del snapshot y lo vacía"""
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as src:
+            data = src.read()
+        # Solo líneas completas
+        data = data[:data.rfind(b"\n") + 1]
+        with open(self.snapshot_path, "ab") as dst:
+            dst.write(data)
+            dst.flush()
+            os.fsync(dst.fileno())
+        # Si el proceso muere aquí, las entradas quedan repetidas en ambos archivos, lo cual es inofensivo
+        open(self.path, "w").close()
+        self._journal_entries = 0
+
+    def compact(self, titles):
+        """Reescribe el snapshot desde titles (sin duplicados) y vacía el journal"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(title + "\n" for title in titles)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            open(self.path, "w").close()
+            self._journal_entries = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
@@ -0,0 +1,198 @@
+"""Estructuras para el set de páginas visitadas.
+
+- "set": set de Python con los títulos (exacto, el más pesado en memoria).
+- "fingerprint": tabla hash abierta de huellas de 64 bits en un array('Q').
+  Exacto salvo colisiones de 64 bits, ~12-23 bytes por título.
+- "bloom": Bloom filter escalable con tasa de falsos positivos configurable.
+  Un falso positivo hace que una página nueva se trate como ya visitada.
+
+Todas exponen add(title) -> bool (True si era nueva), `in`, len(),
+capacity() y memory_bytes(). Solo "set" puede iterar los títulos.
+"""
+import hashlib
+import math
+import sys
+from array import array
+
+STORES = ("set", "fingerprint", "bloom")
+
+
+def fingerprint(title):
+    """Huella de 64 bits de un título (0 se reserva para slots vacíos)"""
+    value = int.from_bytes(hashlib.blake2b(title.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SetStore:
+    def __init__(self, titles=()):
+        self._titles = titles if isinstance(titles, set) else set(titles)
+
+    def add(self, title):
+        if title in self._titles:
+            return False
+        self._titles.add(title)
+        return True
+
+    def update(self, titles):
+        self._titles.update(titles)
+
+    def __contains__(self, title):
+        return title in self._titles
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __iter__(self):
+        return iter(self._titles)
+
+    def capacity(self):
+        return len(self._titles)
+
+    def memory_bytes(self):
+        return sys.getsizeof(self._titles) + sum(sys.getsizeof(t) for t in self._titles)
+
+
+class FingerprintStore:
+    """Tabla hash con direccionamiento abierto (linear probing) sobre huellas de 64 bits"""
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, capacity=1024):
+        size = 1
+        while size * self.MAX_LOAD < capacity:
+            size *= 2
+        self._slots = array('Q', [0]) * size
+        self._mask = size - 1
+        self._count = 0
+
+    def _find(self, fp):
+        slots = self._slots
+        i = fp & self._mask
+        while True:
+            value = slots[i]
+            if value == 0 or value == fp:
+                return i
+            i = (i + 1) & self._mask
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array('Q', [0]) * (len(old) * 2)
+        self._mask = len(self._slots) - 1
+        for fp in old:
+            if fp:
+                self._slots[self._find(fp)] = fp
+
+    def add(self, title):
+        fp = fingerprint(title)
+        i = self._find(fp)
+        if self._slots[i] == fp:
+            return False
+        self._slots[i] = fp
+        self._count += 1
+        if self._count > len(self._slots) * self.MAX_LOAD:
+            self._grow()
+        return True
+
+    def update(self, titles):
+        for title in titles:
+            self.add(title)
+
+    def __contains__(self, title):
+        fp = fingerprint(title)
+        return self._slots[self._find(fp)] == fp
+
+    def __len__(self):
+        return self._count
+
+    def capacity(self):
+        """Entradas que caben antes de tener que crecer la tabla"""
+        return int(len(self._slots) * self.MAX_LOAD)
+
+    def memory_bytes(self):
+        return sys.getsizeof(self._slots)
+
+
+class _BloomFilter:
+    def __init__(self, capacity, fp_rate):
+        self.capacity = capacity
+        self.bits = max(int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.bits / capacity * math.log(2))), 1)
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h1, h2):
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def contains(self, h1, h2):
+        data = self.array
+        return all(data[p >> 3] & (1 << (p & 7)) for p in self._positions(h1, h2))
+
+    def add(self, h1, h2):
+        for p in self._positions(h1, h2):
+            self.array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class BloomStore:
+    """Bloom filter escalable: cuando un filtro se llena se agrega otro del doble de
+    capacidad y la mitad de falsos positivos, así la tasa total queda acotada por fp_rate"""
+
+    def __init__(self, capacity=100000, fp_rate=0.001):
+        self.fp_rate = fp_rate
+        self._filters = [_BloomFilter(capacity, fp_rate / 2)]
+        self._count = 0
+
+    @staticmethod
+    def _hashes(title):
+        digest = hashlib.blake2b(title.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def _contains(self, h1, h2):
+        return any(f.contains(h1, h2) for f in self._filters)
+
+    def add(self, title):
+        h1, h2 = self._hashes(title)
+        if self._contains(h1, h2):
+            return False
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            tightening = 2 ** (len(self._filters) + 1)
+            current = _BloomFilter(current.capacity * 2, self.fp_rate / tightening)
+            self._filters.append(current)
+        current.add(h1, h2)
+        self._count += 1
+        return True
+
+    def update(self, titles):
+        for title in titles:
+            self.add(title)
+
+    def __contains__(self, title):
+        return self._contains(*self._hashes(title))
+
+    def __len__(self):
+        return self._count
+
+    def capacity(self):
+        return sum(f.capacity for f in self._filters)
+
+    def memory_bytes(self):
+        return sum(sys.getsizeof(f.array) for f in self._filters)
+
+
+def create_visited_store(kind="set", capacity=100000, fp_rate=0.001):
+    if kind == "set":
+        return SetStore()
+    if kind == "fingerprint":
+        return FingerprintStore(capacity)
+    if kind == "bloom":
+        return BloomStore(capacity, fp_rate)
+    raise ValueError(f"Unknown visited store '{kind}'")
+
+
+def describe_store(kind, store):
+    """Resumen de memoria del store para las estadísticas finales"""
+    megabytes = store.memory_bytes() / (1024 * 1024)
+    # Los stores compactos reservan memoria por adelantado, así que se mide contra su capacidad
+    per_million = megabytes / max(len(store), store.capacity(), 1) * 1_000_000
+    return f"{kind}, {len(store)} entries, {megabytes:.2f} MB allocated ({per_million:.1f} MB per million entries)"
@@ -0,0 +1,278 @@
+"""Subida directa a HDFS por WebHDFS, sin docker cp ni hdfs dfs -put.
+
+ShardUploader sube cada shard cerrado mientras el crawl sigue, con un pool
+de threads. Un archivo más grande que chunk_bytes se parte en chunks que
+se suben en paralelo como archivos <nombre>.parts/NNNNN. Después se unen
+con CONCAT y se renombran al destino. Los chunks se crean con blocksize =
+chunk_bytes, así que cada chunk es un bloque de HDFS. Si una subida se
+corta, los chunks completos quedan en .parts y el siguiente intento solo
+sube los que faltan.
+
+La verificación compara el GETFILECHECKSUM de HDFS con el mismo cálculo
+hecho sobre el archivo local: el MD5 de los MD5 por bloque de los CRC de
+cada 512 bytes (MD5MD5CRC32FileChecksum). Para eso se necesita el tamaño
+de bloque, que es el que se fijó al crear los chunks. Con el paquete
+crc32c el CRC32C corre en C; sin él se usa una versión en Python, que es
+mucho más lenta.
+
+Para probar sin un cluster está webhdfs_mock.py.
+"""
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode
+
+import requests
+
+try:
+    import crc32c as _crc32c  # Opcional: CRC32C en C
+except ImportError:
+    _crc32c = None
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024  # También es el blocksize de los archivos subidos
+PARTS_SUFFIX = ".parts"
+# Nombre del algoritmo en GETFILECHECKSUM, por ejemplo "MD5-of-0MD5-of-512CRC32C"
+_ALGORITHM = re.compile(r"^MD5-of-(\d+)MD5-of-(\d+)(CRC32C?)$")
+
+
+class WebHDFSError(Exception):
+    pass
+
+
+def _crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82F63B78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC32C_TABLE = _crc32c_table()
+
+
+def _crc32c_python(data):
+    crc = 0xFFFFFFFF
+    table = _CRC32C_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def crc_function(kind):
+    """CRC de HDFS: CRC32 (el de zlib) o CRC32C (Castagnoli, el default de HDFS)"""
+    if kind == "CRC32":
+        return zlib.crc32
+    if kind == "CRC32C":
+        return _crc32c.crc32c if _crc32c is not None else _crc32c_python
+    raise ValueError(f"Unknown HDFS checksum type '{kind}'")
+
+
+def md5md5crc(blocks, bytes_per_crc=512, crc="CRC32C"):
+    """MD5 (hex) de los MD5 de cada bloque sobre los CRC de cada bytes_per_crc bytes, como HDFS"""
+    crc_fn = crc_function(crc)
+    block_md5s = hashlib.md5()
+    for block in blocks:
+        view = memoryview(block)
+        crcs = b"".join(struct.pack(">I", crc_fn(view[i:i + bytes_per_crc]))
+                        for i in range(0, len(view), bytes_per_crc))
+        block_md5s.update(hashlib.md5(crcs).digest())
+    return block_md5s.hexdigest()
+
+
+def file_blocks(path, block_size):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def checksum_matches(remote, path, block_size):
+    """Compara el dict FileChecksum de WebHDFS con el del archivo local"""
+    match = _ALGORITHM.match(remote["algorithm"])
+    if match is None:
+        raise WebHDFSError(f"Unsupported checksum algorithm {remote['algorithm']}")
+    bytes_per_crc, crc = int(match.group(2)), match.group(3)
+    # bytes: bytesPerCRC (4) + crcPerBlock (8) + MD5 (16), en hex
+    remote_md5 = remote["bytes"][-32:]
+    return remote_md5 == md5md5crc(file_blocks(path, block_size), bytes_per_crc, crc)
+
+
+class WebHDFSClient:
+    def __init__(self, url, user="root", timeout=120):
+        self.url = url.rstrip("/")
+        self.user = user
+        self.timeout = timeout
+        self._local = threading.local()  # Una Session por thread
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, method, path, op, data=None, ok=(200, 201), **params):
+        query = urlencode({"op": op, "user.name": self.user, **params})
+        url = f"{self.url}/webhdfs/v1{quote(path)}?{query}"
+        session = self._session()
+        resp = session.request(method, url, allow_redirects=False, timeout=self.timeout)
+        if resp.status_code == 307:
+            # El namenode redirige al datanode que recibe o entrega los datos
+            resp = session.request(method, resp.headers["Location"], data=data, timeout=self.timeout)
+        if resp.status_code not in ok:
+            raise WebHDFSError(f"{op} {path}: HTTP {resp.status_code} {resp.text[:200]}")
+        return resp
+
+    def mkdirs(self, path):
+        return self._request("PUT", path, "MKDIRS").json()["boolean"]
+
+    def create(self, path, data, block_size=None, overwrite=True):
+        params = {"overwrite": str(overwrite).lower()}
+        if block_size:
+            params["blocksize"] = block_size
+        self._request("PUT", path, "CREATE", data=data, **params)
+
+    def concat(self, target, sources):
+        self._request("POST", target, "CONCAT", sources=",".join(sources))
+
+    def rename(self, path, destination):
+        return self._request("PUT", path, "RENAME", destination=destination).json()["boolean"]
+
+    def delete(self, path, recursive=False):
+        return self._request("DELETE", path, "DELETE", recursive=str(recursive).lower()).json()["boolean"]
+
+    def status(self, path):
+        """FileStatus de path, o None si no existe"""
+        resp = self._request("GET", path, "GETFILESTATUS", ok=(200, 404))
+        return resp.json()["FileStatus"] if resp.status_code == 200 else None
+
+    def list_status(self, path):
+        """Nombre -> largo de cada entrada del directorio path; vacío si no existe"""
+        resp = self._request("GET", path, "LISTSTATUS", ok=(200, 404))
+        if resp.status_code == 404:
+            return {}
+        return {s["pathSuffix"]: s["length"] for s in resp.json()["FileStatuses"]["FileStatus"]}
+
+    def checksum(self, path):
+        return self._request("GET", path, "GETFILECHECKSUM").json()["FileChecksum"]
+
+
+class ShardUploader:
+    """Sube archivos a target_dir en segundo plano; submit() retorna un Future con el resultado"""
+
+    def __init__(self, client, target_dir, workers=4, chunk_bytes=DEFAULT_CHUNK_BYTES, verify=True):
+        self.client = client
+        self.target_dir = target_dir.rstrip("/")
+        self.chunk_bytes = chunk_bytes
+        self.verify = verify
+        # Los archivos y sus chunks van en pools distintos: un archivo espera a sus chunks sin ocupar un slot de chunk
+        self._files = ThreadPoolExecutor(max(workers // 2, 1), thread_name_prefix="upload-file")
+        self._chunks = ThreadPoolExecutor(workers, thread_name_prefix="upload-chunk")
+        self._futures = []
+        self._lock = threading.Lock()
+        self.uploaded = 0
+        self.bytes = 0
+        self.failed = 0
+        self.resumed_bytes = 0  # Bytes de chunks que ya estaban en HDFS de un intento anterior
+        self.busy_seconds = 0.0
+        self._target_ready = False  # target_dir se crea con la primera subida, no al arrancar
+
+    def submit(self, local_path, name=None):
+        future = self._files.submit(self.upload, local_path, name)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def upload(self, local_path, name=None):
+        """Sube local_path como target_dir/name y verifica su checksum; retorna un resumen"""
+        name = name or os.path.basename(local_path)
+        remote = f"{self.target_dir}/{name}"
+        size = os.path.getsize(local_path)
+        start = time.perf_counter()
+        try:
+            self._ensure_target_dir()
+            if size <= self.chunk_bytes:
+                with open(local_path, "rb") as f:
+                    self.client.create(remote + ".tmp", f.read(), self.chunk_bytes)
+                self._replace(remote + ".tmp", remote)
+            else:
+                self._upload_chunks(local_path, remote, size)
+            if self.verify and not checksum_matches(self.client.checksum(remote), local_path, self.chunk_bytes):
+                # Borrarlo hace que el próximo intento suba el archivo entero
+                self.client.delete(remote)
+                raise WebHDFSError(f"Checksum mismatch for {remote}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"Upload of {name} failed: {e}")
+            raise
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.uploaded += 1
+            self.bytes += size
+            self.busy_seconds += seconds
+        print(f"Uploaded {name} to {remote}: {size / (1024 * 1024):.2f} MB in {seconds:.2f}s"
+              f"{' (checksum verified)' if self.verify else ''}")
+        return {"path": remote, "bytes": size, "seconds": seconds}
+
+    def _ensure_target_dir(self):
+        # Si HDFS no responde, falla la subida (y se reintenta con la próxima) en lugar del crawl
+        if not self._target_ready:
+            self.client.mkdirs(self.target_dir)
+            self._target_ready = True
+
+    def _upload_chunks(self, local_path, remote, size):
+        parts_dir = remote + PARTS_SUFFIX
+        # Los chunks que quedaron completos de un intento anterior no se vuelven a subir;
+        # si alguno no corresponde al archivo actual, la verificación del checksum lo detecta
+        existing = self.client.list_status(parts_dir)
+        self.client.mkdirs(parts_dir)
+        offsets = range(0, size, self.chunk_bytes)
+        parts = [f"{parts_dir}/{i:05d}" for i in range(len(offsets))]
+
+        def put_chunk(part, offset):
+            length = min(self.chunk_bytes, size - offset)
+            if existing.get(part.rsplit("/", 1)[1]) == length:
+                with self._lock:
+                    self.resumed_bytes += length
+                return
+            with open(local_path, "rb") as f:
+                f.seek(offset)
+                self.client.create(part, f.read(length), self.chunk_bytes)
+
+        # list() propaga el primer error de un chunk
+        list(self._chunks.map(put_chunk, parts, offsets))
+        self.client.concat(parts[0], parts[1:])
+        self._replace(parts[0], remote)
+        self.client.delete(parts_dir, recursive=True)
+
+    def _replace(self, source, destination):
+        # RENAME de WebHDFS no sobreescribe
+        self.client.delete(destination)
+        if not self.client.rename(source, destination):
+            raise WebHDFSError(f"RENAME {source} -> {destination} failed")
+
+    def wait(self):
+        """Espera las subidas pendientes; retorna cuántas fallaron"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        return sum(1 for future in futures if future.exception() is not None)
+
+    def close(self):
+        self.wait()
+        self._files.shutdown()
+        self._chunks.shutdown()
+
+    def report(self):
+        rate = self.bytes / (1024 * 1024) / self.busy_seconds if self.busy_seconds else 0
+        resumed = f", {self.resumed_bytes / (1024 * 1024):.2f} MB resumed" if self.resumed_bytes else ""
+        return (f"{self.uploaded} files, {self.bytes / (1024 * 1024):.2f} MB uploaded to {self.target_dir} "
+                f"({rate:.1f} MB/s per file){resumed}, {self.failed} failed")
@@ -0,0 +1,227 @@
+"""Servidor WebHDFS mínimo sobre una carpeta local, para probar webhdfs.py sin un cluster.
+
+Implementa las operaciones que usa ShardUploader (MKDIRS, CREATE, CONCAT,
+RENAME, DELETE, GETFILESTATUS, LISTSTATUS y GETFILECHECKSUM). CREATE
+responde con el mismo 307 que un namenode real, y el cuerpo se manda en el
+segundo request. Cada archivo recuerda los largos de sus bloques (según el
+blocksize de CREATE), y eso alcanza para calcular GETFILECHECKSUM igual que
+HDFS: MD5-of-MD5-of-512CRC32C. Con --fail-rate una fracción de los CREATE
+falla con 503 después de escribir la mitad del cuerpo, como un datanode que
+se cae a mitad de la subida.
+
+    python webhdfs_mock.py hdfs_mock --port 9870
+    python crawler.py --output shards --webhdfs http://127.0.0.1:9870 --skip-hdfs-check
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from webhdfs import md5md5crc
+
+DEFAULT_BLOCK_SIZE = 128 * 1024 * 1024
+BYTES_PER_CRC = 512
+
+
+class MockWebHDFS(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, folder, port=0, block_size=DEFAULT_BLOCK_SIZE, fail_rate=0.0, seed=None):
+        super().__init__(("127.0.0.1", port), _WebHDFSHandler)
+        self.folder = os.path.abspath(folder)
+        self.block_size = block_size
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.failures = 0
+        self.blocks = {}  # path HDFS -> largos de sus bloques
+        self.lock = threading.Lock()
+        self.requests = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def local_path(self, path):
+        return os.path.join(self.folder, path.lstrip("/"))
+
+    def read_blocks(self, path):
+        with open(self.local_path(path), "rb") as f:
+            for length in self.blocks.get(path, []):
+                yield f.read(length)
+
+
+def _split(length, block_size):
+    full, rest = divmod(length, block_size)
+    return [block_size] * full + ([rest] if rest else [])
+
+
+class _WebHDFSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self, path):
+        self._reply(404, {"RemoteException": {"exception": "FileNotFoundException",
+                                               "message": f"File does not exist: {path}"}})
+
+    def _status(self, path):
+        local = self.server.local_path(path)
+        is_dir = os.path.isdir(local)
+        return {"pathSuffix": os.path.basename(path), "type": "DIRECTORY" if is_dir else "FILE",
+                "length": 0 if is_dir else os.path.getsize(local),
+                "blockSize": self.server.block_size, "replication": 1}
+
+    def _handle(self, method):
+        server = self.server
+        parts = urlsplit(self.path)
+        path = unquote(parts.path[len("/webhdfs/v1"):]) or "/"
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        op = params.get("op", "").upper()
+        local = server.local_path(path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        with server.lock:
+            server.requests += 1
+
+        if op == "CREATE":
+            if "datanode" not in params:
+                self._reply(307, headers={"Location": f"{server.base_url}{self.path}&datanode=true"})
+                return
+            if os.path.exists(local) and params.get("overwrite", "false") != "true":
+                self._reply(403, {"RemoteException": {"exception": "FileAlreadyExistsException"}})
+                return
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            with server.lock:
+                fail = server.fail_rate and server.random.random() < server.fail_rate
+                server.failures += bool(fail)
+            if fail:
+                with open(local, "wb") as f:
+                    f.write(body[:len(body) // 2])
+                self._reply(503, {"RemoteException": {"exception": "IOException",
+                                                       "message": "Injected datanode failure"}})
+                return
+            with open(local, "wb") as f:
+                f.write(body)
+            with server.lock:
+                server.blocks[path] = _split(len(body), int(params.get("blocksize", server.block_size)))
+            self._reply(201)
+        elif op == "MKDIRS":
+            os.makedirs(local, exist_ok=True)
+            self._reply(200, {"boolean": True})
+        elif op == "CONCAT":
+            sources = params.get("sources", "").split(",")
+            if not os.path.exists(local) or not all(os.path.exists(server.local_path(s)) for s in sources):
+                self._not_found(path)
+                return
+            with open(local, "ab") as target:
+                for source in sources:
+                    with open(server.local_path(source), "rb") as f:
+                        shutil.copyfileobj(f, target)
+                    os.remove(server.local_path(source))
+                    with server.lock:
+                        server.blocks[path] = server.blocks.get(path, []) + server.blocks.pop(source, [])
+            self._reply(200)
+        elif op == "RENAME":
+            destination = params["destination"]
+            target = server.local_path(destination)
+            if not os.path.exists(local) or os.path.exists(target):
+                self._reply(200, {"boolean": False})
+                return
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(local, target)
+            with server.lock:
+                if path in server.blocks:
+                    server.blocks[destination] = server.blocks.pop(path)
+            self._reply(200, {"boolean": True})
+        elif op == "DELETE":
+            if not os.path.exists(local):
+                self._reply(200, {"boolean": False})
+                return
+            if os.path.isdir(local):
+                if params.get("recursive") != "true" and os.listdir(local):
+                    self._reply(403, {"RemoteException": {"exception": "PathIsNotEmptyDirectoryException"}})
+                    return
+                shutil.rmtree(local)
+            else:
+                os.remove(local)
+            with server.lock:
+                for key in [k for k in server.blocks if k == path or k.startswith(path.rstrip("/") + "/")]:
+                    del server.blocks[key]
+            self._reply(200, {"boolean": True})
+        elif op == "GETFILESTATUS":
+            if not os.path.exists(local):
+                self._not_found(path)
+                return
+            self._reply(200, {"FileStatus": self._status(path)})
+        elif op == "LISTSTATUS":
+            if not os.path.isdir(local):
+                self._not_found(path)
+                return
+            statuses = [self._status(path.rstrip("/") + "/" + name) for name in sorted(os.listdir(local))]
+            self._reply(200, {"FileStatuses": {"FileStatus": statuses}})
+        elif op == "GETFILECHECKSUM":
+            if not os.path.isfile(local):
+                self._not_found(path)
+                return
+            with server.lock:
+                blocks = list(server.blocks.get(path, []))
+            crc_per_block = blocks[0] // BYTES_PER_CRC if len(blocks) > 1 else 0
+            md5 = md5md5crc(server.read_blocks(path), BYTES_PER_CRC, "CRC32C")
+            self._reply(200, {"FileChecksum": {
+                "algorithm": f"MD5-of-{crc_per_block}MD5-of-{BYTES_PER_CRC}CRC32C",
+                "bytes": f"{BYTES_PER_CRC:08x}{crc_per_block:016x}{md5}",
+                "length": 28}})
+        else:
+            self._reply(400, {"RemoteException": {"exception": "IllegalArgumentException",
+                                                   "message": f"Invalid op {op} for {method}"}})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local WebHDFS mock backed by a folder")
+    parser.add_argument("folder", help="Folder that holds the mock HDFS tree")
+    parser.add_argument("--port", type=int, default=9870)
+    parser.add_argument("--block-size-mb", type=float, default=DEFAULT_BLOCK_SIZE / (1024 * 1024))
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="Fraction of CREATE requests that fail halfway through the body")
+    args = parser.parse_args()
+    server = MockWebHDFS(args.folder, args.port, int(args.block_size_mb * 1024 * 1024), args.fail_rate)
+    print(f"Mock WebHDFS on {server.base_url}, files under {server.folder}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{server.requests} requests, {server.failures} injected failures")
+
+
+if __name__ == "__main__":
+    main()